@@ -1,51 +1,182 @@
+import asyncio
+import json
+import logging
 import os
 import random
-from openai import OpenAI
-from app.core.knowledge_vector import search_knowledge_vector
-from app.core.prompt_config import load_prompts
-from app.db.models import PromptConfig, Conversation, Message
-from app.db.database import db_session
+import threading
+import time
+import weakref
+from starlette.concurrency import run_in_threadpool
+from app.core.knowledge_vector import search_knowledge_vector, embed_query, normalize_query
+from app.core.memory import ConversationMemory, count_tokens, trim_history
+from app.core.metadata_cache import metadata_cache
+from app.core.persistence import message_writer
+from app.core.semantic_cache import semantic_cache
+from app.core.single_flight import question_key, single_flight
+from app.db.models import Conversation
+from app.db.database import Session
 
 api_key = os.getenv("OPENAI_API_KEY")
 
-client = OpenAI(api_key = api_key)
+# OpenAI clients are built on first use (or by the startup warm-up); importing the SDK is slow.
+client = None
+async_client = None
+_clients_lock = threading.Lock()
 
-conversation_memory = {}
+logger = logging.getLogger(__name__)
 
-async def get_streaming_response(convo_id: str, user_msg: str):
+conversation_memory = ConversationMemory()
+
+# File-based chat: one assistant per configuration, created on first use and then reused.
+FILE_ASSISTANT = {
+    "name": "Knowledge Assistant",
+    "instructions": "Use the uploaded file to answer.",
+    "tools": [{"type": "file_search"}],
+    "model": os.getenv("FILE_ASSISTANT_MODEL", "gpt-3.5-turbo"),
+}
+# Seconds a file-based run may take before it is cancelled
+FILE_RUN_TIMEOUT = float(os.getenv("FILE_RUN_TIMEOUT", "120"))
+_RUN_FAILED = ("thread.run.failed", "thread.run.cancelled", "thread.run.expired",
+               "thread.run.incomplete", "thread.run.requires_action")
+
+_assistant_ids = {}
+_assistant_lock = asyncio.Lock()
+_thread_locks = weakref.WeakValueDictionary()  # one turn at a time per conversation thread
+
+
+def get_client():
+    global client
+    with _clients_lock:
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI(api_key = api_key)
+    return client
+
+
+def get_async_client():
+    global async_client
+    with _clients_lock:
+        if async_client is None:
+            from openai import AsyncOpenAI
+
+            async_client = AsyncOpenAI(api_key = api_key)
+    return async_client
+
+
+def _start_turn(convo_id: str, user_msg: str) -> tuple[str, list[dict]]:
     """
-    Handles a streaming chat response using GPT-3.5, integrating knowledge base chunks when relevant.
+    Assigns an A/B version to the conversation if needed and queues the user's message.
+
+    Runs in a worker thread with its own session so the event loop is never blocked on SQLite.
+    The writes are committed by the write-behind worker and the version, prompt and history
+    come from in-process caches, so a turn on a known conversation makes no queries at all.
 
     Args:
         convo_id (str): Unique identifier of the conversation.
         user_msg (str): The user's message.
 
+    Returns:
+        tuple[str, list[dict]]: The conversation's version and its history so far, starting with
+            the version's system prompt.
+    """
+    # Earlier turns' writes must be visible before the version and history are read
+    message_writer.wait_for(convo_id)
+    conversation = metadata_cache.conversation(convo_id)
+    if conversation is None:
+        raise LookupError(f"Conversation {convo_id} not found")
+
+    version = conversation["version"]
+    if not version:
+        version = random.choice(["A", "B"])
+        message_writer.assign_version(convo_id, version)
+        metadata_cache.remember_version(convo_id, version, conversation["file_id"])
+
+    system_prompt = metadata_cache.prompt(version) or "You are a helpful assistant."
+
+    # Load (or rebuild) the history before this turn's message is persisted. The session
+    # only connects if the history has to be read from the database.
+    with Session() as db:
+        messages = conversation_memory.load(db, convo_id, system_prompt)
+
+    message_writer.add_message(convo_id, "user", user_msg)
+    return version, messages
+
+
+async def _finish_turn(convo_id: str, messages: list[dict], reply: str):
+    await message_writer.add_message_async(convo_id, "assistant", reply)
+    messages.append({"role": "assistant", "content": reply})
+    conversation_memory.save(convo_id, messages)
+
+
+async def _stream_completion(messages: list[dict], context: list[dict] | None = None, **request):
+    """
+    Streams a Responses API completion without blocking the event loop.
+
+    Args:
+        messages (list[dict]): The conversation history ending with the user's message.
+        context (list[dict] | None, optional): Messages sent only with this request, just before the
+            user's message, and never stored in the history. Defaults to None.
+        **request: Extra arguments for `responses.create` (model, tools, ...).
+
     Yields:
-        str: Streaming tokens as Server-Sent Events (SSE) for real-time UI updates.
+        str: Text deltas as they arrive from the model.
     """
-    conv = db_session.query(Conversation).filter_by(id=convo_id).first()
+    request_input = messages[:-1] + context + messages[-1:] if context else messages
+    response = await get_async_client().responses.create(input=request_input, stream=True, **request)
+    async with response:
+        # Drain the stream to its end rather than breaking on "done" so the
+        # connection is released cleanly back to the pool.
+        async for chunk in response:
+            if chunk.type == "response.output_text.delta":
+                yield chunk.delta
 
-    if not conv.version:
-        version = random.choice(["A", "B"])
-        conv.version = version
-        db_session.commit()
 
-    db_session.add(Message(conversation_id=convo_id, role="user", content=user_msg))
-    db_session.commit()
+async def _stream_reply(convo_id: str, messages: list[dict], context: list[dict] | None = None, **request):
+    """
+    Streams a Responses API completion, then persists the reply.
+
+    Args:
+        convo_id (str): Unique identifier of the conversation.
+        messages (list[dict]): The conversation history ending with the user's message; the reply is
+            appended to it and the result is stored in memory.
+        context (list[dict] | None, optional): Messages sent only with this request. Defaults to None.
+        **request: Extra arguments for `responses.create` (model, tools, ...).
+
+    Yields:
+        str: Text deltas as they arrive from the model.
+    """
+    full_reply = ""
+    async for token in _stream_completion(messages, context, **request):
+        full_reply += token
+        yield token
 
-    prompt_row = db_session.query(PromptConfig).filter_by(version=conv.version).first()
-    system_prompt = prompt_row.prompt if prompt_row else "You are a helpful assistant."
+    await _finish_turn(convo_id, messages, full_reply)
 
-    messages = conversation_memory.get(convo_id, [])
-    if not messages:
-        messages.append({"role": "system", "content": system_prompt})
 
+async def _knowledge_reply(convo_id: str, user_msg: str, messages: list[dict], version: str,
+                           query_embed: list[float] | None = None):
+    """
+    Answers the user's message with the help of the knowledge base.
 
-    relevant_chunks = search_knowledge_vector(user_msg)
-    #print("Search result:", relevant_chunks)
+    Args:
+        convo_id (str): Unique identifier of the conversation asking.
+        user_msg (str): The user's message.
+        messages (list[dict]): The conversation history ending with the user's message.
+        version (str): The conversation's A/B version.
+        query_embed (list[float] | None, optional): Embedding of the message; when given, the
+            finished reply is stored in the semantic cache. Defaults to None.
 
+    Yields:
+        str: Text deltas of the reply.
+    """
+    relevant_chunks = await run_in_threadpool(search_knowledge_vector, user_msg)
+
+    # Retrieved knowledge only goes with this request; it is not kept in the history,
+    # so earlier turns' chunks are not resent on every later turn.
+    context = []
     if relevant_chunks:
-        messages.append({
+        context.append({
             "role": "system",
             "content": (
                     "Take into account the following knowledge base information. "
@@ -54,35 +185,74 @@ async def get_streaming_response(convo_id: str, user_msg: str):
                     + "\n\n".join(relevant_chunks)
             )
         })
+        saved = conversation_memory.record_context(convo_id, count_tokens(context))
+        logger.info(
+            "Conversation %s: %d prompt tokens, %d saved by not resending earlier knowledge context",
+            convo_id, count_tokens(messages + context), saved,
+        )
+
+    tokens = []
+    async for token in _stream_completion(messages, context, model="gpt-3.5-turbo"):
+        tokens.append(token)
+        yield token
+
+    if query_embed is not None:
+        semantic_cache.store(version, query_embed, tokens)
+
+
+async def get_streaming_response(convo_id: str, user_msg: str):
+    """
+    Handles a streaming chat response using GPT-3.5, integrating knowledge base chunks when relevant.
+
+    Opening questions identical to one already being answered (same version, same question up to
+    case and punctuation) subscribe to that answer instead of starting their own retrieval and
+    completion; the reply is still stored in each conversation.
+
+    Args:
+        convo_id (str): Unique identifier of the conversation.
+        user_msg (str): The user's message.
+
+    Yields:
+        str: Text deltas of the reply; the endpoint frames them as Server-Sent Events (SSE).
+    """
+    version, messages = await run_in_threadpool(_start_turn, convo_id, user_msg)
+    first_turn = len(messages) == 1
 
     messages.append({"role": "user", "content": user_msg})
-    
-    #print(messages)
+    messages = trim_history(messages, conversation_memory.budget)
+
+    # Opening questions are often near-duplicates: replay a cached answer when one matches.
+    query_embed = cached = None
+    if semantic_cache.enabled and first_turn:
+        try:
+            query_embed = await run_in_threadpool(embed_query, normalize_query(user_msg))
+            cached = semantic_cache.lookup(version, query_embed)
+        except Exception:
+            # The cache is an optimization: answer without it when embeddings are unavailable
+            logger.warning("Semantic cache lookup failed for conversation %s", convo_id, exc_info=True)
+            query_embed = None
 
     try:
-        response = client.responses.create(
-            model="gpt-3.5-turbo",
-            input=messages,
-            stream=True,
-        )
-        full_reply = ""
-        for chunk in response:
-            if chunk.type == "response.output_text.delta":
-                token = chunk.delta
-                full_reply += token
-                yield f"data: {token}\n\n"
+        if cached is not None:
+            for token in cached:
+                yield token
+            await _finish_turn(convo_id, messages, "".join(cached))
+            return
 
-            # Optionally detect done signal
-            if chunk.type == "response.output_text.done":
-                break
+        def answer():
+            return _knowledge_reply(convo_id, user_msg, messages, version, query_embed)
 
-        db_session.add(Message(conversation_id=convo_id, role="assistant", content=full_reply))
-        db_session.commit()
-        messages.append({"role": "assistant", "content": full_reply})
-        conversation_memory[convo_id] = messages
+        # Without history the answer only depends on the version and the question
+        deltas = single_flight.stream((version, question_key(user_msg)), answer) if first_turn else answer()
+        tokens = []
+        async for token in deltas:
+            tokens.append(token)
+            yield token
+
+        await _finish_turn(convo_id, messages, "".join(tokens))
 
     except Exception as e:
-        yield f"data: [Error: {str(e)}]\n\n"
+        yield f"[Error: {str(e)}]"
 
 async def get_web_response(convo_id: str, user_msg: str):
     """
@@ -93,148 +263,172 @@ async def get_web_response(convo_id: str, user_msg: str):
         user_msg (str): The user's message.
 
     Yields:
-        str: Streaming tokens with potential web-sourced context via SSE.
+        str: Text deltas of the reply, with potential web-sourced context.
     """
-    conv = db_session.query(Conversation).filter_by(id=convo_id).first()
-
-    if not conv.version:
-        version = random.choice(["A", "B"])
-        conv.version = version
-        db_session.commit()
-
-    db_session.add(Message(conversation_id=convo_id, role="user", content=user_msg))
-    db_session.commit()
-
-    prompt_row = db_session.query(PromptConfig).filter_by(version=conv.version).first()
-    system_prompt = prompt_row.prompt if prompt_row else "You are a helpful assistant."
-
-    messages = conversation_memory.get(convo_id, [])
-    if not messages:
-        messages.append({"role": "system", "content": system_prompt})
-
+    version, messages = await run_in_threadpool(_start_turn, convo_id, user_msg)
 
     messages.append({"role": "user", "content": user_msg})
-    print(messages)
+    messages = trim_history(messages, conversation_memory.budget)
 
     try:
-        response = client.responses.create(
+        async for token in _stream_reply(
+            convo_id,
+            messages,
             model="gpt-4.1",
             tools=[{"type": "web_search_preview"}],
-            input=messages,
-            stream=True,
-        )
-        full_reply = ""
-        for chunk in response:
-            if chunk.type == "response.output_text.delta":
-                token = chunk.delta
-                full_reply += token
-                yield f"data: {token}\n\n"
-
-            # Optionally detect done signal
-            if chunk.type == "response.output_text.done":
-                break
-
-        db_session.add(Message(conversation_id=convo_id, role="assistant", content=full_reply))
-        db_session.commit()
-        messages.append({"role": "assistant", "content": full_reply})
-        conversation_memory[convo_id] = messages
+        ):
+            yield token
 
     except Exception as e:
-        yield f"data: [Error: {str(e)}]\n\n"
+        yield f"[Error: {str(e)}]"
 
 
 
-def create_file_based_assistant(file_id: str) -> str:
+def upload_and_store_file(conversation_id: str, file_path: str) -> str:
     """
-    Creates an OpenAI Assistant instance configured with a specific uploaded file for retrieval.
+    Uploads a file to OpenAI's API and links it to the conversation in the database.
 
     Args:
-        file_id (str): The ID of the uploaded file (from OpenAI's file API).
+        conversation_id (str): The conversation to associate the file with.
+        file_path (str): Local path to the file to upload.
 
     Returns:
-        str: The created assistant's ID.
+        str: The OpenAI-generated file ID.
     """
-    assistant = client.beta.assistants.create(
-        name="File Assistant",
-        instructions="Use the uploaded documents to answer questions.",
-        tools=[{"type": "retrieval"}],
-        model="gpt-4-1106-preview",
-        file_ids=[file_id]
-    )
-    return assistant.id
+    with open(file_path, "rb") as f:
+        file = get_client().files.create(file=f, purpose="assistants")
 
+    with Session() as db:
+        convo = db.query(Conversation).filter_by(id=conversation_id).first()
+        if convo:
+            convo.file_id = file.id
+            convo.thread_id = None  # the next turn starts a thread with the new file attached
+            metadata_cache.conversation_changed(db, conversation_id)
+            db.commit()
 
+    return file.id
 
-def upload_and_store_file(conversation_id: str, file_path: str) -> str:
+async def _file_assistant_id(config: dict = FILE_ASSISTANT) -> str:
     """
-    Uploads a file to OpenAI's API and links it to the conversation in the database.
+    Returns the ID of the assistant for a configuration, creating it on first use.
 
     Args:
-        conversation_id (str): The conversation to associate the file with.
-        file_path (str): Local path to the file to upload.
+        config (dict, optional): Arguments for `assistants.create`. Defaults to FILE_ASSISTANT.
 
     Returns:
-        str: The OpenAI-generated file ID.
+        str: The assistant's ID.
     """
-    with open(file_path, "rb") as f:
-        file = client.files.create(file=f, purpose="assistants")
+    key = json.dumps(config, sort_keys=True)
+    async with _assistant_lock:
+        if key not in _assistant_ids:
+            assistant = await get_async_client().beta.assistants.create(**config)
+            _assistant_ids[key] = assistant.id
+    return _assistant_ids[key]
 
-    print(file)
-    convo = db_session.query(Conversation).filter_by(id=conversation_id).first()
-    if convo:
-        convo.file_id = file.id
-        db_session.commit()
 
-    return file.id
+def _file_chat_state(conversation_id: str) -> tuple[str | None, str | None]:
+    with Session() as db:
+        convo = db.query(Conversation).filter_by(id=conversation_id).first()
+        return (convo.file_id, convo.thread_id) if convo else (None, None)
+
+
+def _save_thread(conversation_id: str, thread_id: str):
+    with Session() as db:
+        convo = db.query(Conversation).filter_by(id=conversation_id).first()
+        if convo:
+            convo.thread_id = thread_id
+            db.commit()
+
+
+async def _stream_run(thread_id: str, assistant_id: str, timeout: float):
+    """
+    Starts a run on a thread and streams the assistant's reply from the run's events.
+
+    Args:
+        thread_id (str): The thread holding the conversation.
+        assistant_id (str): The assistant to run.
+        timeout (float): Seconds the whole run may take; it is cancelled after that.
+
+    Yields:
+        str: Text deltas as the assistant writes them.
+
+    Raises:
+        TimeoutError: If the run did not finish in time.
+        RuntimeError: If the run failed, expired, was cancelled or needs tool outputs.
+    """
+    client = get_async_client()
+    deadline = time.monotonic() + timeout
+    run_id = None
+    stream = await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, stream=True)
+    async with stream:
+        events = aiter(stream)
+        while True:
+            try:
+                event = await asyncio.wait_for(anext(events), deadline - time.monotonic())
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                if run_id:
+                    await client.beta.threads.runs.cancel(run_id, thread_id=thread_id)
+                raise TimeoutError(f"The assistant did not answer within {timeout:g} s")
+            except asyncio.CancelledError:
+                # The client went away: stop the run rather than letting it finish unread
+                if run_id:
+                    await asyncio.shield(client.beta.threads.runs.cancel(run_id, thread_id=thread_id))
+                raise
+
+            if event.event == "thread.run.created":
+                run_id = event.data.id
+            elif event.event == "thread.message.delta":
+                for part in event.data.delta.content or []:
+                    if part.type == "text" and part.text and part.text.value:
+                        yield part.text.value
+            elif event.event in _RUN_FAILED:
+                error = event.data.last_error.message if event.data.last_error else event.data.status
+                raise RuntimeError(f"Assistant run {event.data.status}: {error}")
+
 
 async def get_response_with_file(conversation_id: str, user_message: str):
     """
     Streams a response from an OpenAI Assistant using file-based retrieval for the given conversation.
 
+    The assistant is shared by all conversations and each conversation keeps one thread (stored on
+    the conversation), so follow-up questions see the earlier turns and the file is attached only
+    once per thread.
+
     Args:
         conversation_id (str): The conversation ID linked to the uploaded file.
         user_message (str): The message to send to the Assistant.
 
     Yields:
-        str: Streaming tokens from the assistant's response via SSE.
-    """
-    convo = db_session.query(Conversation).filter_by(id=conversation_id).first()
-    file_id = convo.file_id if convo else None
-    version = get_version(conversation_id)
-
-    assistant = client.beta.assistants.create(
-        name="Knowledge Assistant",
-        instructions="Use the uploaded file to answer.",
-        tools=[{"type": "file_search"}],
-        model="gpt-3.5-turbo",
-    )
-
-    thread = client.beta.threads.create()
-    message = client.beta.threads.messages.create(
-        thread_id=thread.id,
-        role="user",
-        content=user_message,
-        attachments= [{ "file_id": file_id, "tools": [{"type": "file_search"}]}],
-    )
-    run = client.beta.threads.runs.create(thread_id=thread.id, assistant_id=assistant.id)
-
-    while True:
-        run_status = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-        if run_status.status == "completed":
-            break
-
-    messages = client.beta.threads.messages.list(thread_id=thread.id)
-    print(messages)
-    for msg in reversed(messages.data):
-        if msg.role == "assistant":
-            reply = msg.content[0].text.value
-            for token in reply:
-                yield f"data: {token}\n\n"
-            break
-
-
-def get_version(convo_id: str) -> str:
-    return db_session.query(Conversation).filter_by(id=convo_id).first().version
+        str: Text deltas of the assistant's response.
+    """
+    lock = _thread_locks.setdefault(conversation_id, asyncio.Lock())
+    try:
+        async with lock:
+            file_id, thread_id = await run_in_threadpool(_file_chat_state, conversation_id)
+            client = get_async_client()
+            assistant_id = await _file_assistant_id()
+
+            message = {"role": "user", "content": user_message}
+            if thread_id is None:
+                thread_id = (await client.beta.threads.create()).id
+                await run_in_threadpool(_save_thread, conversation_id, thread_id)
+                if file_id:
+                    message["attachments"] = [{"file_id": file_id, "tools": [{"type": "file_search"}]}]
+            await client.beta.threads.messages.create(thread_id=thread_id, **message)
+
+            async for token in _stream_run(thread_id, assistant_id, FILE_RUN_TIMEOUT):
+                yield token
+
+    except Exception as e:
+        yield f"[Error: {str(e)}]"
+
+
+def get_version(convo_id: str) -> str | None:
+    message_writer.wait_for(convo_id)
+    conversation = metadata_cache.conversation(convo_id)
+    return conversation["version"] if conversation else None
 
 
 
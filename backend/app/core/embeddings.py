@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "512"))
+
+_WORD = re.compile(r"\w+")
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns batches of texts into embedding vectors.
+
+    Subclasses implement `_embed_batch`; calling the provider splits the input into batches of
+    at most `max_batch_size` texts. Vectors from different providers live in different spaces,
+    so each provider stores its knowledge in its own collection (see `collection_name`).
+
+    Attributes:
+        name (str): Short identifier used in collection names and cache keys.
+        model_name (str): The model (or configuration) producing the vectors.
+        max_batch_size (int): Most texts sent to `_embed_batch` at once.
+    """
+
+    name = ""
+    model_name = ""
+    max_batch_size = 2048
+
+    def __call__(self, input: list[str]) -> list[np.ndarray]:
+        texts = list(input)
+        vectors = []
+        for start in range(0, len(texts), self.max_batch_size):
+            vectors.extend(self._embed_batch(texts[start:start + self.max_batch_size]))
+        return vectors
+
+    @abstractmethod
+    def _embed_batch(self, texts: list[str]) -> list[np.ndarray]:
+        """
+        Args:
+            texts (list[str]): At most `max_batch_size` texts.
+
+        Returns:
+            list[np.ndarray]: One vector per text, in order.
+        """
+
+    def collection_name(self, base: str) -> str:
+        """
+        Args:
+            base (str): Name of the collection for the default provider.
+
+        Returns:
+            str: The collection this provider's vectors are stored in.
+        """
+        return f"{base}-{self.name}"
+
+
+class OpenAIEmbeddings(EmbeddingProvider):
+    """
+    Embeddings from the OpenAI API.
+
+    Args:
+        model_name (str, optional): Embedding model. Defaults to OPENAI_EMBEDDING_MODEL.
+        api_key (str | None, optional): API key. Defaults to the OPENAI_API_KEY environment variable.
+    """
+
+    name = "openai"
+
+    def __init__(self, model_name: str = OPENAI_EMBEDDING_MODEL, api_key: str | None = None):
+        from openai import OpenAI
+
+        self.model_name = model_name
+        self._client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+
+    def _embed_batch(self, texts: list[str]) -> list[np.ndarray]:
+        response = self._client.embeddings.create(model=self.model_name, input=texts)
+        return [np.asarray(item.embedding, dtype=np.float32) for item in response.data]
+
+    def collection_name(self, base: str) -> str:
+        # Knowledge ingested before providers existed lives in the unsuffixed collection
+        return base
+
+
+@lru_cache(maxsize=65536)
+def _hash_feature(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashingEmbeddings(EmbeddingProvider):
+    """
+    Offline embeddings made by feature hashing, for tests, load tests and air-gapped setups.
+
+    Each text becomes a bag of lowercase words and padded character trigrams (so "password"
+    and "passwords" still overlap). Every feature is hashed to a signed bucket of a
+    `dim`-sized vector, the whole batch is accumulated with a single `np.bincount`, and counts
+    are log-scaled and L2-normalized. The hashes are stable across processes, and no network
+    or model files are needed.
+
+    Args:
+        dim (int, optional): Vector size. Defaults to LOCAL_EMBEDDING_DIM.
+    """
+
+    name = "local"
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM):
+        self.dim = dim
+        self.model_name = f"hashing-{dim}"
+
+    def collection_name(self, base: str) -> str:
+        return f"{base}-{self.name}-{self.dim}"
+
+    @staticmethod
+    def _features(text: str) -> list[str]:
+        features = []
+        for word in _WORD.findall(text.lower()):
+            features.append(word)
+            padded = f"#{word}#"
+            features.extend("~" + padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def _embed_batch(self, texts: list[str]) -> list[np.ndarray]:
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            rows.extend([row] * len(features))
+            hashes.extend(_hash_feature(feature) for feature in features)
+
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        buckets = (hashes % np.uint64(self.dim)).astype(np.int64)
+        signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+        flat = np.asarray(rows, dtype=np.int64) * self.dim + buckets
+        counts = np.bincount(flat, weights=signs, minlength=len(texts) * self.dim).reshape(len(texts), self.dim)
+
+        vectors = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = (vectors / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+        return list(vectors)
+
+
+PROVIDERS = {
+    "openai": OpenAIEmbeddings,
+    "local": HashingEmbeddings,
+}
+
+
+def get_embedding_provider(name: str = EMBEDDING_PROVIDER) -> EmbeddingProvider:
+    """
+    Builds the configured embedding provider.
+
+    Args:
+        name (str, optional): "openai" or "local". Defaults to the EMBEDDING_PROVIDER environment variable.
+
+    Returns:
+        EmbeddingProvider: The provider instance.
+    """
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown embedding provider {name!r}; expected one of {sorted(PROVIDERS)}") from None
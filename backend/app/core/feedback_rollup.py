@@ -0,0 +1,120 @@
+"""
+Per-version feedback rollups for the analytics endpoints.
+
+Usage (from backend/), to backfill or repair the rollup from the feedback table:
+    python -m app.core.feedback_rollup
+"""
+from sqlalchemy import case, func, insert
+from sqlalchemy.orm import Session
+from app.db.database import increment
+from app.db.models import Feedback, FeedbackRollup
+
+COUNTERS = ("total", "rated", "rating_sum", "thumbs_up", "thumbs_down")
+
+
+def _counts(rating: int | None) -> dict:
+    rating = rating or 0  # a neutral (0) rating counts towards the total but not the average
+    return {
+        "total": 1,
+        "rated": int(rating != 0),
+        "rating_sum": rating,
+        "thumbs_up": int(rating == 1),
+        "thumbs_down": int(rating == -1),
+    }
+
+
+def record(db: Session, version: str, new_rating: int, old_rating: int | None = None, is_new: bool = True):
+    """
+    Applies one feedback write to the version's rollup, in the caller's transaction.
+
+    The counters are incremented with an atomic upsert, so concurrent writers never lose an
+    update. Commit together with the feedback row to keep the two consistent.
+
+    Args:
+        db (Session): The session the feedback row is written with.
+        version (str): The feedback's A/B version.
+        new_rating (int): The rating being stored.
+        old_rating (int | None, optional): The rating it replaces, when an existing row is updated.
+        is_new (bool, optional): Whether a new feedback row was created. Defaults to True.
+    """
+    delta = _counts(new_rating)
+    if not is_new:
+        delta = {name: value - _counts(old_rating)[name] for name, value in delta.items()}
+        delta["total"] = 0
+    if not any(delta.values()):
+        return
+
+    increment(db, FeedbackRollup.__table__, {"version": version}, delta)
+
+
+def rebuild(db: Session) -> int:
+    """
+    Recomputes every rollup row from the feedback table in one transaction.
+
+    Args:
+        db (Session): The session to use; it is committed.
+
+    Returns:
+        int: The number of versions in the rollup.
+    """
+    totals = db.query(
+        Feedback.version,
+        func.count(Feedback.id),
+        func.count(func.nullif(Feedback.rating, 0)),
+        func.coalesce(func.sum(Feedback.rating), 0),
+        func.sum(case((Feedback.rating == 1, 1), else_=0)),
+        func.sum(case((Feedback.rating == -1, 1), else_=0)),
+    ).group_by(Feedback.version)
+
+    db.query(FeedbackRollup).delete()
+    db.execute(insert(FeedbackRollup.__table__).from_select(["version", *COUNTERS], totals))
+    db.commit()
+    return db.query(FeedbackRollup).count()
+
+
+def backfill(db: Session) -> bool:
+    """
+    Builds the rollup if it is empty while feedback exists, e.g. after upgrading a database.
+
+    Args:
+        db (Session): The session to use.
+
+    Returns:
+        bool: Whether the rollup was rebuilt.
+    """
+    if db.query(FeedbackRollup.version).first() or not db.query(Feedback.id).first():
+        return False
+    rebuild(db)
+    return True
+
+
+def summary(db: Session) -> list[dict]:
+    """
+    Reads the feedback summary of every version from the rollup.
+
+    Args:
+        db (Session): The session to use.
+
+    Returns:
+        list[dict]: One entry per version with its total, average score (ignoring neutral
+            ratings), thumbs up and down counts and their ratio.
+    """
+    return [
+        {
+            "version": row.version,
+            "total_feedback": row.total,
+            "average_score": round(row.rating_sum / row.rated, 2) if row.rated else 0,
+            "thumbs_up": row.thumbs_up,
+            "thumbs_down": row.thumbs_down,
+            "score_ratio": f"{row.thumbs_up}:{row.thumbs_down}",
+        }
+        for row in db.query(FeedbackRollup).order_by(FeedbackRollup.version)
+    ]
+
+
+if __name__ == "__main__":
+    from app.db.database import Session as SessionLocal, create_tables
+
+    create_tables()
+    with SessionLocal() as session:
+        print(f"Rebuilt feedback rollup for {rebuild(session)} versions")
@@ -0,0 +1,267 @@
+import logging
+import os
+import socket
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import BinaryIO
+from uuid import uuid4
+from sqlalchemy import and_, or_
+from app.core import knowledge_vector
+from app.db.database import Session
+from app.db.models import IngestionJob
+from app.utils.chunker import iter_chunks
+from app.utils.uploads import iter_text, save_stream
+
+logger = logging.getLogger(__name__)
+
+# Uploads are spooled here until their job has run
+INGEST_JOB_DIR = os.getenv("INGEST_JOB_DIR", "./ingestion_jobs")
+# Jobs processed at the same time; each one also embeds with up to INGEST_WORKERS requests
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+# Runs per job before it is marked failed, and seconds before the first retry (doubled each time)
+INGEST_JOB_ATTEMPTS = int(os.getenv("INGEST_JOB_ATTEMPTS", "3"))
+INGEST_RETRY_DELAY = float(os.getenv("INGEST_RETRY_DELAY", "2"))
+# Seconds without a heartbeat after which a running job is taken to have lost its worker
+INGEST_JOB_LEASE = float(os.getenv("INGEST_JOB_LEASE", "60"))
+
+# Identifies this process in the jobs it runs; several uvicorn workers may share the database
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+_PERMANENT_ERRORS = (ValueError, FileNotFoundError)  # includes UnicodeDecodeError
+
+_executor = None
+_executor_lock = threading.Lock()
+_topic_locks = weakref.WeakValueDictionary()  # a topic's jobs run one at a time
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=INGEST_JOB_WORKERS, thread_name_prefix="ingest")
+    return _executor
+
+
+def shutdown(wait: bool = False):
+    """
+    Stops the worker pool. Jobs that have not started stay queued and are resumed on the next start.
+
+    Args:
+        wait (bool, optional): Whether to wait for running jobs to finish. Defaults to False.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+
+
+def _job_dict(job: IngestionJob) -> dict:
+    return {
+        "job_id": job.id,
+        "topic": job.topic,
+        "filename": job.filename,
+        "status": job.status,
+        "attempts": job.attempts,
+        "chunks": job.chunks,
+        "added": job.added,
+        "skipped": job.skipped,
+        "deleted": job.deleted,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+def _update(job_id: str, **fields):
+    with Session() as db:
+        db.query(IngestionJob).filter_by(id=job_id).update(fields)
+        db.commit()
+
+
+def _claimable(now: datetime):
+    stale = now - timedelta(seconds=INGEST_JOB_LEASE)
+    orphaned = and_(IngestionJob.status == "running",
+                    or_(IngestionJob.heartbeat_at.is_(None), IngestionJob.heartbeat_at < stale))
+    return or_(IngestionJob.status == "queued", orphaned)
+
+
+def _claim(job_id: str) -> tuple[str, str, int] | None:
+    """
+    Takes ownership of a queued job, or of a running one whose worker stopped sending heartbeats.
+
+    The claim is a single conditional UPDATE, so when several workers try to run the same job
+    only one of them gets it.
+
+    Args:
+        job_id (str): The job to claim.
+
+    Returns:
+        tuple[str, str, int] | None: The job's topic, spooled file and attempts so far, or None
+            if it is finished or owned by a live worker.
+    """
+    now = datetime.utcnow()
+    with Session() as db:
+        claimed = db.query(IngestionJob).filter(IngestionJob.id == job_id, _claimable(now)) \
+            .update({"status": "running", "worker": WORKER_ID, "heartbeat_at": now}, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return None
+        job = db.query(IngestionJob).filter_by(id=job_id).first()
+        return job.topic, job.path, job.attempts or 0
+
+
+def _keep_alive(job_id: str, stop: threading.Event):
+    while not stop.wait(INGEST_JOB_LEASE / 3):
+        try:
+            _update(job_id, heartbeat_at=datetime.utcnow())
+        except Exception:
+            logger.exception("Heartbeat of ingestion job %s failed", job_id)
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, _PERMANENT_ERRORS):
+        return False
+    # API errors: client errors other than timeouts and rate limits will fail again
+    status = getattr(error, "status_code", None)
+    return status is None or status in (408, 409, 429) or status >= 500
+
+
+def _ingest(job_id: str, topic: str, path: str) -> dict:
+    read = 0
+
+    def counted(chunks):
+        nonlocal read
+        for chunk in chunks:
+            read += 1
+            yield chunk
+
+    def progress(stats):
+        _update(job_id, chunks=read, **stats)
+
+    with open(path, "rb") as source:
+        stats = knowledge_vector.add_knowledge_chunks(topic, counted(iter_chunks(iter_text(source))), progress)
+    return {"chunks": read, **stats}
+
+
+def run_job(job_id: str):
+    """
+    Processes a queued ingestion job, retrying transient failures with exponential backoff.
+
+    The job is only run if this worker can claim it (see `_claim`), and its heartbeat is kept
+    fresh while it runs. Re-running a partly processed job is safe: chunks that were already
+    stored are skipped.
+
+    Args:
+        job_id (str): The job to run.
+    """
+    with Session() as db:
+        topic = db.query(IngestionJob.topic).filter_by(id=job_id).scalar()
+    if topic is None:
+        return
+
+    lock = _topic_locks.setdefault(topic, threading.Lock())
+    with lock:
+        # Claimed only once the topic is free, so waiting here never lets the heartbeat go stale
+        claim = _claim(job_id)
+        if claim is None:
+            return
+        topic, path, attempts = claim
+        stop = threading.Event()
+        threading.Thread(target=_keep_alive, args=(job_id, stop), name=f"ingest-heartbeat-{job_id}",
+                         daemon=True).start()
+        try:
+            _run_attempts(job_id, topic, path, attempts)
+        finally:
+            stop.set()
+
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _run_attempts(job_id: str, topic: str, path: str, attempts: int):
+    while True:
+        attempts += 1
+        _update(job_id, status="running", attempts=attempts, error=None)
+        try:
+            stats = _ingest(job_id, topic, path)
+        except Exception as e:
+            if _is_transient(e) and attempts < INGEST_JOB_ATTEMPTS:
+                logger.warning("Ingestion job %s failed (attempt %d), retrying: %s", job_id, attempts, e)
+                _update(job_id, error=str(e))
+                time.sleep(INGEST_RETRY_DELAY * 2 ** (attempts - 1))
+                continue
+            logger.exception("Ingestion job %s failed", job_id)
+            _update(job_id, status="failed", error=str(e))
+            break
+        _update(job_id, status="done", **stats)
+        break
+
+
+def enqueue(topic: str, filename: str, source: BinaryIO) -> dict:
+    """
+    Spools an upload to disk, records an ingestion job for it and hands it to the worker pool.
+
+    Blocking; call it from a worker thread in request handlers.
+
+    Args:
+        topic (str): The topic the document belongs to.
+        filename (str): The uploaded file's name.
+        source (BinaryIO): The document's bytes, e.g. `UploadFile.file`.
+
+    Returns:
+        dict: The new job's status.
+    """
+    os.makedirs(INGEST_JOB_DIR, exist_ok=True)
+    job_id = str(uuid4())
+    path = os.path.join(INGEST_JOB_DIR, job_id)
+    save_stream(source, path)
+    with Session() as db:
+        job = IngestionJob(id=job_id, topic=topic, filename=filename, path=path, status="queued",
+                           attempts=0, chunks=0, added=0, skipped=0, deleted=0)
+        db.add(job)
+        db.commit()
+        status = _job_dict(job)
+    get_executor().submit(run_job, job_id)
+    return status
+
+
+def get_job(job_id: str) -> dict | None:
+    """
+    Looks up an ingestion job.
+
+    Args:
+        job_id (str): The job's ID.
+
+    Returns:
+        dict | None: The job's status and progress counts, or None if there is no such job.
+    """
+    with Session() as db:
+        job = db.query(IngestionJob).filter_by(id=job_id).first()
+        return _job_dict(job) if job else None
+
+
+def resume_jobs() -> int:
+    """
+    Re-enqueues the queued jobs and the running jobs whose worker is gone.
+
+    A running job still owned by a live worker (its heartbeat is within INGEST_JOB_LEASE) is
+    left alone, so restarting one of several workers does not run other workers' jobs twice.
+
+    Returns:
+        int: The number of jobs resumed.
+    """
+    with Session() as db:
+        pending = db.query(IngestionJob).filter(_claimable(datetime.utcnow())) \
+            .order_by(IngestionJob.created_at).all()
+        job_ids = [job.id for job in pending]
+    for job_id in job_ids:
+        get_executor().submit(run_job, job_id)
+    if job_ids:
+        logger.info("Resumed %d ingestion jobs", len(job_ids))
+    return len(job_ids)
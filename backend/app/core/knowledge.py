@@ -1,10 +1,82 @@
-from app.db.database import db_session
+import threading
+
+from app.core.metadata_cache import KEYWORDS, metadata_cache
+from app.db.database import Session
 from app.db.models import Knowledge
 from app.schemas.knowledge import KnowledgeBase, KnowledgeUpdate
+from app.utils.aho_corasick import AhoCorasick
+
+
+class KeywordMatcher:
+    """
+    In-memory index of the keyword knowledge entries.
+
+    Keywords are compiled into an Aho-Corasick automaton, so matching a message costs one pass
+    over it however many keywords exist. Entries are loaded from the database on first use. The
+    knowledge endpoints apply their changes here in place and bump the shared KEYWORDS counter;
+    other workers reload every entry once they see the counter move, within
+    METADATA_CACHE_CHECK_INTERVAL. Added or removed keywords recompile the whole automaton on
+    the next search. When several keywords occur in a message the entry with the lowest id wins,
+    the order the table scan used to return them in.
+    """
+
+    def __init__(self):
+        self._entries = None  # id -> (lowercase keyword, content); None until loaded
+        self._automaton = None
+        self._version = None  # KEYWORDS counter the entries were loaded at
+        self._lock = threading.Lock()
+
+    def _load(self, version: int):
+        with Session() as db:
+            rows = db.query(Knowledge.id, Knowledge.keyword, Knowledge.content).all()
+        self._entries = {entry_id: (keyword.lower(), content) for entry_id, keyword, content in rows}
+        self._automaton = None
+        self._version = version
+
+    def reload(self):
+        """Re-reads every entry from the database."""
+        version = metadata_cache.version(KEYWORDS)
+        with self._lock:
+            self._load(version)
+
+    def add(self, entry: Knowledge):
+        with self._lock:
+            if self._entries is not None:
+                self._entries[entry.id] = (entry.keyword.lower(), entry.content)
+                self._automaton = None
+
+    def update(self, entry: Knowledge):
+        with self._lock:
+            if self._entries is not None and entry.id in self._entries:
+                self._entries[entry.id] = (self._entries[entry.id][0], entry.content)
+
+    def remove(self, entry_id: int):
+        with self._lock:
+            if self._entries is not None and self._entries.pop(entry_id, None) is not None:
+                self._automaton = None
+
+    def match(self, user_msg: str) -> str | None:
+        """
+        Args:
+            user_msg (str): The user's message.
+
+        Returns:
+            str | None: Content of the first entry whose keyword occurs in the message, or None.
+        """
+        version = metadata_cache.version(KEYWORDS)
+        with self._lock:
+            if self._entries is None or version > self._version:
+                self._load(version)
+            if self._automaton is None:
+                self._automaton = AhoCorasick(
+                    (keyword, entry_id) for entry_id, (keyword, _) in self._entries.items()
+                )
+            entry_id = self._automaton.search(user_msg.lower())
+            return None if entry_id is None else self._entries[entry_id][1]
+
+
+keyword_matcher = KeywordMatcher()
+
 
 def search_knowledge(user_msg: str) -> str | None:
-    entries = db_session.query(Knowledge).all()
-    for entry in entries:
-        if entry.keyword.lower() in user_msg.lower():
-            return entry.content
-    return None
\ No newline at end of file
+    return keyword_matcher.match(user_msg)
\ No newline at end of file
@@ -1,30 +1,179 @@
+import hashlib
 import os
-from openai import OpenAI, api_key
-import chromadb
-from chromadb import PersistentClient
-from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+import re
+import string
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable
 import numpy as np
+from app.core.embeddings import get_embedding_provider
+from app.core.metadata_cache import KNOWLEDGE, bump, metadata_cache
+from app.core.semantic_cache import semantic_cache
+from app.db import database
+from app.db.models import CacheVersion
+from app.utils.bm25 import BM25Index, tokenize
+from app.utils.cache import LRUCache
+from app.utils import query_normalizer
 
-import nltk
-import string
-from nltk.corpus import stopwords
-nltk.download('punkt')
-nltk.download('punkt_tab')
-nltk.download('stopwords')
-nltk.download('wordnet')
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./chromadb")
+
+# Searched in addition to NLTK's default locations; resources that are missing everywhere are
+# downloaded here once, so a deployment can also ship them pre-vendored.
+NLTK_DATA_DIR = os.getenv("NLTK_DATA_DIR", "./nltk_data")
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+}
+
+# "regex" (default) reproduces NLTK's tokenization with precompiled patterns and needs no
+# NLTK data; "nltk" runs nltk.word_tokenize itself.
+QUERY_NORMALIZER = os.getenv("QUERY_NORMALIZER", "regex").lower()
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# A lexical hit scoring this many times the runner-up, and matching every query term or an
+# identifier such as an error code, is answered without embedding the query; 0 disables it.
+LEXICAL_FAST_PATH_RATIO = float(os.getenv("LEXICAL_FAST_PATH_RATIO", "2.0"))
+_IDENTIFIER = re.compile(r"\d|[-_.:/]")
+
+# Query embeddings keyed by (model, normalized query); repeated questions skip the API call.
+embedding_cache = LRUCache(
+    maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+)
 
+# Heavy resources are created on first use by the getters below (or by the startup warm-up),
+# so importing this module stays cheap. Tests and benchmarks may assign them directly.
+stop_words = None
+embedding_fn = None  # selected with EMBEDDING_PROVIDER ("openai" or the offline "local" backend)
+chroma_client = None
+collection = None
+lexical_index = None  # BM25 over the same chunks, kept in sync by ingestion
+lexical_version = 0  # KNOWLEDGE counter the lexical index reflects
+_init_lock = threading.RLock()
+_lexical_lock = threading.RLock()
+
+
+def load_nlp_resources() -> set[str]:
+    """
+    Makes the NLTK data available, downloading missing resources into NLTK_DATA_DIR.
+
+    Returns:
+        set[str]: The English stop words.
+    """
+    global stop_words
+    with _init_lock:
+        if stop_words is None:
+            import nltk
 
-stop_words = set(stopwords.words('english'))
+            if NLTK_DATA_DIR not in nltk.data.path:
+                nltk.data.path.append(NLTK_DATA_DIR)
+            for name, path in NLTK_RESOURCES.items():
+                try:
+                    nltk.data.find(path)
+                except LookupError:
+                    nltk.download(name, download_dir=NLTK_DATA_DIR, quiet=True)
+            from nltk.corpus import stopwords
 
-api_key = os.getenv("OPENAI_API_KEY")
+            stop_words = set(stopwords.words('english'))
+    return stop_words
 
-client = OpenAI(api_key=api_key)
 
-chroma_client = PersistentClient(path="./chromadb")
+def get_embedding_fn():
+    global embedding_fn
+    with _init_lock:
+        if embedding_fn is None:
+            embedding_fn = get_embedding_provider()
+    return embedding_fn
 
-embedding_fn = OpenAIEmbeddingFunction(api_key=api_key, model_name="text-embedding-3-small")
 
-collection = chroma_client.get_or_create_collection(name="knowledge", embedding_function=embedding_fn)
+def get_collection():
+    global chroma_client, collection
+    with _init_lock:
+        if collection is None:
+            from chromadb import PersistentClient
+
+            chroma_client = PersistentClient(path=CHROMA_PATH)
+            # Embeddings are always computed by `embedding_fn` and passed in explicitly
+            collection = chroma_client.get_or_create_collection(
+                name=get_embedding_fn().collection_name("knowledge"), embedding_function=None
+            )
+    return collection
+
+
+def build_lexical_index(page_size: int = 1000) -> int:
+    """
+    Loads every stored chunk into a fresh in-memory BM25 index.
+
+    Searches go on using the previous index until the new one replaces it.
+
+    Args:
+        page_size (int, optional): Chunks read from the vector store per request. Defaults to 1000.
+
+    Returns:
+        int: Number of indexed chunks.
+    """
+    global lexical_index, lexical_version
+    with _lexical_lock:
+        version = metadata_cache.version(KNOWLEDGE)
+        index = BM25Index()
+        offset = 0
+        while True:
+            page = get_collection().get(limit=page_size, offset=offset, include=["documents"])
+            index.add(page["ids"], page["documents"])
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+        lexical_index, lexical_version = index, version
+    return len(index)
+
+
+def get_lexical_index() -> BM25Index:
+    """
+    Returns the lexical index, rebuilding it once another worker changed the knowledge base.
+
+    Workers see each other's changes through the shared KNOWLEDGE counter, within
+    METADATA_CACHE_CHECK_INTERVAL.
+
+    Returns:
+        BM25Index: The index.
+    """
+    if lexical_index is None:
+        with _lexical_lock:
+            if lexical_index is None:
+                build_lexical_index()
+    elif metadata_cache.version(KNOWLEDGE) > lexical_version and _lexical_lock.acquire(blocking=False):
+        # One thread rebuilds while the others keep searching the current index
+        try:
+            if metadata_cache.version(KNOWLEDGE) > lexical_version:
+                build_lexical_index()
+        finally:
+            _lexical_lock.release()
+    return lexical_index
+
+
+def _publish_change(index: BM25Index):
+    """
+    Bumps the shared KNOWLEDGE counter, so that other workers rebuild their lexical index.
+
+    Args:
+        index (BM25Index): The index the change was applied to in place.
+    """
+    global lexical_version
+    with database.Session() as db:
+        bump(db, KNOWLEDGE)
+        version = db.query(CacheVersion.version).filter_by(name=KNOWLEDGE).scalar()
+        db.commit()
+    with _lexical_lock:
+        # Unless another worker changed the knowledge base meanwhile, this index is up to date
+        if index is lexical_index and version == lexical_version + 1:
+            lexical_version = version
 
 
 def normalize_query(query: str) -> str:
@@ -37,6 +186,12 @@ def normalize_query(query: str) -> str:
     Returns:
         str: The normalized query without stop words and punctuation removed.
     """
+    if QUERY_NORMALIZER != "nltk":
+        return query_normalizer.normalize(query)
+
+    stop_words = load_nlp_resources()
+    import nltk
+
     tokens = nltk.word_tokenize(query.lower())
     cleaned_tokens = [
         token for token in tokens
@@ -45,69 +200,283 @@ def normalize_query(query: str) -> str:
     return " ".join(cleaned_tokens)
 
 
-def mmr(query_embedding, doc_embeddings, lambda_param=0.5, top_n=3):
+def normalize_queries(queries: Iterable[str]) -> list[str]:
+    """
+    Normalize several queries, see `normalize_query`.
+
+    Args:
+        queries (Iterable[str]): The input query strings.
+
+    Returns:
+        list[str]: The normalized queries, in order.
+    """
+    if QUERY_NORMALIZER != "nltk":
+        return query_normalizer.normalize_batch(queries)
+    return [normalize_query(query) for query in queries]
+
+
+def mmr(query_embedding, doc_embeddings, lambda_param=0.5, top_n=3, relevance=None):
     """
     Maximal Marginal Relevance (MMR) algorithm.
+
+    Args:
+        query_embedding: Embedding of the query.
+        doc_embeddings: Embeddings of the candidate documents, one per row.
+        lambda_param (float, optional): Trade-off between relevance (1.0) and diversity (0.0). Defaults to 0.5.
+        top_n (int, optional): Number of documents to select. Defaults to 3.
+        relevance (optional): Relevance of each candidate in [0, 1], used instead of its
+            cosine similarity to the query (e.g. fused hybrid scores). Defaults to None.
+
+    Returns:
+        list[int]: Indices of the selected documents, in selection order.
     """
-    selected = []
-    remaining = list(range(len(doc_embeddings)))
+    if relevance is not None:
+        relevance = [relevance]
+    return mmr_batch([query_embedding], doc_embeddings, lambda_param, top_n, relevance)[0]
+
 
-    doc_sim = np.dot(doc_embeddings, query_embedding)
-    doc_sim = doc_sim / (np.linalg.norm(doc_embeddings, axis=1) * np.linalg.norm(query_embedding) + 1e-8)
+def mmr_batch(query_embeddings, doc_embeddings, lambda_param=0.5, top_n=3, relevance=None):
+    """
+    Runs MMR for several queries over the same candidate pool.
 
-    while len(selected) < top_n and remaining:
-        mmr_score = []
-        for i in remaining:
-            if not selected:
-                diversity_penalty = 0
-            else:
-                selected_embeds = [doc_embeddings[j] for j in selected]
-                redundancy = max([np.dot(doc_embeddings[i], doc_embeddings[j]) /
-                                  (np.linalg.norm(doc_embeddings[i]) * np.linalg.norm(doc_embeddings[j]) + 1e-8)
-                                  for j in selected])
-                diversity_penalty = redundancy
+    Norms are computed once, and each row of the candidate-candidate cosine similarity matrix
+    is computed the first time a candidate is selected and then shared by all queries. Each
+    selection step only updates a running max-redundancy vector, so a query costs
+    O(top_n * k) vectorized work instead of O(top_n^2 * k) Python loops, and the full k x k
+    matrix is never built when only a few candidates are picked.
 
-            score = lambda_param * doc_sim[i] - (1 - lambda_param) * diversity_penalty
-            mmr_score.append(score)
+    Args:
+        query_embeddings: Query embeddings, one per row.
+        doc_embeddings: Embeddings of the candidate documents, one per row.
+        lambda_param (float, optional): Trade-off between relevance (1.0) and diversity (0.0). Defaults to 0.5.
+        top_n (int, optional): Number of documents to select per query. Defaults to 3.
+        relevance (optional): Per-query candidate relevance in [0, 1], one row per query, used
+            instead of cosine similarity to the query. Defaults to None.
+
+    Returns:
+        list[list[int]]: For each query, indices of the selected documents in selection order.
+    """
+    queries = np.atleast_2d(np.asarray(query_embeddings, dtype=float))
+    docs = np.asarray(doc_embeddings, dtype=float)
+    if docs.size == 0:
+        return [[] for _ in queries]
 
-        next_idx = remaining[np.argmax(mmr_score)]
-        selected.append(next_idx)
-        remaining.remove(next_idx)
+    doc_norms = np.linalg.norm(docs, axis=1)
+    if relevance is None:
+        query_norms = np.linalg.norm(queries, axis=1)
+        doc_sim = np.dot(docs, queries.T).T / (np.outer(query_norms, doc_norms) + 1e-8)
+    else:
+        doc_sim = np.atleast_2d(np.asarray(relevance, dtype=float))
+    pair_sim = {}
 
-    return selected
+    def similarity_row(j):
+        if j not in pair_sim:
+            pair_sim[j] = np.dot(docs, docs[j]) / (doc_norms * doc_norms[j] + 1e-8)
+        return pair_sim[j]
+
+    results = []
+    for relevance in lambda_param * doc_sim:
+        selected = []
+        scores = relevance.copy()
+        redundancy = None
+        while len(selected) < min(top_n, len(docs)):
+            # argmax returns the lowest index among ties, like scanning candidates in order
+            next_idx = int(np.argmax(scores))
+            selected.append(next_idx)
+
+            row = similarity_row(next_idx)
+            redundancy = row if redundancy is None else np.maximum(redundancy, row)
+            scores = relevance - (1 - lambda_param) * redundancy
+            scores[selected] = -np.inf
+        results.append(selected)
+
+    return results
+
+
+def embed_query(query: str):
+    """
+    Embeds an already normalized query, going through the LRU embedding cache.
 
+    Args:
+        query (str): The normalized query text.
+
+    Returns:
+        The query embedding.
+    """
+    embed = get_embedding_fn()
+    key = (embed.model_name, query)
+    embedding = embedding_cache.get(key)
+    if embedding is None:
+        embedding = embed([query])[0]
+        embedding_cache.set(key, embedding)
+    return embedding
+
+
+def chunk_id(topic: str, chunk: str) -> str:
+    """
+    Builds a stable ID from the chunk's content, so unchanged chunks map to existing entries.
+
+    Args:
+        topic (str): The topic the chunk belongs to.
+        chunk (str): The chunk text.
+
+    Returns:
+        str: The chunk ID.
+    """
+    return f"{topic}-{hashlib.sha256(chunk.encode('utf-8')).hexdigest()[:32]}"
 
-def add_knowledge_chunks(topic: str, chunks: list[str]):
-    ids = [f"{topic}-{i}" for i in range(len(chunks))]
-    collection.add(documents=chunks, metadatas=[{"topic": topic} for _ in chunks], ids=ids)
+
+def _batched(items: Iterable, size: int):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def add_knowledge_chunks(topic: str, chunks: Iterable[str], progress: Callable[[dict], None] | None = None) -> dict:
+    """
+    Idempotently ingests a topic's chunks into the vector store.
+
+    Chunks get content-hash IDs. Those already stored are skipped without being embedded, new
+    ones are embedded in batches of INGEST_BATCH_SIZE by up to INGEST_WORKERS parallel requests
+    and upserted, and chunks previously stored for the topic that are no longer present are
+    deleted. `chunks` may be a generator; only a few batches are held in memory at a time.
+
+    Args:
+        topic (str): The topic the document belongs to.
+        chunks (Iterable[str]): The document's chunks, in order.
+        progress (Callable[[dict], None], optional): Called with the counts so far after every
+            batch that was skipped or stored.
+
+    Returns:
+        dict: Counts of chunks "added", "skipped" (unchanged) and "deleted" (stale).
+    """
+    stats = {"added": 0, "skipped": 0, "deleted": 0}
+    seen = set()
+    collection, embed, lexical_index = get_collection(), get_embedding_fn(), get_lexical_index()
+
+    def upsert(ids, documents, embeddings):
+        collection.upsert(
+            ids=ids,
+            documents=documents,
+            embeddings=embeddings.result(),
+            metadatas=[{"topic": topic} for _ in ids],
+        )
+        lexical_index.add(ids, documents)
+        stats["added"] += len(ids)
+        if progress:
+            progress(dict(stats))
+
+    try:
+        with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+            in_flight = deque()
+            for batch in _batched(chunks, INGEST_BATCH_SIZE):
+                batch_ids = {}
+                for chunk in batch:
+                    cid = chunk_id(topic, chunk)
+                    if cid not in seen:
+                        seen.add(cid)
+                        batch_ids[cid] = chunk
+                if not batch_ids:
+                    continue
+
+                existing = set(collection.get(ids=list(batch_ids), include=[])["ids"])
+                stats["skipped"] += len(existing)
+                if existing and progress:
+                    progress(dict(stats))
+                new_ids = [cid for cid in batch_ids if cid not in existing]
+                if new_ids:
+                    documents = [batch_ids[cid] for cid in new_ids]
+                    in_flight.append((new_ids, documents, pool.submit(embed, documents)))
+                while len(in_flight) >= INGEST_WORKERS:
+                    upsert(*in_flight.popleft())
+
+            while in_flight:
+                upsert(*in_flight.popleft())
+
+        stored = collection.get(where={"topic": topic}, include=[])["ids"]
+        stale = [cid for cid in stored if cid not in seen]
+        for batch in _batched(stale, INGEST_BATCH_SIZE):
+            collection.delete(ids=batch)
+            lexical_index.remove(batch)
+            stats["deleted"] += len(batch)
+    finally:
+        # Also after a failure part way, as the chunks stored so far are searchable
+        if stats["added"] or stats["deleted"]:
+            _publish_change(lexical_index)
+            # Cached answers may be based on what the knowledge base used to say
+            semantic_cache.invalidate()
+    return stats
+
+
+def _is_decisive(query: str, lexical: list[tuple[str, float, float]]) -> bool:
+    if LEXICAL_FAST_PATH_RATIO <= 0 or not lexical:
+        return False
+    doc_id, best, coverage = lexical[0]
+    runner_up = lexical[1][1] if len(lexical) > 1 else 0.0
+    if best < LEXICAL_FAST_PATH_RATIO * runner_up:
+        return False
+    if coverage == 1.0:
+        return True
+    matched = set(tokenize(query)) & set(tokenize(get_lexical_index().document(doc_id) or ""))
+    return any(len(term) >= 3 and _IDENTIFIER.search(term) for term in matched)
 
 
 def search_knowledge_vector(query: str, top_k: int = 5) -> list[str]:
     """
-    Searches the vector store for knowledge chunks most relevant to the query using MMR selection.
+    Searches the knowledge base for the chunks most relevant to the query.
+
+    Dense (vector) and lexical (BM25) candidates are merged with reciprocal rank fusion and
+    MMR picks a relevant but diverse subset. When BM25 alone is decisive (the top chunk clearly
+    outscores the rest and holds every query term or an exact code such as "E-1234"), the
+    lexical results are returned without embedding the query at all.
 
     Args:
         query (str): The user's natural language question.
-        top_k (int, optional): Number of initial results to retrieve from the vector store. Defaults to 5.
+        top_k (int, optional): Number of initial results to retrieve from each index. Defaults to 5.
 
     Returns:
         list[str]: A list of top relevant text chunks selected using MMR.
     """
     query = normalize_query(query)
-    #print(query)
+    collection, lexical_index = get_collection(), get_lexical_index()
+    lexical = lexical_index.search(query, top_k) if HYBRID_SEARCH else []
+    if _is_decisive(query, lexical):
+        documents = [lexical_index.document(doc_id) for doc_id, _, _ in lexical[:3]]
+        return [doc for doc in documents if doc is not None]
+
+    # Embed once and reuse the vector for both the Chroma query and MMR.
+    query_embed = embed_query(query)
     results = collection.query(
-        query_texts=[query],
+        query_embeddings=[query_embed],
         n_results=top_k,
-        include=["documents", "distances", "embeddings"]
+        include=["documents", "embeddings"]
     )
-    
-    if not results["documents"] or not results["documents"][0]:
-        return []
-        
-    documents = results["documents"][0]
-    embeddings = np.array(results["embeddings"][0])
-    query_embed = collection._embedding_function(query)[0]
+    ids = results["ids"][0] if results["ids"] else []
+    documents = dict(zip(ids, results["documents"][0])) if ids else {}
+    embeddings = dict(zip(ids, results["embeddings"][0])) if ids else {}
+
+    if not lexical:
+        if not ids:
+            return []
+        selected_indices = mmr(query_embed, np.array([embeddings[i] for i in ids]), 0.5, 3)
+        return [documents[ids[i]] for i in selected_indices]
 
-    selected_indices = mmr(query_embed, embeddings, 0.5, 3)
+    fused = {}
+    for ranking in (ids, [doc_id for doc_id, _, _ in lexical]):
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
 
-    return [documents[i] for i in selected_indices]
+    missing = [doc_id for doc_id in fused if doc_id not in embeddings]
+    if missing:
+        extra = collection.get(ids=missing, include=["documents", "embeddings"])
+        documents.update(zip(extra["ids"], extra["documents"]))
+        embeddings.update(zip(extra["ids"], extra["embeddings"]))
+
+    candidates = sorted((doc_id for doc_id in fused if doc_id in embeddings), key=lambda d: -fused[d])
+    if not candidates:
+        return []
+    relevance = np.array([fused[doc_id] for doc_id in candidates])
+    selected_indices = mmr(
+        query_embed, np.array([embeddings[d] for d in candidates]), 0.5, 3, relevance / relevance.max()
+    )
+    return [documents[candidates[i]] for i in selected_indices]
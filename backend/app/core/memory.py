@@ -0,0 +1,137 @@
+import os
+from functools import lru_cache
+
+import tiktoken
+from sqlalchemy.orm import Session
+
+from app.db.models import Message
+from app.utils.cache import LRUCache
+
+MEMORY_MAX_CONVERSATIONS = int(os.getenv("CONVERSATION_MEMORY_MAX", "1000"))
+MEMORY_TTL_SECONDS = float(os.getenv("CONVERSATION_MEMORY_TTL", "3600"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONVERSATION_CONTEXT_TOKENS", "3000"))
+
+# Per-message overhead of the chat format (role, separators), as counted by OpenAI.
+TOKENS_PER_MESSAGE = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding():
+    return tiktoken.encoding_for_model("gpt-3.5-turbo")
+
+
+def count_tokens(messages: list[dict]) -> int:
+    """
+    Counts the prompt tokens used by a list of chat messages.
+
+    Args:
+        messages (list[dict]): Messages with "role" and "content" keys.
+
+    Returns:
+        int: Approximate number of prompt tokens.
+    """
+    enc = _encoding()
+    return sum(TOKENS_PER_MESSAGE + len(enc.encode(m["content"])) for m in messages)
+
+
+def trim_history(messages: list[dict], budget: int = CONTEXT_TOKEN_BUDGET) -> list[dict]:
+    """
+    Drops the oldest turns so the history fits in the token budget.
+
+    The leading system prompt and the most recent message are always kept.
+
+    Args:
+        messages (list[dict]): The conversation, starting with the system prompt.
+        budget (int, optional): Maximum prompt tokens. Defaults to CONTEXT_TOKEN_BUDGET.
+
+    Returns:
+        list[dict]: A new list with the system prompt followed by the newest turns that fit.
+    """
+    if not messages:
+        return []
+    head, turns = messages[:1], messages[1:]
+    used = count_tokens(head)
+    kept = []
+    for message in reversed(turns):
+        used += count_tokens([message])
+        if used > budget and kept:
+            break
+        kept.append(message)
+    return head + kept[::-1]
+
+
+class ConversationMemory:
+    """
+    Bounded per-process store of recent conversation histories.
+
+    Histories are kept in an LRU cache with a TTL and trimmed to the context budget, so memory
+    stays flat however many conversations exist. Evicted conversations are rebuilt from the
+    persisted `Message` rows the next time they are used.
+
+    Args:
+        maxsize (int, optional): Maximum conversations kept in memory. Defaults to MEMORY_MAX_CONVERSATIONS.
+        ttl (float, optional): Seconds an idle conversation stays cached. Defaults to MEMORY_TTL_SECONDS.
+        budget (int, optional): Token budget for each stored history. Defaults to CONTEXT_TOKEN_BUDGET.
+    """
+
+    def __init__(self, maxsize: int = MEMORY_MAX_CONVERSATIONS, ttl: float = MEMORY_TTL_SECONDS,
+                 budget: int = CONTEXT_TOKEN_BUDGET):
+        self.budget = budget
+        self._cache = LRUCache(maxsize, ttl)
+        self._context_tokens = LRUCache(maxsize, ttl)
+
+    def load(self, db: Session, convo_id: str, system_prompt: str) -> list[dict]:
+        """
+        Returns the history for a conversation, rehydrating it from the database on a miss.
+
+        Args:
+            db (Session): Session used to read `Message` rows on a cache miss.
+            convo_id (str): Unique identifier of the conversation.
+            system_prompt (str): Prompt to put first when the history is rebuilt.
+
+        Returns:
+            list[dict]: A copy of the history that the caller may extend.
+        """
+        messages = self._cache.get(convo_id)
+        if messages is None:
+            rows = (
+                db.query(Message.role, Message.content)
+                .filter(Message.conversation_id == convo_id)
+                .order_by(Message.timestamp, Message.id)
+                .all()
+            )
+            messages = trim_history(
+                [{"role": "system", "content": system_prompt}]
+                + [{"role": role, "content": content} for role, content in rows],
+                self.budget,
+            )
+            self._cache.set(convo_id, messages)
+        return list(messages)
+
+    def save(self, convo_id: str, messages: list[dict]):
+        self._cache.set(convo_id, trim_history(messages, self.budget))
+
+    def forget(self, convo_id: str):
+        self._cache.pop(convo_id)
+        self._context_tokens.pop(convo_id)
+
+    def record_context(self, convo_id: str, tokens: int) -> int:
+        """
+        Records the size of a turn's ephemeral knowledge context.
+
+        Args:
+            convo_id (str): Unique identifier of the conversation.
+            tokens (int): Prompt tokens used by this turn's retrieved context.
+
+        Returns:
+            int: Tokens of earlier turns' contexts that this request no longer resends.
+        """
+        earlier = self._context_tokens.get(convo_id, 0)
+        self._context_tokens.set(convo_id, earlier + tokens)
+        return earlier
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from sqlalchemy.orm import Session
+from app.db import database
+from app.db.database import increment
+from app.db.models import CacheVersion, Conversation, PromptConfig
+from app.utils.cache import LRUCache
+
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "10000"))
+# Seconds between reads of the shared version counters; writes made by other workers are
+# picked up within this time.
+METADATA_CACHE_CHECK_INTERVAL = float(os.getenv("METADATA_CACHE_CHECK_INTERVAL", "1"))
+
+PROMPTS = "prompts"
+CONVERSATIONS = "conversations"
+# Counters of caches kept outside MetadataCache, which read them through `version`
+KEYWORDS = "keywords"
+KNOWLEDGE = "knowledge"
+
+
+def bump(db: Session, name: str):
+    """
+    Increments a shared cache version counter in the caller's transaction.
+
+    Args:
+        db (Session): The session the cached data is written with.
+        name (str): PROMPTS, CONVERSATIONS or another shared cache's counter, e.g. KEYWORDS.
+    """
+    increment(db, CacheVersion.__table__, {"name": name}, {"version": 1})
+
+
+class MetadataCache:
+    """
+    Read-through cache of the prompt configs and of conversation metadata (version, file ID).
+
+    Writers bump a version counter stored in the database next to their change; every worker
+    re-reads the counters at most once per `check_interval` and drops what they invalidated,
+    so between checks a chat turn needs no queries at all. A conversation is only cached once
+    it has a version, which never changes afterwards.
+
+    Args:
+        maxsize (int, optional): Maximum conversations kept. Defaults to METADATA_CACHE_SIZE.
+        check_interval (float, optional): Seconds between counter checks. Defaults to
+            METADATA_CACHE_CHECK_INTERVAL.
+        session_factory (callable, optional): Creates sessions for reads. Defaults to
+            `app.db.database.Session`.
+    """
+
+    def __init__(self, maxsize: int = METADATA_CACHE_SIZE, check_interval: float = METADATA_CACHE_CHECK_INTERVAL,
+                 session_factory=None):
+        self.check_interval = check_interval
+        self._session_factory = session_factory
+        self._prompts = None
+        self._conversations = LRUCache(maxsize)
+        self._versions = {}  # counter name -> value at the last check
+        self._generations = {PROMPTS: 0, CONVERSATIONS: 0}  # bumped on every local clear
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _session(self):
+        return (self._session_factory or database.Session)()
+
+    def _clear(self, name: str):
+        self._generations[name] += 1
+        if name == PROMPTS:
+            self._prompts = None
+        else:
+            self._conversations.clear()
+
+    def _check(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._session() as db:
+            versions = dict(db.query(CacheVersion.name, CacheVersion.version).all())
+        with self._lock:
+            for name in self._generations:
+                if versions.get(name) != self._versions.get(name):
+                    self._clear(name)
+            self._versions = versions
+            self._checked_at = now
+
+    def prompts(self) -> dict:
+        """
+        Returns:
+            dict: Prompt text by version.
+        """
+        self._check()
+        prompts = self._prompts
+        if prompts is None:
+            generation = self._generations[PROMPTS]
+            with self._session() as db:
+                prompts = dict(db.query(PromptConfig.version, PromptConfig.prompt).all())
+            with self._lock:
+                # A load that raced with an invalidation must not be kept
+                if generation == self._generations[PROMPTS]:
+                    self._prompts = prompts
+        return prompts
+
+    def prompt(self, version: str) -> str | None:
+        """
+        Args:
+            version (str): The A/B version.
+
+        Returns:
+            str | None: The version's system prompt, or None if it has none.
+        """
+        return self.prompts().get(version)
+
+    def conversation(self, convo_id: str) -> dict | None:
+        """
+        Args:
+            convo_id (str): Unique identifier of the conversation.
+
+        Returns:
+            dict | None: The conversation's "version" and "file_id", or None if it does not exist.
+        """
+        self._check()
+        metadata = self._conversations.get(convo_id)
+        if metadata is None:
+            generation = self._generations[CONVERSATIONS]
+            with self._session() as db:
+                row = db.query(Conversation.version, Conversation.file_id).filter_by(id=convo_id).first()
+            if row is None:
+                return None
+            metadata = {"version": row.version, "file_id": row.file_id}
+            if row.version:
+                with self._lock:
+                    if generation == self._generations[CONVERSATIONS]:
+                        self._conversations.set(convo_id, metadata)
+        return dict(metadata)
+
+    def remember_version(self, convo_id: str, version: str, file_id: str | None = None):
+        """
+        Caches the version just assigned to a conversation by this worker.
+
+        Args:
+            convo_id (str): Unique identifier of the conversation.
+            version (str): The assigned version.
+            file_id (str | None, optional): The conversation's file ID. Defaults to None.
+        """
+        self._conversations.set(convo_id, {"version": version, "file_id": file_id})
+
+    def prompts_changed(self, db: Session):
+        """
+        Invalidates the prompts here and, once `db` commits, in every other worker.
+
+        Args:
+            db (Session): The session the prompt change is written with.
+        """
+        bump(db, PROMPTS)
+        with self._lock:
+            self._clear(PROMPTS)
+
+    def conversation_changed(self, db: Session, convo_id: str):
+        """
+        Invalidates a conversation's metadata here and, once `db` commits, in every other worker.
+
+        Args:
+            db (Session): The session the conversation change is written with.
+            convo_id (str): Unique identifier of the conversation.
+        """
+        bump(db, CONVERSATIONS)
+        self._conversations.pop(convo_id)
+
+    def version(self, name: str) -> int:
+        """
+        Returns a shared counter as of the last check, for caches kept outside this one.
+
+        Such a cache remembers the value it was built at and rebuilds once the counter moves
+        past it, so it sees other workers' writes within `check_interval`.
+
+        Args:
+            name (str): The counter, e.g. KEYWORDS.
+
+        Returns:
+            int: The counter's value, 0 if it was never bumped.
+        """
+        self._check()
+        return self._versions.get(name, 0)
+
+    def stats(self) -> dict:
+        return {"conversations": self._conversations.stats(), "prompts_cached": self._prompts is not None}
+
+
+metadata_cache = MetadataCache()
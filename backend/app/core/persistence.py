@@ -0,0 +1,234 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+from app.db import database
+from app.db.models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+# Chat-turn writes are committed by a background worker, many turns per transaction.
+# With "false" every write is committed inline instead.
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+# Writes that may wait for the worker; further writers block until there is room
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+# Seconds a reader waits for a conversation's queued writes before reading anyway
+WRITE_BEHIND_READ_TIMEOUT = float(os.getenv("WRITE_BEHIND_READ_TIMEOUT", "5"))
+WRITE_BEHIND_RETRIES = 3
+
+_STOP = object()
+
+
+class WriteBehindWriter:
+    """
+    Queues chat-turn writes (messages and A/B version assignments) for a background worker.
+
+    The worker takes everything queued since its last commit and writes it in one transaction,
+    so requests never wait for a commit and concurrent turns share fsyncs. The queue is bounded:
+    when it is full, writers wait for room. Readers call `wait_for` to see a conversation's own
+    writes, and `close` (also run at exit) commits everything still queued.
+
+    Args:
+        session_factory (callable, optional): Creates sessions for the worker. Defaults to
+            `app.db.database.Session`.
+        maxsize (int, optional): Queue capacity. Defaults to WRITE_BEHIND_QUEUE_SIZE.
+        batch_size (int, optional): Maximum writes per transaction. Defaults to WRITE_BEHIND_BATCH_SIZE.
+        enabled (bool, optional): Whether to write behind; if not, writes are committed inline.
+            Defaults to WRITE_BEHIND.
+    """
+
+    def __init__(self, session_factory=None, maxsize: int = WRITE_BEHIND_QUEUE_SIZE,
+                 batch_size: int = WRITE_BEHIND_BATCH_SIZE, enabled: bool = WRITE_BEHIND):
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize)
+        self._pending = Counter()  # conversation ID -> queued writes not committed yet
+        self._changed = threading.Condition()
+        self._thread = None
+        self._registered = False
+        self._start_lock = threading.Lock()
+        self.stats = {"writes": 0, "batches": 0, "failures": 0, "dropped": 0}
+
+    def _session(self):
+        return (self._session_factory or database.Session)()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+                if not self._registered:
+                    atexit.register(self.close)
+                    self._registered = True
+
+    def _track(self, op: tuple):
+        with self._changed:
+            self._pending[op[1]] += 1
+
+    def _done(self, ops: list[tuple]):
+        with self._changed:
+            for op in ops:
+                self._pending[op[1]] -= 1
+                if self._pending[op[1]] <= 0:
+                    del self._pending[op[1]]
+            self._changed.notify_all()
+
+    def _submit(self, op: tuple):
+        if not self.enabled:
+            self._write([op])
+            return
+        self._start()
+        self._track(op)
+        self._queue.put(op)
+
+    async def _submit_async(self, op: tuple):
+        if not self.enabled:
+            await run_in_threadpool(self._write, [op])
+            return
+        self._start()
+        self._track(op)
+        try:
+            self._queue.put_nowait(op)
+        except queue.Full:
+            # Backpressure: wait for room without blocking the event loop
+            await run_in_threadpool(self._queue.put, op)
+
+    def add_message(self, convo_id: str, role: str, content: str):
+        """
+        Queues a message for a conversation, stamped with the current time.
+
+        Blocks while the queue is full; use `add_message_async` on the event loop.
+
+        Args:
+            convo_id (str): Unique identifier of the conversation.
+            role (str): "user" or "assistant".
+            content (str): The message text.
+        """
+        self._submit(("message", convo_id, role, content, datetime.utcnow()))
+
+    async def add_message_async(self, convo_id: str, role: str, content: str):
+        """
+        Queues a message for a conversation without blocking the event loop.
+
+        Args:
+            convo_id (str): Unique identifier of the conversation.
+            role (str): "user" or "assistant".
+            content (str): The message text.
+        """
+        await self._submit_async(("message", convo_id, role, content, datetime.utcnow()))
+
+    def assign_version(self, convo_id: str, version: str):
+        """
+        Queues the A/B version assignment of a conversation; a version already stored is kept.
+
+        Args:
+            convo_id (str): Unique identifier of the conversation.
+            version (str): The version to assign.
+        """
+        self._submit(("version", convo_id, version))
+
+    def wait_for(self, convo_id: str, timeout: float = WRITE_BEHIND_READ_TIMEOUT) -> bool:
+        """
+        Waits until every write queued for a conversation has been committed.
+
+        Args:
+            convo_id (str): Unique identifier of the conversation.
+            timeout (float, optional): Maximum seconds to wait. Defaults to WRITE_BEHIND_READ_TIMEOUT.
+
+        Returns:
+            bool: False if writes were still pending when the timeout expired.
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: convo_id not in self._pending, timeout)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Waits until every queued write has been committed.
+
+        Args:
+            timeout (float | None, optional): Maximum seconds to wait. Defaults to no limit.
+
+        Returns:
+            bool: False if writes were still pending when the timeout expired.
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, timeout: float | None = 30):
+        """
+        Commits everything still queued and stops the worker.
+
+        Args:
+            timeout (float | None, optional): Maximum seconds to wait for the worker. Defaults to 30.
+        """
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def pending(self) -> int:
+        with self._changed:
+            return sum(self._pending.values())
+
+    def _run(self):
+        while True:
+            batch, stop = [self._queue.get()], False
+            # Everything queued while the previous batch was being committed goes in this one
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [op for op in batch if op is not _STOP]
+            if batch:
+                self._write_with_retries(batch)
+                self._done(batch)
+            if stop:
+                return
+
+    def _write_with_retries(self, batch: list[tuple]):
+        for attempt in range(WRITE_BEHIND_RETRIES):
+            try:
+                self._write(batch)
+                return
+            except Exception:
+                self.stats["failures"] += 1
+                logger.exception("Write-behind batch of %d writes failed (attempt %d)", len(batch), attempt + 1)
+                time.sleep(0.1 * 2 ** attempt)
+        # Keep the writes that can be committed on their own
+        for op in batch:
+            try:
+                self._write([op])
+            except Exception:
+                self.stats["dropped"] += 1
+                logger.exception("Dropping write for conversation %s", op[1])
+
+    def _write(self, ops: list[tuple]):
+        versions = [op for op in ops if op[0] == "version"]
+        messages = [
+            {"conversation_id": op[1], "role": op[2], "content": op[3], "timestamp": op[4]}
+            for op in ops if op[0] == "message"
+        ]
+        with self._session() as db:
+            for _, convo_id, version in versions:
+                db.query(Conversation).filter(Conversation.id == convo_id, Conversation.version.is_(None)) \
+                    .update({Conversation.version: version}, synchronize_session=False)
+            if messages:
+                db.execute(insert(Message), messages)
+            db.commit()
+        self.stats["writes"] += len(ops)
+        self.stats["batches"] += 1
+
+
+message_writer = WriteBehindWriter()
@@ -1,16 +1,20 @@
-from app.db.database import db_session
+from sqlalchemy.orm import Session
+from app.core.metadata_cache import metadata_cache
+from app.core.semantic_cache import semantic_cache
 from app.db.models import PromptConfig
 
 
-def load_prompts() -> dict:
-    prompts = db_session.query(PromptConfig).all()
+def load_prompts(db: Session) -> dict:
+    prompts = db.query(PromptConfig).all()
     return {p.version: p.prompt for p in prompts}
 
-def update_prompt(version: str, prompt: str):
-    config = db_session.query(PromptConfig).filter_by(version=version).first()
+def update_prompt(db: Session, version: str, prompt: str):
+    config = db.query(PromptConfig).filter_by(version=version).first()
     if config:
         config.prompt = prompt  
     else:
         config = PromptConfig(version=version, prompt=prompt)
-        db_session.add(config)
-        db_session.commit()
+        db.add(config)
+    metadata_cache.prompts_changed(db)
+    db.commit()
+    semantic_cache.invalidate()
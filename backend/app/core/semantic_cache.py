@@ -0,0 +1,159 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import numpy as np
+
+from app.core.metadata_cache import KNOWLEDGE, PROMPTS, metadata_cache
+
+
+class SemanticCache:
+    """
+    Opt-in cache of first-turn answers, looked up by query embedding similarity.
+
+    Entries are grouped by prompt version so A and B never share answers, and by `generation`,
+    the shared state they were answered from, so a prompt or knowledge base change made by any
+    worker retires them. A lookup is a single matrix-vector product over the group's normalized
+    embeddings; the best match is a hit when its cosine similarity reaches the threshold. Entries
+    expire after `ttl` seconds and the least recently used ones are evicted beyond `maxsize`.
+
+    Args:
+        enabled (bool): Whether lookups and stores do anything.
+        threshold (float): Minimum cosine similarity for a hit.
+        maxsize (int): Maximum number of cached answers.
+        ttl (float): Seconds an answer stays valid.
+        generation (Callable[[], Hashable], optional): Returns the current generation. Defaults
+            to a constant one.
+    """
+
+    def __init__(self, enabled: bool, threshold: float, maxsize: int, ttl: float,
+                 generation: Callable[[], Hashable] | None = None):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = generation
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # entry id -> (group, unit vector, chunks, expires_at)
+        self._matrices = {}  # group -> (entry ids, stacked unit vectors, expiry times), rebuilt when stale
+        self._generation = None  # of the entries held
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-8)
+
+    def _current(self) -> Hashable:
+        # Read before taking the lock, as it may query the database
+        return self.generation() if self.generation else None
+
+    def _group(self, version: str, generation: Hashable) -> tuple:
+        # Entries of an earlier generation can never match again
+        if generation != self._generation:
+            self._entries.clear()
+            self._matrices.clear()
+            self._generation = generation
+        return version, generation
+
+    def _matrix(self, group: tuple):
+        if group not in self._matrices:
+            ids = [i for i, entry in self._entries.items() if entry[0] == group]
+            matrix = np.stack([self._entries[i][1] for i in ids]) if ids else None
+            expires = np.array([self._entries[i][3] for i in ids])
+            self._matrices[group] = (ids, matrix, expires)
+        return self._matrices[group]
+
+    def _remove(self, entry_id):
+        group = self._entries.pop(entry_id)[0]
+        self._matrices.pop(group, None)
+
+    def lookup(self, version: str, embedding) -> list[str] | None:
+        """
+        Finds a cached answer for a semantically equivalent first-turn question.
+
+        Args:
+            version (str): Prompt version of the conversation (A/B).
+            embedding: Embedding of the normalized user query.
+
+        Returns:
+            list[str] | None: The cached stream chunks to replay, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        vector, generation = self._unit(embedding), self._current()
+        with self._lock:
+            ids, matrix, expires = self._matrix(self._group(version, generation))
+            if ids:
+                similarities = matrix @ vector
+                # Expired answers never match, so the best fresh one above the threshold is used
+                expired = expires < time.monotonic()
+                similarities[expired] = -np.inf
+                best = int(np.argmax(similarities))
+                entry_id = ids[best]
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return list(self._entries[entry_id][2])
+                for position in np.flatnonzero(expired):
+                    self._remove(ids[position])
+            self.misses += 1
+            return None
+
+    def store(self, version: str, embedding, chunks: list[str]):
+        """
+        Caches the streamed chunks of a first-turn answer.
+
+        Args:
+            version (str): Prompt version of the conversation (A/B).
+            embedding: Embedding of the normalized user query.
+            chunks (list[str]): The chunks exactly as they were streamed to the client.
+        """
+        if not self.enabled or not chunks:
+            return
+        vector, generation = self._unit(embedding), self._current()
+        with self._lock:
+            group = self._group(version, generation)
+            now = time.monotonic()
+            for entry_id in [i for i, e in self._entries.items() if e[3] < now]:
+                self._remove(entry_id)
+            self._entries[next(self._ids)] = (group, vector, tuple(chunks), now + self.ttl)
+            self._matrices.pop(group, None)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self):
+        """
+        Drops every cached answer here, e.g. right after this worker changed a prompt.
+
+        Other workers drop theirs when they see the generation change.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+semantic_cache = SemanticCache(
+    enabled=os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes"),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    maxsize=int(os.getenv("SEMANTIC_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+    generation=lambda: (metadata_cache.version(PROMPTS), metadata_cache.version(KNOWLEDGE)),
+)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+from typing import AsyncIterator, Callable, Hashable
+
+# Identical opening questions in flight at the same time share one upstream completion
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+
+
+def question_key(question: str) -> str:
+    """
+    Normalizes a question for matching identical in-flight questions.
+
+    Only case, whitespace and trailing punctuation are ignored. Unlike `normalize_query`, stop
+    words are kept: "how do I reset it" and "how do I not reset it" need different answers.
+
+    Args:
+        question (str): The user's message.
+
+    Returns:
+        str: The matching key.
+    """
+    return " ".join(question.casefold().split()).rstrip("?!.")
+
+
+class _Flight:
+    def __init__(self):
+        self.deltas = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.updated = asyncio.Event()
+
+    def notify(self):
+        updated, self.updated = self.updated, asyncio.Event()
+        updated.set()
+
+
+class SingleFlight:
+    """
+    Shares one streamed answer among all concurrent requests for the same key.
+
+    The first request starts the stream in a task of its own; requests arriving while it runs
+    subscribe to it, are sent the deltas produced so far and then follow along. A flight ends
+    with its stream, so later requests start a new one, and it is cancelled when every
+    subscriber has gone. Flights are per process.
+
+    Args:
+        enabled (bool, optional): Whether to coalesce; if not, every request streams on its
+            own. Defaults to SINGLE_FLIGHT.
+    """
+
+    def __init__(self, enabled: bool = SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._flights = {}
+        self.stats = {"flights": 0, "joined": 0}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def stream(self, key: Hashable, start: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Streams the deltas of the flight for a key, starting it if none is in flight.
+
+        Args:
+            key (Hashable): Requests with equal keys get the same answer.
+            start (Callable[[], AsyncIterator[str]]): Starts the upstream stream; only called
+                for the first request.
+
+        Yields:
+            str: Every delta of the answer, from the start.
+
+        Raises:
+            Exception: Whatever the upstream stream raised.
+        """
+        if not self.enabled:
+            async for delta in start():
+                yield delta
+            return
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.ensure_future(self._run(key, flight, start))
+            self.stats["flights"] += 1
+        else:
+            self.stats["joined"] += 1
+
+        flight.subscribers += 1
+        try:
+            sent = 0
+            while True:
+                while sent < len(flight.deltas):
+                    yield flight.deltas[sent]
+                    sent += 1
+                if flight.done:
+                    break
+                await flight.updated.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more: stop the upstream stream
+                self._end(key, flight)
+                flight.task.cancel()
+
+    def _end(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def _run(self, key: Hashable, flight: _Flight, start: Callable[[], AsyncIterator[str]]):
+        try:
+            async for delta in start():
+                flight.deltas.append(delta)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = ConnectionAbortedError("The shared answer was cancelled")
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            self._end(key, flight)
+            flight.notify()
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,58 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Progress of the background warm-up, reported by the readiness endpoint
+readiness = {"ready": False, "started_at": None, "finished_at": None, "steps": {}, "errors": {}}
+
+
+def _steps() -> list[tuple[str, callable]]:
+    from app.core import chatbot_engine, knowledge_vector
+    from app.core.knowledge import keyword_matcher
+
+    steps = [
+        ("embedding_provider", knowledge_vector.get_embedding_fn),
+        ("vector_store", knowledge_vector.get_collection),
+        ("lexical_index", knowledge_vector.get_lexical_index),
+        ("keyword_matcher", keyword_matcher.reload),
+        ("openai_clients", lambda: (chatbot_engine.get_client(), chatbot_engine.get_async_client())),
+    ]
+    if knowledge_vector.QUERY_NORMALIZER == "nltk":
+        steps.insert(0, ("nlp_resources", knowledge_vector.load_nlp_resources))
+    return steps
+
+
+def warm_up():
+    """
+    Initializes the NLP data, vector store, indexes and API clients ahead of the first request.
+
+    Every step runs even if an earlier one failed; the app is ready only once all succeeded.
+    Requests arriving before then initialize whatever they need on demand.
+    """
+    readiness.update(ready=False, started_at=time.time(), finished_at=None, steps={}, errors={})
+    for name, step in _steps():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.exception("Warm-up step %s failed", name)
+            readiness["errors"][name] = str(e)
+        readiness["steps"][name] = round(time.perf_counter() - start, 3)
+    readiness["finished_at"] = time.time()
+    readiness["ready"] = not readiness["errors"]
+    logger.info("Warm-up finished in %.2fs (ready=%s)", readiness["finished_at"] - readiness["started_at"],
+                readiness["ready"])
+
+
+def start_warm_up() -> threading.Thread:
+    """
+    Runs `warm_up` in a daemon thread so the server starts accepting connections immediately.
+
+    Returns:
+        threading.Thread: The warm-up thread.
+    """
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
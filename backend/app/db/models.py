@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from app.db.database import Base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -12,6 +12,29 @@ class Feedback(Base):
     user_message = Column(Text)
     rating = Column(Integer)
     comment = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        # Feedback upserts look rows up by (conversation_id, message)
+        Index("ix_feedback_conversation_id_message", "conversation_id", "message"),
+    )
+
+class FeedbackRollup(Base):
+    # Per-version feedback totals kept in step with every feedback write, so summaries
+    # never scan the feedback table. Rebuild with `python -m app.core.feedback_rollup`.
+    __tablename__ = "feedback_rollup"
+    version = Column(String, primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    rated = Column(Integer, default=0, nullable=False)  # non-zero ratings, which the average is taken over
+    rating_sum = Column(Integer, default=0, nullable=False)
+    thumbs_up = Column(Integer, default=0, nullable=False)
+    thumbs_down = Column(Integer, default=0, nullable=False)
+
+class CacheVersion(Base):
+    # Bumped with every write to a cached table, so each worker can tell its copies are stale
+    __tablename__ = "cache_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
 
 class Knowledge(Base):
     __tablename__ = "knowledge"
@@ -32,6 +55,12 @@ class Conversation(Base):
     started_at = Column(DateTime, default=datetime.utcnow)
     messages = relationship("Message", back_populates="conversation")
     file_id =Column(String)
+    thread_id = Column(String)  # Assistants thread reused by every file-based turn
+
+    __table_args__ = (
+        # The conversation list is keyset-paginated on (started_at, id)
+        Index("ix_conversations_started_at_id", "started_at", "id"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -41,4 +70,27 @@ class Message(Base):
     content = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
-    conversation = relationship("Conversation", back_populates="messages")
\ No newline at end of file
+    conversation = relationship("Conversation", back_populates="messages")
+
+    __table_args__ = (
+        # Every chat turn and history fetch filters by conversation and orders by time
+        Index("ix_messages_conversation_id_timestamp", "conversation_id", "timestamp"),
+    )
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+    id = Column(String, primary_key=True)
+    topic = Column(String)
+    filename = Column(String)
+    path = Column(String)  # spooled upload, removed once the job has finished
+    status = Column(String, default="queued", index=True)  # queued, running, done or failed
+    worker = Column(String)  # process running the job
+    heartbeat_at = Column(DateTime)  # refreshed while the job runs; a stale one means its worker died
+    attempts = Column(Integer, default=0)
+    chunks = Column(Integer, default=0)  # read from the file so far
+    added = Column(Integer, default=0)  # embedded and stored
+    skipped = Column(Integer, default=0)
+    deleted = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
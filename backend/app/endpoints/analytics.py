@@ -1,15 +1,29 @@
-from fastapi import APIRouter
-from sqlalchemy import func, case
-from app.db.database import db_session
-from app.db.models import Feedback
+from datetime import datetime
+from itertools import groupby
+from typing import Iterator, Literal
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core import feedback_rollup
+from app.db import database
+from app.db.database import get_db
+from app.db.models import Conversation, Feedback, Message
+from app.utils.exports import csv_lines, encode, ndjson_lines
 from fastapi.responses import StreamingResponse
 import io
 import csv
+import os
 
 router = APIRouter()
 
+# Rows fetched per round trip by the raw exports (a server-side cursor on Postgres)
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+
+FEEDBACK_COLUMNS = ("id", "conversation_id", "version", "message", "user_message", "rating", "comment", "created_at")
+TRANSCRIPT_COLUMNS = ("conversation_id", "version", "started_at", "role", "content", "timestamp")
+
 @router.get("/summary")
-def feedback_summary():
+def feedback_summary(db: Session = Depends(get_db)):
     """
     Returns a summary of feedback statistics grouped by version (A/B).
 
@@ -19,32 +33,17 @@ def feedback_summary():
     - Count of thumbs up and thumbs down
     - A ratio string (e.g., "5:3")
 
+    The figures come from the per-version rollup, so the cost does not grow with the amount
+    of feedback.
+
     Returns:
         list[dict]: A list of summary entries per version.
     """
-    data = db_session.query(
-        Feedback.version,
-        func.count(Feedback.id),
-        func.avg(func.nullif(Feedback.rating, 0)),
-        func.sum(case((Feedback.rating == 1, 1), else_=0)).label("thumbs_up"),
-        func.sum(case((Feedback.rating == -1, 1), else_=0)).label("thumbs_down")
-    ).group_by(Feedback.version).all()
-
-    return [
-        {
-            "version": version,
-            "total_feedback": total,
-            "average_score": round(avg or 0, 2),
-            "thumbs_up": up,
-            "thumbs_down": down,
-            "score_ratio": f"{up}:{down}" if down else f"{up}:0"
-        }
-        for version, total, avg, up, down in data
-    ]
+    return feedback_rollup.summary(db)
 
 
 @router.get("/summary/export")
-def export_feedback_summary_csv():
+def export_feedback_summary_csv(db: Session = Depends(get_db)):
     """
     Exports feedback summary statistics as a downloadable CSV file.
 
@@ -58,21 +57,115 @@ def export_feedback_summary_csv():
     Returns:
         StreamingResponse: A CSV file stream with feedback summary data.
     """
-    data = db_session.query(
-        Feedback.version,
-        func.count(Feedback.id),
-        func.avg(func.nullif(Feedback.rating, 0)),
-        func.sum(case((Feedback.rating == 1, 1), else_=0)).label("thumbs_up"),
-        func.sum(case((Feedback.rating == -1, 1), else_=0)).label("thumbs_down")
-    ).group_by(Feedback.version).all()
-
     output = io.StringIO()
     writer = csv.writer(output)
     writer.writerow(["Version", "Total Feedback", "Average Score", "Thumbs Up", "Thumbs Down"])
 
-    for row in data:
-        version, total, avg, up, down = row
-        writer.writerow([version, total, round(avg or 0, 2), up, down])
+    for row in feedback_rollup.summary(db):
+        writer.writerow([row["version"], row["total_feedback"], row["average_score"], row["thumbs_up"],
+                         row["thumbs_down"]])
 
     output.seek(0)
-    return StreamingResponse(output, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=feedback_summary.csv"})
\ No newline at end of file
+    return StreamingResponse(output, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=feedback_summary.csv"})
+
+
+def _stream_rows(statement) -> Iterator:
+    # The response outlives the request's session, so the export reads with its own
+    with database.Session() as db:
+        yield from db.execute(statement.execution_options(yield_per=EXPORT_FETCH_SIZE))
+
+
+def _filtered(statement, version_column, time_column, version, since, until):
+    if version is not None:
+        statement = statement.where(version_column == version)
+    if since is not None:
+        statement = statement.where(time_column >= since)
+    if until is not None:
+        statement = statement.where(time_column < until)
+    return statement
+
+
+def _export_response(lines, name: str, format: str, gzip: bool) -> StreamingResponse:
+    filename = f"{name}.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv" if format == "csv" else "application/x-ndjson")
+    return StreamingResponse(encode(lines, compress=gzip), media_type=media_type,
+                             headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+@router.get("/export/feedback")
+def export_feedback(format: Literal["csv", "ndjson"] = "csv", gzip: bool = False, version: str | None = None,
+                    since: datetime | None = None, until: datetime | None = None):
+    """
+    Exports raw feedback rows as a streamed CSV or NDJSON download.
+
+    Rows are read in batches of EXPORT_FETCH_SIZE and written as they arrive, so memory use
+    does not depend on the size of the export.
+
+    Args:
+        format (str, optional): "csv" or "ndjson". Defaults to "csv".
+        gzip (bool, optional): Whether to gzip the file. Defaults to False.
+        version (str, optional): Only export feedback for this A/B version.
+        since (datetime, optional): Only export feedback created at or after this time.
+        until (datetime, optional): Only export feedback created before this time.
+
+    Returns:
+        StreamingResponse: The feedback rows, ordered by ID.
+    """
+    statement = _filtered(
+        select(*(getattr(Feedback, name) for name in FEEDBACK_COLUMNS)).order_by(Feedback.id),
+        Feedback.version, Feedback.created_at, version, since, until,
+    )
+    rows = _stream_rows(statement)
+    if format == "csv":
+        lines = csv_lines(FEEDBACK_COLUMNS, rows)
+    else:
+        lines = ndjson_lines(dict(row._mapping) for row in rows)
+    return _export_response(lines, "feedback", format, gzip)
+
+
+def _transcripts(rows) -> Iterator[dict]:
+    for (conversation_id, version, started_at), messages in groupby(rows, key=lambda row: row[:3]):
+        yield {
+            "conversation_id": conversation_id,
+            "version": version,
+            "started_at": started_at,
+            "messages": [
+                {"role": role, "content": content, "timestamp": timestamp}
+                for *_, role, content, timestamp in messages if role is not None
+            ],
+        }
+
+
+@router.get("/export/conversations")
+def export_conversations(format: Literal["csv", "ndjson"] = "csv", gzip: bool = False, version: str | None = None,
+                         since: datetime | None = None, until: datetime | None = None):
+    """
+    Exports full conversation transcripts as a streamed CSV or NDJSON download.
+
+    CSV has one row per message (conversations without messages get one empty row); NDJSON has
+    one document per conversation with its messages in order. Memory use does not depend on the
+    size of the export.
+
+    Args:
+        format (str, optional): "csv" or "ndjson". Defaults to "csv".
+        gzip (bool, optional): Whether to gzip the file. Defaults to False.
+        version (str, optional): Only export conversations of this A/B version.
+        since (datetime, optional): Only export conversations started at or after this time.
+        until (datetime, optional): Only export conversations started before this time.
+
+    Returns:
+        StreamingResponse: The transcripts, ordered by start time.
+    """
+    statement = _filtered(
+        select(Conversation.id, Conversation.version, Conversation.started_at,
+               Message.role, Message.content, Message.timestamp)
+        .outerjoin(Message, Message.conversation_id == Conversation.id)
+        .order_by(Conversation.started_at, Conversation.id, Message.timestamp, Message.id),
+        Conversation.version, Conversation.started_at, version, since, until,
+    )
+    rows = _stream_rows(statement)
+    if format == "csv":
+        lines = csv_lines(TRANSCRIPT_COLUMNS, rows)
+    else:
+        lines = ndjson_lines(_transcripts(rows))
+    return _export_response(lines, "conversations", format, gzip)
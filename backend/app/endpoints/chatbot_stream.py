@@ -1,12 +1,13 @@
 import os
-import openai
 from app.core.chatbot_engine import get_streaming_response, get_web_response, get_response_with_file
 from fastapi import APIRouter, Request, File, UploadFile, HTTPException
-from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from uuid import uuid4
-from app.db.database import db_session
 from app.db.models import Conversation
 from app.core.chatbot_engine import upload_and_store_file
+from app.core.semantic_cache import semantic_cache
+from app.utils.sse import sse_response
+from app.utils.uploads import save_stream
 
 router = APIRouter()
 
@@ -24,12 +25,9 @@ async def stream_response(request: Request, convo_id: str, message: str):
         message (str): The user’s input message.
 
     Returns:
-        StreamingResponse: SSE stream with the assistant’s reply.
+        StreamingResponse: Coalesced SSE stream with the assistant’s reply.
     """
-    return StreamingResponse(
-        get_streaming_response(convo_id, message),
-        media_type="text/event-stream"
-    )
+    return sse_response(get_streaming_response(convo_id, message), request)
 
 @router.get("/chatbot/web")
 async def stream_web_response(request: Request, convo_id: str, message: str):
@@ -42,12 +40,9 @@ async def stream_web_response(request: Request, convo_id: str, message: str):
         message (str): The user’s input message.
 
     Returns:
-        StreamingResponse: SSE stream with a GPT-4-generated reply using web data.
+        StreamingResponse: Coalesced SSE stream with a GPT-4-generated reply using web data.
     """
-    return StreamingResponse(
-        get_web_response(convo_id, message),
-        media_type="text/event-stream"
-    )
+    return sse_response(get_web_response(convo_id, message), request)
 
 @router.get("/chatbot/file")
 async def stream_file_response(request: Request, convo_id: str, message: str):
@@ -60,12 +55,9 @@ async def stream_file_response(request: Request, convo_id: str, message: str):
         message (str): The user’s input message.
 
     Returns:
-        StreamingResponse: SSE stream with a response using uploaded file context.
+        StreamingResponse: Coalesced SSE stream with a response using uploaded file context.
     """
-    return StreamingResponse(
-        get_response_with_file(convo_id, message),
-        media_type="text/event-stream"
-    )
+    return sse_response(get_response_with_file(convo_id, message), request)
 
 @router.get("/chatbot/version")
 def get_chatbot_version(convo_id: str):
@@ -81,17 +73,30 @@ def get_chatbot_version(convo_id: str):
     from app.core.chatbot_engine import get_version
     return {"version": get_version(convo_id)}
 
+@router.get("/chatbot/cache-stats")
+def get_cache_stats():
+    """
+    Reports hit-rate statistics of the semantic response cache.
+
+    Returns:
+        dict: Whether the cache is enabled, its threshold, size, hits, misses and hit rate.
+    """
+    return semantic_cache.stats()
+
 @router.post("/upload")
 async def upload_file(conversation_id: str, file: UploadFile = File(...)):
     """
     Uploads a file, stores it locally, and sends it to OpenAI for use in file-based assistant retrieval.
 
+    The upload is copied to disk block by block and sent to OpenAI from a worker thread, so large
+    files neither fill memory nor block the event loop.
+
     Args:
         conversation_id (str): The conversation ID to associate the file with.
         file (UploadFile): The uploaded file from the client.
 
     Returns:
-        dict: Paths to the saved file and the corresponding OpenAI file ID.
+        dict: Path, size and SHA-256 of the saved file and the corresponding OpenAI file ID.
 
     Raises:
         HTTPException: If the file upload or OpenAI integration fails.
@@ -99,11 +104,9 @@ async def upload_file(conversation_id: str, file: UploadFile = File(...)):
     try:
         file_id = str(uuid4())
         file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{file.filename}")
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
-        print("AQUI ESTÁ")
-        openai_file_id = upload_and_store_file(conversation_id, file_path)
+        size, sha256 = await run_in_threadpool(save_stream, file.file, file_path)
+        openai_file_id = await run_in_threadpool(upload_and_store_file, conversation_id, file_path)
 
-        return {"file_path": file_path, "openai_file_id": openai_file_id}
+        return {"file_path": file_path, "size": size, "sha256": sha256, "openai_file_id": openai_file_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
\ No newline at end of file
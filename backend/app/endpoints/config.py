@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from app.core.prompt_config import load_prompts, update_prompt
+from app.db.database import get_db
 
 router = APIRouter()
 
@@ -9,12 +11,12 @@ class PromptUpdate(BaseModel):
     prompt: str
 
 @router.get("/")
-def get_prompts():
-    return load_prompts()
+def get_prompts(db: Session = Depends(get_db)):
+    return load_prompts(db)
 
 @router.put("/")
-def set_prompt(update: PromptUpdate):
+def set_prompt(update: PromptUpdate, db: Session = Depends(get_db)):
     if update.version not in ("A", "B"):
         raise HTTPException(status_code=400, detail="Version must be A or B")
-    update_prompt(update.version, update.prompt)
+    update_prompt(db, update.version, update.prompt)
     return {"status": "updated"}
@@ -1,23 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
 from app.schemas.config import PromptConfigCreate
-from app.db.database import db_session
+from app.db.database import get_db
+from app.core.metadata_cache import metadata_cache
+from app.core.semantic_cache import semantic_cache
 from app.db.models import PromptConfig
 
 router = APIRouter()
 
 @router.get("/")
-def get_prompts():
+def get_prompts(db: Session = Depends(get_db)):
     """
     Retrieves all system prompts for each version (A/B).
 
     Returns:
         dict: A dictionary mapping version strings to their corresponding prompt texts.
     """
-    prompts = db_session.query(PromptConfig).all()
+    prompts = db.query(PromptConfig).all()
     return {p.version: p.prompt for p in prompts}
 
 @router.put("/")
-def update_prompt(config: PromptConfigCreate):
+def update_prompt(config: PromptConfigCreate, db: Session = Depends(get_db)):
     """
     Creates or updates the system prompt for a given version.
 
@@ -30,11 +33,13 @@ def update_prompt(config: PromptConfigCreate):
     Returns:
         dict: A status message indicating success.
     """
-    prompt = db_session.query(PromptConfig).filter_by(version=config.version).first()
+    prompt = db.query(PromptConfig).filter_by(version=config.version).first()
     if not prompt:
         prompt = PromptConfig(version=config.version, prompt=config.prompt)
-        db_session.add(prompt)
+        db.add(prompt)
     else:
         prompt.prompt = config.prompt
-    db_session.commit()
+    metadata_cache.prompts_changed(db)
+    db.commit()
+    semantic_cache.invalidate()
     return {"status": "updated"}
@@ -1,11 +1,48 @@
-from fastapi import APIRouter, HTTPException, Depends
+import base64
+import json
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy import exists, tuple_
 from sqlalchemy.orm import Session
 from uuid import uuid4
-from app.db.models import Conversation
+from app.core.persistence import message_writer
+from app.db.models import Conversation, Message
 from app.db.database import get_db
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _encode_cursor(moment: datetime, key) -> str:
+    return base64.urlsafe_b64encode(json.dumps([moment.isoformat(), key]).encode()).decode()
+
+
+def _decode_cursor(cursor: str, key_type: type = str) -> tuple[datetime, str | int]:
+    try:
+        moment, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(moment), key_type(key)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+def _page_size(limit: int | None, cursor: str | None, default: int) -> int | None:
+    # Clients that ask for neither a page size nor a page get every message, as before pagination
+    return default if limit is None and cursor else limit
+
+
+def _fetch(query, limit: int | None) -> list:
+    # One extra row is fetched to tell whether another page follows
+    return (query if limit is None else query.limit(limit + 1)).all()
+
+
+def _page(response: Response, rows: list, limit: int | None, key) -> list:
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(*key(rows[-1]))
+    return rows
+
 
 @router.post("/conversations")
 def create_conversation(db: Session = Depends(get_db)):
@@ -21,34 +58,80 @@ def create_conversation(db: Session = Depends(get_db)):
     return {"id": convo.id}
 
 @router.get("/conversations")
-def list_conversations(db: Session = Depends(get_db)):
+def list_conversations(response: Response, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       cursor: str | None = None, since: datetime | None = None, has_messages: bool = False,
+                       db: Session = Depends(get_db)):
     """
-    Retrieves all existing conversations ordered by creation time (most recent first).
+    Retrieves conversations ordered by creation time (most recent first), one page at a time.
+
+    Pages are keyset-paginated on (started_at, id), so every page costs the same however many
+    conversations exist. When more remain, the `X-Next-Cursor` response header holds the
+    cursor of the next page.
+
+    Args:
+        limit (int, optional): Maximum number of conversations to return. Defaults to 50.
+        cursor (str, optional): The `X-Next-Cursor` value of the previous page.
+        since (datetime, optional): Only return conversations started after this time, e.g. the
+            newest one already shown, to refresh incrementally.
+        has_messages (bool, optional): Only return conversations with at least one message,
+            leaving out chats that were opened but never used. Defaults to False.
 
     Returns:
-        list[Conversation]: A list of all conversation records from the database.
+        list[dict]: The conversations' id, version, start time and file ID.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
     """
-    return db.query(Conversation).order_by(Conversation.started_at.desc()).all()
+    query = db.query(Conversation.id, Conversation.version, Conversation.started_at, Conversation.file_id)
+    if since is not None:
+        query = query.filter(Conversation.started_at > since)
+    if has_messages:
+        query = query.filter(exists().where(Message.conversation_id == Conversation.id))
+    if cursor:
+        started_at, convo_id = _decode_cursor(cursor)
+        query = query.filter(tuple_(Conversation.started_at, Conversation.id) < (started_at, convo_id))
+    rows = _fetch(query.order_by(Conversation.started_at.desc(), Conversation.id.desc()), limit)
+    page = _page(response, rows, limit, lambda row: (row.started_at, row.id))
+    return [dict(row._mapping) for row in page]
 
 @router.get("/conversations/{conversation_id}/messages")
-def get_conversation_messages(conversation_id: str, db: Session = Depends(get_db)):
+def get_conversation_messages(conversation_id: str, response: Response,
+                              limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: str | None = None,
+                              since: datetime | None = None, db: Session = Depends(get_db)):
     """
-    Retrieves all messages for a specific conversation.
+    Retrieves the messages of a specific conversation in chronological order, one page at a time.
+
+    Pages are keyset-paginated on (timestamp, id); when more messages remain, the
+    `X-Next-Cursor` response header holds the cursor of the next page. Without `limit` and
+    `cursor` every message is returned.
 
     Args:
         conversation_id (str): The unique ID of the conversation.
+        limit (int, optional): Maximum number of messages to return. Defaults to all of them,
+            or 500 when a cursor is given.
+        cursor (str, optional): The `X-Next-Cursor` value of the previous page.
+        since (datetime, optional): Only return messages sent after this time, e.g. the
+            timestamp of the last message already shown.
 
     Returns:
         list[dict]: A list of message objects, each with role, content, and timestamp.
 
     Raises:
-        HTTPException: If the conversation does not exist.
+        HTTPException: If the conversation does not exist or the cursor is malformed.
     """
-    convo = db.query(Conversation).filter_by(id=conversation_id).first()
-    if not convo:
+    # Read-your-writes: include the conversation's messages still queued for the database
+    message_writer.wait_for(conversation_id)
+    if db.query(Conversation.id).filter_by(id=conversation_id).first() is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    return [
-        {"role": msg.role, "content": msg.content, "timestamp": msg.timestamp}
-        for msg in convo.messages
-    ]
+    query = db.query(Message.id, Message.role, Message.content, Message.timestamp) \
+        .filter(Message.conversation_id == conversation_id)
+    if since is not None:
+        query = query.filter(Message.timestamp > since)
+    if cursor:
+        timestamp, message_id = _decode_cursor(cursor, int)
+        query = query.filter(tuple_(Message.timestamp, Message.id) > (timestamp, message_id))
+    limit = _page_size(limit, cursor, MAX_PAGE_SIZE)
+    rows = _fetch(query.order_by(Message.timestamp, Message.id), limit)
+    page = _page(response, rows, limit, lambda row: (row.timestamp, row.id))
+    return [{"role": row.role, "content": row.content, "timestamp": row.timestamp} for row in page]
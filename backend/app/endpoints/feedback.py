@@ -1,8 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 
-from app.db.database import db_session
+from app.db.database import get_db
 from app.db.models import Feedback
+from app.core import feedback_rollup
 
 router = APIRouter()
 
@@ -15,12 +17,13 @@ class FeedbackIn(BaseModel):
     comment: str = ""
 
 @router.post("/")
-def submit_feedback(feedback: FeedbackIn):
+def submit_feedback(feedback: FeedbackIn, db: Session = Depends(get_db)):
     """
     Submits or updates feedback for a specific assistant message in a conversation.
 
     If feedback for the same message already exists, it will be updated with the new rating and comment.
-    Otherwise, a new feedback entry is created.
+    Otherwise, a new feedback entry is created. The version's analytics rollup is updated in
+    the same transaction.
 
     Args:
         feedback (FeedbackIn): Feedback input including conversation ID, version, message, rating, and optional comment.
@@ -28,17 +31,19 @@ def submit_feedback(feedback: FeedbackIn):
     Returns:
         dict: A status message indicating success (e.g., {"status": "ok"}).
     """
-    existing = db_session.query(Feedback).filter_by(
+    existing = db.query(Feedback).filter_by(
         conversation_id=feedback.conversation_id,
         message=feedback.message
     ).first()
 
     if existing:
+        feedback_rollup.record(db, existing.version, feedback.rating, existing.rating, is_new=False)
         existing.rating = feedback.rating
         existing.comment = feedback.comment
     else:
         fb = Feedback(**feedback.dict())
-        db_session.add(fb)
+        db.add(fb)
+        feedback_rollup.record(db, feedback.version, feedback.rating)
 
-    db_session.commit()
+    db.commit()
     return {"status": "ok"}
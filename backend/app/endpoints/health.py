@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.startup import readiness
+
+router = APIRouter()
+
+
+@router.get("/live")
+def live():
+    """
+    Liveness probe: the process is up and serving requests.
+
+    Returns:
+        dict: {"status": "ok"}.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready():
+    """
+    Readiness probe: the startup warm-up finished without errors.
+
+    Returns:
+        JSONResponse: 200 once ready, 503 while warming up or if a step failed, with the
+            per-step timings (seconds) and errors.
+    """
+    if readiness["ready"]:
+        status = "ready"
+    elif readiness["finished_at"] is None:
+        status = "warming_up"
+    else:
+        status = "failed"
+    body = {"status": status, "steps": readiness["steps"], "errors": readiness["errors"]}
+    return JSONResponse(body, status_code=200 if readiness["ready"] else 503)
@@ -1,38 +1,48 @@
-from fastapi import APIRouter
-from app.db.database import db_session
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from app.core.knowledge import keyword_matcher
+from app.core.metadata_cache import KEYWORDS, bump
+from app.db.database import get_db
 from app.db.models import Knowledge
 from app.schemas.knowledge import KnowledgeBase, KnowledgeUpdate
 
 router = APIRouter()
 
 @router.post("/")
-def create_entry(entry: KnowledgeBase):
-    existing = db_session.query(Knowledge).filter_by(keyword=entry.keyword).first()
+def create_entry(entry: KnowledgeBase, db: Session = Depends(get_db)):
+    existing = db.query(Knowledge).filter_by(keyword=entry.keyword).first()
     if existing:
         raise HTTPException(status_code=400, detail="Keyword already exists")
     new_entry = Knowledge(keyword=entry.keyword, content=entry.content)
-    db_session.add(new_entry)
-    db_session.commit()
+    db.add(new_entry)
+    bump(db, KEYWORDS)
+    db.commit()
+    keyword_matcher.add(new_entry)
     return {"status": "created"}
 
 @router.get("/")
-def list_entries():
-    return db_session.query(Knowledge).all()
+def list_entries(db: Session = Depends(get_db)):
+    return db.query(Knowledge).all()
 
 @router.put("/{keyword}")
-def update_entry(keyword: str, update: KnowledgeUpdate):
-    entry = db_session.query(Knowledge).filter_by(keyword=keyword).first()
+def update_entry(keyword: str, update: KnowledgeUpdate, db: Session = Depends(get_db)):
+    entry = db.query(Knowledge).filter_by(keyword=keyword).first()
     if not entry:
         raise HTTPException(status_code=404, detail="Not found")
     entry.content = update.content
-    db_session.commit()
+    bump(db, KEYWORDS)
+    db.commit()
+    keyword_matcher.update(entry)
     return {"status": "updated"}
 
 @router.delete("/{keyword}")
-def delete_entry(keyword: str):
-    entry = db_session.query(Knowledge).filter_by(keyword=keyword).first()
+def delete_entry(keyword: str, db: Session = Depends(get_db)):
+    entry = db.query(Knowledge).filter_by(keyword=keyword).first()
     if not entry:
         raise HTTPException(status_code=404, detail="Not found")
-    db_session.delete(entry)
-    db_session.commit()
+    entry_id = entry.id
+    db.delete(entry)
+    bump(db, KEYWORDS)
+    db.commit()
+    keyword_matcher.remove(entry_id)
     return {"status": "deleted"}
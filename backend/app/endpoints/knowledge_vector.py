@@ -1,29 +1,51 @@
-from fastapi import APIRouter, UploadFile, Form
-from app.utils.chunker import chunk_text
-from app.core.knowledge_vector import add_knowledge_chunks
-from app.core.knowledge_vector import collection
+from fastapi import APIRouter, UploadFile, Form, HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.core import ingestion
+from app.core.knowledge_vector import get_collection, embedding_cache
 
 router = APIRouter()
 
-@router.post("/upload/")
+
+@router.post("/upload/", status_code=202)
 async def upload_knowledge(topic: str = Form(...), file: UploadFile = Form(...)):
     """
-    Uploads a text file and stores its content in the vector database as knowledge chunks.
+    Queues a text file for ingestion into the vector database as knowledge chunks.
 
-    The file is split into smaller chunks using a text chunking utility,
-    and each chunk is stored with the associated topic for semantic search.
+    The file is saved to disk and a background job splits it into chunks, embeds them and
+    stores each chunk with the associated topic for semantic search. Re-uploading a topic only
+    embeds chunks that changed and removes chunks that are gone. Poll `/jobs/{job_id}` for
+    progress.
 
     Args:
         topic (str): A label or category for the uploaded content.
         file (UploadFile): A plain text file (.txt) containing the knowledge content.
 
     Returns:
-        dict: Upload status and the number of chunks created.
+        dict: The queued job, including its "job_id".
+    """
+    return await run_in_threadpool(ingestion.enqueue, topic, file.filename, file.file)
+
+
+@router.get("/jobs/{job_id}")
+def ingestion_job(job_id: str):
+    """
+    Reports the status of an ingestion job.
+
+    Args:
+        job_id (str): The ID returned by the upload endpoint.
+
+    Returns:
+        dict: The job's status ("queued", "running", "done" or "failed"), attempts, the number of
+            chunks read so far, how many were added, skipped as unchanged or deleted as stale, and
+            the last error.
+
+    Raises:
+        HTTPException: If there is no such job.
     """
-    content = (await file.read()).decode("utf-8")
-    chunks = chunk_text(content)
-    add_knowledge_chunks(topic, chunks)
-    return {"status": "uploaded", "chunks": len(chunks)}
+    job = ingestion.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @router.get("/list")
@@ -34,4 +56,15 @@ def list_chunks():
     Returns:
         list[dict]: A list of stored documents and their metadata.
     """
-    return collection.get(include=["documents", "metadatas"])
\ No newline at end of file
+    return get_collection().get(include=["documents", "metadatas"])
+
+
+@router.get("/stats")
+def retrieval_stats():
+    """
+    Reports retrieval cache statistics.
+
+    Returns:
+        dict: Size, hit and miss counters of the query embedding cache.
+    """
+    return {"embedding_cache": embedding_cache.stats()}
@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.endpoints import feedback, analytics, knowledge, knowledge_vector, config, config_db, chatbot_stream, conversations
-from app.db.database import create_tables
+from app.endpoints import feedback, analytics, knowledge, knowledge_vector, config, config_db, chatbot_stream, conversations, health
+from app.db.database import Session, create_tables
+from app.core.startup import start_warm_up
+from app.core import feedback_rollup, ingestion
+from app.core.persistence import message_writer
 
 app = FastAPI(title="Chatbot")
 
@@ -12,6 +15,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(feedback.router, prefix="/api/v1/feedback")
@@ -22,7 +26,17 @@ app.include_router(config.router, prefix="/api/v1/config", tags=["Config"])
 app.include_router(config_db.router, prefix="/api/v1/config-db", tags=["ConfigDB"])
 app.include_router(chatbot_stream.router, prefix="/api/v1", tags=["ChatbotStream"])
 app.include_router(conversations.router, prefix="/api/v1")
+app.include_router(health.router, prefix="/api/v1/health", tags=["Health"])
 
 @app.on_event("startup")
 async def startup():
     create_tables()
+    with Session() as db:
+        feedback_rollup.backfill(db)
+    start_warm_up()
+    ingestion.resume_jobs()
+
+@app.on_event("shutdown")
+async def shutdown():
+    ingestion.shutdown()
+    message_writer.close()
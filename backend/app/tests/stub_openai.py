@@ -0,0 +1,202 @@
+"""
+Minimal local stand-in for the OpenAI HTTP API, used by tests and benchmarks.
+
+Only the streaming Responses, the Embeddings and the Assistants endpoints used by file-based chat
+(assistants, threads, messages, streaming runs) are implemented. Point a client at it with
+`OPENAI_BASE_URL=<url>/v1` (see `run_stub_server`).
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="OpenAI stub")
+
+# Tunables, changed by tests/benchmarks before starting a stream
+settings = {
+    "tokens": ["Hello", ",", " this", " is", " a", " stubbed", " reply", "."],
+    "first_token_delay": 0.05,
+    "token_delay": 0.01,
+}
+
+stats = {"responses": 0, "embeddings": 0, "assistants": 0, "threads": 0, "runs": 0, "cancelled_runs": 0}
+
+# Messages posted to each stub thread, in order
+threads = {}
+# The input of every response request, in order
+inputs = []
+
+
+def _event(payload: dict) -> str:
+    return f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.post("/v1/responses")
+async def create_response(request: Request):
+    body = await request.json()
+    stats["responses"] += 1
+    inputs.append(body["input"])
+
+    async def events():
+        yield _event({"type": "response.created", "sequence_number": 0, "response": {"id": "resp_stub"}})
+        await asyncio.sleep(settings["first_token_delay"])
+        seq = 1
+        text = ""
+        for token in settings["tokens"]:
+            text += token
+            yield _event({
+                "type": "response.output_text.delta",
+                "item_id": "msg_stub",
+                "output_index": 0,
+                "content_index": 0,
+                "delta": token,
+                "logprobs": [],
+                "sequence_number": seq,
+            })
+            seq += 1
+            await asyncio.sleep(settings["token_delay"])
+        yield _event({
+            "type": "response.output_text.done",
+            "item_id": "msg_stub",
+            "output_index": 0,
+            "content_index": 0,
+            "text": text,
+            "logprobs": [],
+            "sequence_number": seq,
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def create_embeddings(request: Request):
+    body = await request.json()
+    stats["embeddings"] += 1
+    texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    return {
+        "object": "list",
+        "model": body["model"],
+        "data": [
+            {"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0, float(i)]}
+            for i, text in enumerate(texts)
+        ],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.post("/v1/assistants")
+async def create_assistant(request: Request):
+    body = await request.json()
+    stats["assistants"] += 1
+    return {"id": f"asst_{stats['assistants']}", "object": "assistant", "created_at": 0, "metadata": {}, **body}
+
+
+@app.post("/v1/threads")
+async def create_thread():
+    stats["threads"] += 1
+    thread_id = f"thread_{stats['threads']}"
+    threads[thread_id] = []
+    return {"id": thread_id, "object": "thread", "created_at": 0, "metadata": {}}
+
+
+@app.post("/v1/threads/{thread_id}/messages")
+async def create_message(thread_id: str, request: Request):
+    body = await request.json()
+    threads[thread_id].append(body)
+    return {
+        "id": f"msg_{len(threads[thread_id])}", "object": "thread.message", "created_at": 0,
+        "thread_id": thread_id, "role": body["role"], "attachments": body.get("attachments"),
+        "content": [{"type": "text", "text": {"value": body["content"], "annotations": []}}],
+    }
+
+
+@app.post("/v1/threads/{thread_id}/runs")
+async def create_run(thread_id: str, request: Request):
+    body = await request.json()
+    stats["runs"] += 1
+    run = {"id": f"run_{stats['runs']}", "object": "thread.run", "created_at": 0, "thread_id": thread_id,
+           "assistant_id": body["assistant_id"], "status": "queued", "last_error": None}
+
+    async def events():
+        yield f"event: thread.run.created\ndata: {json.dumps(run)}\n\n"
+        await asyncio.sleep(settings["first_token_delay"])
+        for token in settings["tokens"]:
+            delta = {"id": "msg_stub", "object": "thread.message.delta", "delta": {
+                "content": [{"index": 0, "type": "text", "text": {"value": token, "annotations": []}}],
+            }}
+            yield f"event: thread.message.delta\ndata: {json.dumps(delta)}\n\n"
+            await asyncio.sleep(settings["token_delay"])
+        yield f"event: thread.run.completed\ndata: {json.dumps({**run, 'status': 'completed'})}\n\n"
+        yield "event: done\ndata: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/threads/{thread_id}/runs/{run_id}/cancel")
+async def cancel_run(thread_id: str, run_id: str):
+    stats["cancelled_runs"] += 1
+    return {"id": run_id, "object": "thread.run", "created_at": 0, "thread_id": thread_id,
+            "assistant_id": "", "status": "cancelling"}
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_stub_server(separate_process: bool = False):
+    """
+    Runs the stub for the duration of the context.
+
+    Args:
+        separate_process (bool, optional): Serve from a child process instead of a background
+            thread, so the stub does not compete with the code under test for the GIL.
+            Defaults to False.
+
+    Yields:
+        str: Base URL to use as `OPENAI_BASE_URL` (e.g. "http://127.0.0.1:1234/v1").
+    """
+    port = _free_port()
+    if separate_process:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.tests.stub_openai:app",
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+        )
+        while proc.poll() is None:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        try:
+            yield f"http://127.0.0.1:{port}/v1"
+        finally:
+            proc.terminate()
+            proc.wait()
+        return
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        server.should_exit = True
+        thread.join()
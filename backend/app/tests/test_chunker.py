@@ -0,0 +1,52 @@
+import re
+import unittest
+from app.utils.chunker import chunk_text, iter_chunks, _encoding
+
+SENTENCES = [f"Sentence number {i} talks about topic {i % 7} in some detail." for i in range(400)]
+TEXT = "\n\n".join(" ".join(SENTENCES[i:i + 5]) for i in range(0, len(SENTENCES), 5))
+
+
+def n_tokens(text: str) -> int:
+    return len(_encoding().encode(text))
+
+
+class ChunkerTests(unittest.TestCase):
+    def test_chunks_respect_token_limit_and_keep_all_text(self):
+        chunks = chunk_text(TEXT, max_tokens=100)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(n_tokens(chunk), 100)
+        self.assertEqual(" ".join(" ".join(chunks).split()), " ".join(TEXT.split()))
+
+    def test_chunks_end_on_sentence_breaks(self):
+        for chunk in chunk_text(TEXT, max_tokens=100):
+            self.assertTrue(chunk.endswith("."), chunk[-40:])
+
+    def test_overlap_repeats_tail_of_previous_chunk(self):
+        sentence = max(n_tokens(s + "\n\n") for s in SENTENCES)
+        chunks = chunk_text(TEXT, max_tokens=5 * sentence, overlap=sentence)
+        self.assertGreater(len(chunks), 1)
+        for previous, current in zip(chunks, chunks[1:]):
+            last_sentence = re.split(r"(?<=\.)\s+", previous)[-1]
+            self.assertTrue(current.startswith(last_sentence), (previous[-60:], current[:60]))
+
+    def test_oversized_sentence_is_split(self):
+        text = "word " * 1000
+        chunks = chunk_text(text, max_tokens=50)
+        self.assertTrue(all(n_tokens(c) <= 50 for c in chunks))
+        self.assertEqual(sum(c.count("word") for c in chunks), 1000)
+
+    def test_streaming_matches_whole_document(self):
+        pieces = [TEXT[i:i + 37] for i in range(0, len(TEXT), 37)]
+        self.assertEqual(list(iter_chunks(pieces, max_tokens=100, overlap=20)), chunk_text(TEXT, 100, 20))
+
+    def test_empty_text(self):
+        self.assertEqual(chunk_text(""), [])
+
+    def test_invalid_overlap(self):
+        with self.assertRaises(ValueError):
+            chunk_text(TEXT, max_tokens=50, overlap=50)
+
+
+if __name__ == "__main__":
+    unittest.main()
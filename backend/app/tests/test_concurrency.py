@@ -0,0 +1,59 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import Session, create_tables
+from app.db.models import Feedback
+
+client = TestClient(app)
+
+
+class ConcurrentLoadTests(unittest.TestCase):
+    """Many requests at once must each see only their own session and data."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
+    def test_concurrent_feedback_does_not_interfere(self):
+        convo_ids = [str(uuid4()) for _ in range(40)]
+
+        def submit(i: int) -> int:
+            payload = {
+                "conversation_id": convo_ids[i],
+                "version": "A" if i % 2 else "B",
+                "message": f"Reply {i}",
+                "user_message": f"Question {i}",
+                "rating": 1 if i % 2 else -1,
+                "comment": f"comment {i}",
+            }
+            return client.post("/api/v1/feedback", json=payload).status_code
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(submit, range(len(convo_ids))))
+
+        self.assertEqual(statuses, [200] * len(convo_ids))
+        with Session() as db:
+            rows = db.query(Feedback).filter(Feedback.conversation_id.in_(convo_ids)).all()
+        self.assertEqual(len(rows), len(convo_ids))
+        for row in rows:
+            i = convo_ids.index(row.conversation_id)
+            self.assertEqual(row.message, f"Reply {i}")
+            self.assertEqual(row.rating, 1 if i % 2 else -1)
+            self.assertEqual(row.comment, f"comment {i}")
+
+    def test_concurrent_conversation_requests(self):
+        def create_and_read(_) -> tuple[int, list]:
+            convo_id = client.post("/api/v1/conversations").json()["id"]
+            resp = client.get(f"/api/v1/conversations/{convo_id}/messages")
+            return resp.status_code, resp.json()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(create_and_read, range(32)))
+
+        self.assertEqual(results, [(200, [])] * 32)
+
+
+if __name__ == "__main__":
+    unittest.main()
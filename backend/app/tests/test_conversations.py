@@ -1,11 +1,22 @@
+import os
+import tempfile
 import unittest
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app.db.database import create_tables, get_db, make_engine
+from app.db.models import Conversation, Message
 from app.main import app
 
 client = TestClient(app)
 
 class TestConversations(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
     def test_create_conversation(self):
         response = client.post("/api/v1/conversations")
         self.assertEqual(response.status_code, 200)
@@ -23,5 +34,100 @@ class TestConversations(unittest.TestCase):
         self.assertEqual(msg_res.status_code, 200)
         self.assertEqual(msg_res.json(), [])
 
+
+class TestPagination(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.engine = make_engine(f"sqlite:///{os.path.join(tmpdir.name, 'chatbot.db')}")
+        self.addCleanup(self.engine.dispose)
+        create_tables(self.engine)
+        self.Session = Session = sessionmaker(bind=self.engine)
+
+        def override():
+            with Session() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override
+        self.addCleanup(app.dependency_overrides.pop, get_db)
+
+        self.start = datetime(2024, 1, 1)
+        with Session() as db:
+            # Pairs of conversations share a start time, so the id breaks ties
+            db.add_all(Conversation(id=f"c{i:02d}", version="A", started_at=self.start + timedelta(minutes=i // 2))
+                       for i in range(25))
+            db.add_all(Message(conversation_id="c00", role="user", content=f"m{i}",
+                               timestamp=self.start + timedelta(seconds=i // 3)) for i in range(10))
+            db.commit()
+
+    def _pages(self, url, **params):
+        pages, cursor = [], None
+        while True:
+            response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return pages
+
+    def test_conversation_pages_cover_every_row_once(self):
+        pages = self._pages("/api/v1/conversations", limit=10)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        ids = [row["id"] for page in pages for row in page]
+        self.assertEqual(ids, [f"c{i:02d}" for i in reversed(range(25))])
+        self.assertEqual(set(pages[0][0]), {"id", "version", "started_at", "file_id"})
+
+    def test_conversations_since(self):
+        response = client.get("/api/v1/conversations", params={"since": (self.start + timedelta(minutes=10)).isoformat()})
+        self.assertEqual([row["id"] for row in response.json()], ["c24", "c23", "c22"])
+
+    def test_message_pages_and_since(self):
+        pages = self._pages("/api/v1/conversations/c00/messages", limit=4)
+        self.assertEqual([[m["content"] for m in page] for page in pages],
+                         [["m0", "m1", "m2", "m3"], ["m4", "m5", "m6", "m7"], ["m8", "m9"]])
+
+        response = client.get("/api/v1/conversations/c00/messages",
+                              params={"since": (self.start + timedelta(seconds=2)).isoformat()})
+        self.assertEqual([m["content"] for m in response.json()], ["m9"])
+
+    def test_default_page_sizes(self):
+        with self.Session() as db:
+            db.add_all(Conversation(id=f"extra{i:02d}", started_at=self.start) for i in range(40))
+            db.add_all(Message(conversation_id="c01", role="user", content=f"m{i}",
+                               timestamp=self.start + timedelta(seconds=i)) for i in range(510))
+            db.commit()
+
+        # The list is bounded however many conversations exist
+        pages = self._pages("/api/v1/conversations")
+        self.assertEqual([len(page) for page in pages], [50, 15])
+
+        # A conversation's history still comes whole to clients that do not page
+        response = client.get("/api/v1/conversations/c01/messages")
+        self.assertEqual([m["content"] for m in response.json()], [f"m{i}" for i in range(510)])
+        self.assertNotIn("x-next-cursor", response.headers)
+
+    def test_only_conversations_with_messages(self):
+        with self.Session() as db:
+            db.add(Message(conversation_id="c20", role="user", content="hi", timestamp=self.start))
+            db.commit()
+
+        pages = self._pages("/api/v1/conversations", limit=1, has_messages=True)
+        self.assertEqual([row["id"] for page in pages for row in page], ["c20", "c00"])
+
+    def test_invalid_cursor(self):
+        response = client.get("/api/v1/conversations", params={"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_uses_index(self):
+        with self.engine.connect() as conn:
+            plan = conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM conversations WHERE (started_at, id) < ('2024-01-01', 'c10') "
+                "ORDER BY started_at DESC, id DESC LIMIT 11"
+            )).fetchall()
+        details = " ".join(row[-1] for row in plan)
+        self.assertIn("ix_conversations_started_at_id", details)
+        self.assertNotIn("TEMP B-TREE", details)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine, inspect, text
+from app.db.database import create_tables, make_engine
+
+
+class StorageLayerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.tmpdir.name, 'chatbot.db')}"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_sqlite_pragmas_are_applied(self):
+        engine = make_engine(self.url)
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)  # NORMAL
+        engine.dispose()
+
+    def test_create_tables_migrates_existing_database(self):
+        # A database created before the indexes and newer columns existed
+        old = create_engine(self.url)
+        with old.begin() as conn:
+            conn.execute(text("CREATE TABLE conversations (id VARCHAR PRIMARY KEY, version VARCHAR, started_at DATETIME)"))
+            conn.execute(text("CREATE INDEX ix_conversations_started_at ON conversations (started_at)"))
+            conn.execute(text(
+                "CREATE TABLE messages (id INTEGER PRIMARY KEY, conversation_id VARCHAR, "
+                "role VARCHAR, content VARCHAR, timestamp DATETIME)"
+            ))
+            conn.execute(text("INSERT INTO conversations (id, version) VALUES ('c1', 'A')"))
+        old.dispose()
+
+        engine = make_engine(self.url)
+        create_tables(engine)
+
+        inspector = inspect(engine)
+        self.assertIn("file_id", {c["name"] for c in inspector.get_columns("conversations")})
+        conversation_indexes = {ix["name"] for ix in inspector.get_indexes("conversations")}
+        self.assertIn("ix_conversations_started_at_id", conversation_indexes)
+        self.assertNotIn("ix_conversations_started_at", conversation_indexes)  # superseded
+        self.assertIn("ix_messages_conversation_id_timestamp", {ix["name"] for ix in inspector.get_indexes("messages")})
+        self.assertIn("ix_feedback_conversation_id_message", {ix["name"] for ix in inspector.get_indexes("feedback")})
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT version FROM conversations WHERE id = 'c1'")).scalar(), "A")
+
+        create_tables(engine)  # running it again is a no-op
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+import chromadb
+import numpy as np
+
+from app.core import knowledge_vector
+from app.core.embeddings import EmbeddingProvider, HashingEmbeddings, OpenAIEmbeddings, get_embedding_provider
+from app.db.database import create_tables
+from app.tests import stub_openai
+from app.utils.bm25 import BM25Index
+
+
+class HashingEmbeddingsTests(unittest.TestCase):
+    def setUp(self):
+        self.provider = HashingEmbeddings(dim=256)
+
+    def test_vectors_are_deterministic_and_normalized(self):
+        first = self.provider(["Reset your password", ""])
+        second = HashingEmbeddings(dim=256)(["Reset your password", ""])
+        np.testing.assert_array_equal(first[0], second[0])
+        self.assertEqual(first[0].shape, (256,))
+        self.assertAlmostEqual(float(np.linalg.norm(first[0])), 1.0, places=5)
+        self.assertFalse(first[1].any())
+
+    def test_related_texts_are_closer(self):
+        query, related, unrelated = self.provider(
+            ["how to reset passwords", "reset your password in settings", "billing happens monthly"]
+        )
+        self.assertGreater(query @ related, query @ unrelated)
+
+    def test_batch_matches_single_calls(self):
+        texts = [f"document {i} about {word}" for i, word in enumerate(["cats", "dogs", "tax"] * 5)]
+        self.provider.max_batch_size = 4
+        batched = self.provider(texts)
+        for text, vector in zip(texts, batched):
+            np.testing.assert_allclose(self.provider([text])[0], vector)
+
+    def test_collection_depends_on_provider(self):
+        self.assertEqual(self.provider.collection_name("knowledge"), "knowledge-local-256")
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            get_embedding_provider("nope")
+
+    def test_provider_must_implement_embed_batch(self):
+        class Incomplete(EmbeddingProvider):
+            name = "incomplete"
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+class OpenAIEmbeddingsTests(unittest.TestCase):
+    def test_splits_requests_and_keeps_order(self):
+        with stub_openai.run_stub_server() as base_url:
+            provider = OpenAIEmbeddings(api_key="test")
+            provider._client = provider._client.with_options(base_url=base_url)
+            provider.max_batch_size = 2
+            calls = stub_openai.stats["embeddings"]
+            vectors = provider(["a", "bb", "ccc", "dddd", "eeeee"])
+
+        self.assertEqual(stub_openai.stats["embeddings"] - calls, 3)
+        self.assertEqual([float(v[0]) for v in vectors], [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(provider.collection_name("knowledge"), "knowledge")
+
+
+class LocalRetrievalTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
+    def test_search_runs_offline_with_local_provider(self):
+        provider = HashingEmbeddings(dim=256)
+        collection = chromadb.EphemeralClient().get_or_create_collection(
+            provider.collection_name("test-retrieval"), embedding_function=None
+        )
+        self.addCleanup(chromadb.EphemeralClient().delete_collection, collection.name)
+        # A private lexical index, and no hybrid fast path, so the dense retrieval really runs
+        embed_query = mock.Mock(wraps=knowledge_vector.embed_query)
+        for patch in (
+            mock.patch.object(knowledge_vector, "collection", collection),
+            mock.patch.object(knowledge_vector, "embedding_fn", provider),
+            mock.patch.object(knowledge_vector, "lexical_index", BM25Index()),
+            mock.patch.object(knowledge_vector, "HYBRID_SEARCH", False),
+            mock.patch.object(knowledge_vector, "embed_query", embed_query),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        knowledge_vector.add_knowledge_chunks("faq", [
+            "To reset your password open the account settings page.",
+            "Invoices are sent by email at the start of every month.",
+            "Our office is closed on public holidays.",
+        ])
+        results = knowledge_vector.search_knowledge_vector("How can I reset my password?", top_k=3)
+        self.assertIn("reset your password", results[0])
+        embed_query.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
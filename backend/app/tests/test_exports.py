@@ -0,0 +1,112 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db import database
+from app.db.database import create_tables, make_engine
+from app.db.models import Conversation, Feedback, Message
+from app.endpoints import analytics
+from app.main import app
+
+client = TestClient(app)
+
+
+class ExportTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.engine = make_engine(f"sqlite:///{os.path.join(tmpdir.name, 'chatbot.db')}")
+        self.addCleanup(self.engine.dispose)
+        create_tables(self.engine)
+        patch = mock.patch.object(database, "Session", sessionmaker(bind=self.engine))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        with database.Session() as db:
+            db.add_all([
+                Conversation(id="c1", version="A", started_at=datetime(2024, 1, 1)),
+                Conversation(id="c2", version="B", started_at=datetime(2024, 1, 2)),
+                Conversation(id="c3", version="A", started_at=datetime(2024, 1, 3)),
+                Message(conversation_id="c1", role="user", content="Hi, there", timestamp=datetime(2024, 1, 1, 0, 1)),
+                Message(conversation_id="c1", role="assistant", content='Hello "you"', timestamp=datetime(2024, 1, 1, 0, 2)),
+                Message(conversation_id="c2", role="user", content="Olá", timestamp=datetime(2024, 1, 2, 0, 1)),
+                Feedback(conversation_id="c1", version="A", message="Hello", user_message="Hi", rating=1,
+                         comment="", created_at=datetime(2024, 1, 1)),
+                Feedback(conversation_id="c2", version="B", message="Olá", user_message="?", rating=-1,
+                         comment="bad, really", created_at=datetime(2024, 1, 2)),
+                Feedback(conversation_id="c3", version="A", message="Bye", user_message="!", rating=0,
+                         comment="", created_at=datetime(2024, 1, 3)),
+            ])
+            db.commit()
+
+    def test_feedback_csv_with_filters(self):
+        response = client.get("/api/v1/analytics/export/feedback",
+                              params={"version": "A", "since": "2024-01-02T00:00:00"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "text/csv; charset=utf-8")
+        rows = list(csv.reader(io.StringIO(response.text)))
+        self.assertEqual(rows[0], list(analytics.FEEDBACK_COLUMNS))
+        self.assertEqual([row[1:3] for row in rows[1:]], [["c3", "A"]])
+
+    def test_conversations_ndjson_groups_messages(self):
+        response = client.get("/api/v1/analytics/export/conversations",
+                              params={"format": "ndjson", "until": "2024-01-03T00:00:00"})
+        documents = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([doc["conversation_id"] for doc in documents], ["c1", "c2"])
+        self.assertEqual([m["content"] for m in documents[0]["messages"]], ["Hi, there", 'Hello "you"'])
+        self.assertEqual(documents[1]["messages"][0]["timestamp"], "2024-01-02T00:01:00")
+
+        rows = list(csv.reader(io.StringIO(client.get("/api/v1/analytics/export/conversations").text)))
+        self.assertEqual(len(rows), 1 + 3 + 1)  # header, three messages, c3 without messages
+
+    def test_gzip(self):
+        plain = client.get("/api/v1/analytics/export/feedback", params={"format": "ndjson"})
+        zipped = client.get("/api/v1/analytics/export/feedback", params={"format": "ndjson", "gzip": True})
+        self.assertEqual(zipped.headers["content-type"], "application/gzip")
+        self.assertIn("feedback.ndjson.gz", zipped.headers["content-disposition"])
+        self.assertEqual(gzip.decompress(zipped.content), plain.content)
+        self.assertEqual(len(plain.text.splitlines()), 3)
+
+    def test_memory_is_bounded(self):
+        rows = [{"conversation_id": f"bulk-{i}", "version": "AB"[i % 2], "message": "x" * 300,
+                 "user_message": "question", "rating": 1, "comment": "", "created_at": datetime(2024, 2, 1)}
+                for i in range(30000)]
+        with self.engine.begin() as conn:
+            conn.execute(insert(Feedback), rows)
+        del rows
+
+        async def consume(response):
+            total, first = 0, None
+            async for block in response.body_iterator:
+                first = first or block
+                total += len(block)
+            return first, total
+
+        response = analytics.export_feedback(format="csv")
+        tracemalloc.start()
+        try:
+            first, total = asyncio.run(consume(response))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(first, (",".join(analytics.FEEDBACK_COLUMNS) + "\r\n").encode())
+        # About 10 MB of output; the peak stays near one fetch batch plus a block
+        self.assertGreater(total, 9_000_000)
+        self.assertLess(peak, 4 * 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import case, func
+from sqlalchemy.orm import sessionmaker
+
+from app.core import feedback_rollup
+from app.db.database import create_tables, get_db, make_engine
+from app.db.models import Feedback, FeedbackRollup
+from app.main import app
+
+client = TestClient(app)
+
+
+def reference_summary(db) -> list[dict]:
+    """The original full-table GROUP BY, kept as the behavioural reference."""
+    data = db.query(
+        Feedback.version,
+        func.count(Feedback.id),
+        func.avg(func.nullif(Feedback.rating, 0)),
+        func.sum(case((Feedback.rating == 1, 1), else_=0)),
+        func.sum(case((Feedback.rating == -1, 1), else_=0)),
+    ).group_by(Feedback.version).order_by(Feedback.version).all()
+    return [
+        {
+            "version": version,
+            "total_feedback": total,
+            "average_score": round(avg or 0, 2),
+            "thumbs_up": up,
+            "thumbs_down": down,
+            "score_ratio": f"{up}:{down}",
+        }
+        for version, total, avg, up, down in data
+    ]
+
+
+class FeedbackRollupTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        engine = make_engine(f"sqlite:///{os.path.join(tmpdir.name, 'chatbot.db')}")
+        self.addCleanup(engine.dispose)
+        create_tables(engine)
+        self.Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+        def override():
+            with self.Session() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override
+        self.addCleanup(app.dependency_overrides.pop, get_db)
+
+    def _submit(self, conversation_id: str, version: str, message: str, rating: int):
+        response = client.post("/api/v1/feedback", json={
+            "conversation_id": conversation_id, "version": version, "message": message,
+            "user_message": "question", "rating": rating,
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def _submit_mixed(self):
+        for i, rating in enumerate([1, 1, -1, 0, 1, 5, -1]):
+            self._submit(f"c{i % 3}", "AB"[i % 2], f"answer {i}", rating)
+        # Upserts that change the rating of existing feedback
+        self._submit("c0", "A", "answer 0", -1)
+        self._submit("c1", "B", "answer 1", 0)
+        self._submit("c1", "A", "answer 4", 1)
+
+    def test_summary_matches_group_by_after_upserts(self):
+        self._submit_mixed()
+        with self.Session() as db:
+            expected = reference_summary(db)
+
+        self.assertEqual(client.get("/api/v1/analytics/summary").json(), expected)
+        self.assertEqual(expected[0]["total_feedback"], 4)
+
+    def test_rebuild_and_backfill(self):
+        self._submit_mixed()
+        with self.Session() as db:
+            expected = feedback_rollup.summary(db)
+            db.query(FeedbackRollup).delete()
+            db.commit()
+            self.assertTrue(feedback_rollup.backfill(db))
+            self.assertFalse(feedback_rollup.backfill(db))
+            self.assertEqual(feedback_rollup.summary(db), expected)
+            self.assertEqual(feedback_rollup.rebuild(db), 2)
+            self.assertEqual(feedback_rollup.summary(db), expected)
+
+    def test_csv_export(self):
+        self._submit("c1", "A", "answer", 1)
+        self._submit("c2", "A", "other", -1)
+        response = client.get("/api/v1/analytics/summary/export")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text.splitlines(), [
+            "Version,Total Feedback,Average Score,Thumbs Up,Thumbs Down",
+            "A,2,0.0,1,1",
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
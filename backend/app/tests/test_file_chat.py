@@ -0,0 +1,108 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+from uuid import uuid4
+
+from openai import AsyncOpenAI
+
+from app.core import chatbot_engine
+from app.db.database import Session, create_tables
+from app.db.models import Conversation
+from app.tests import stub_openai
+from app.utils.sse import sse_events
+
+
+async def _collect(conversation_id: str, message: str) -> list[str]:
+    return [frame async for frame in chatbot_engine.get_response_with_file(conversation_id, message)]
+
+
+class FileChatTests(unittest.TestCase):
+    """File-based chat against the local OpenAI stub."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+        cls.server = stub_openai.run_stub_server()
+        cls.base_url = cls.server.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__(None, None, None)
+
+    def setUp(self):
+        self.conversation_id = str(uuid4())
+        with Session() as db:
+            db.add(Conversation(id=self.conversation_id, version="A", file_id="file_abc"))
+            db.commit()
+        patches = [
+            mock.patch.dict(stub_openai.settings, first_token_delay=0, token_delay=0),
+            mock.patch.object(chatbot_engine, "_assistant_ids", {}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _run(self, message: str) -> list[str]:
+        # A fresh client per event loop, as each asyncio.run starts a new loop
+        client = AsyncOpenAI(api_key="test", base_url=self.base_url)
+        with mock.patch.object(chatbot_engine, "async_client", client):
+            return asyncio.run(_collect(self.conversation_id, message))
+
+    def test_streams_deltas_and_reuses_assistant_and_thread(self):
+        assistants, threads = stub_openai.stats["assistants"], stub_openai.stats["threads"]
+
+        first = self._run("What does the file say?")
+        second = self._run("And then?")
+
+        expected = stub_openai.settings["tokens"]
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        self.assertEqual(stub_openai.stats["assistants"] - assistants, 1)
+        self.assertEqual(stub_openai.stats["threads"] - threads, 1)
+
+        with Session() as db:
+            thread_id = db.query(Conversation).filter_by(id=self.conversation_id).first().thread_id
+        posted = stub_openai.threads[thread_id]
+        self.assertEqual([m["content"] for m in posted], ["What does the file say?", "And then?"])
+        self.assertEqual(posted[0]["attachments"][0]["file_id"], "file_abc")
+        self.assertNotIn("attachments", posted[1])
+
+    def test_slow_run_is_cancelled_at_the_deadline(self):
+        cancelled = stub_openai.stats["cancelled_runs"]
+        with mock.patch.dict(stub_openai.settings, first_token_delay=1.0), \
+                mock.patch.object(chatbot_engine, "FILE_RUN_TIMEOUT", 0.2):
+            frames = self._run("Hello?")
+
+        self.assertEqual(len(frames), 1)
+        self.assertIn("[Error: The assistant did not answer within 0.2 s]", frames[0])
+        self.assertEqual(stub_openai.stats["cancelled_runs"] - cancelled, 1)
+
+    def test_client_disconnect_cancels_the_run(self):
+        class LeavesAfterFirstFrame:
+            frames = 0
+
+            async def is_disconnected(self):
+                return self.frames > 0
+
+        async def consume():
+            request, first_frame_at = LeavesAfterFirstFrame(), None
+            deltas = chatbot_engine.get_response_with_file(self.conversation_id, "Hello?")
+            async for _ in sse_events(deltas, request, disconnect_poll=0.01):
+                request.frames += 1
+                first_frame_at = first_frame_at or time.perf_counter()
+            return request.frames, time.perf_counter() - first_frame_at
+
+        cancelled = stub_openai.stats["cancelled_runs"]
+        client = AsyncOpenAI(api_key="test", base_url=self.base_url)
+        with mock.patch.dict(stub_openai.settings, token_delay=0.2), \
+                mock.patch.object(chatbot_engine, "async_client", client):
+            frames, stopped_after = asyncio.run(consume())
+
+        self.assertEqual(frames, 1)
+        self.assertLess(stopped_after, 0.5)  # the rest of the run takes 1.4 s
+        self.assertEqual(stub_openai.stats["cancelled_runs"] - cancelled, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
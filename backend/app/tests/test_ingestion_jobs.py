@@ -0,0 +1,189 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from uuid import uuid4
+
+import chromadb
+from fastapi.testclient import TestClient
+
+from app.core import ingestion, knowledge_vector
+from app.core.metadata_cache import KNOWLEDGE
+from app.db.database import Session, create_tables
+from app.db.models import CacheVersion, IngestionJob
+from app.main import app
+from app.utils.bm25 import BM25Index
+
+client = TestClient(app)
+
+
+class FlakyEmbedding:
+    """Deterministic embeddings that fail the first `failures` calls with a connection error."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("embedding API unreachable")
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+
+
+class IngestionJobTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
+    def setUp(self):
+        self.embedding = FlakyEmbedding()
+        self.collection = chromadb.EphemeralClient().get_or_create_collection("test-jobs", embedding_function=None)
+        self.addCleanup(chromadb.EphemeralClient().delete_collection, "test-jobs")
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(ingestion.shutdown, True)
+        patches = [
+            mock.patch.object(knowledge_vector, "collection", self.collection),
+            mock.patch.object(knowledge_vector, "embedding_fn", self.embedding),
+            mock.patch.object(knowledge_vector, "lexical_index", BM25Index()),
+            mock.patch.object(knowledge_vector, "INGEST_BATCH_SIZE", 2),
+            mock.patch.object(ingestion, "INGEST_JOB_DIR", tmp.name),
+            mock.patch.object(ingestion, "INGEST_RETRY_DELAY", 0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.topic = f"topic-{uuid4()}"
+        self.text = "\n\n".join(f"Paragraph {i} explains feature {i} in detail." for i in range(6))
+
+    def _upload(self, content: bytes):
+        response = client.post("/api/v1/knowledge-vector/upload/", data={"topic": self.topic},
+                               files={"file": ("doc.txt", content, "text/plain")})
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def _wait(self, job_id: str) -> dict:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job = client.get(f"/api/v1/knowledge-vector/jobs/{job_id}").json()
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.02)
+        self.fail(f"job {job_id} did not finish")
+
+    def _knowledge_version(self) -> int:
+        with Session() as db:
+            return db.query(CacheVersion.version).filter_by(name=KNOWLEDGE).scalar() or 0
+
+    def test_upload_returns_job_and_ingests_in_background(self):
+        version = self._knowledge_version()
+        queued = self._upload(self.text.encode("utf-8"))
+        self.assertIn(queued["status"], ("queued", "running", "done"))
+
+        job = self._wait(queued["job_id"])
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["attempts"], 1)
+        self.assertGreater(job["chunks"], 0)
+        self.assertEqual(job["added"], job["chunks"])
+        self.assertEqual(self.collection.count(), job["chunks"])
+        self.assertEqual(os.listdir(ingestion.INGEST_JOB_DIR), [])
+        # Every worker learns that the knowledge base changed
+        self.assertEqual(self._knowledge_version(), version + 1)
+
+    def test_failed_job_publishes_the_chunks_it_stored(self):
+        def chunks(text):
+            yield from (f"Chunk {i} of a document that breaks." for i in range(10))
+            raise ValueError("unreadable section")
+
+        version = self._knowledge_version()
+        with mock.patch.object(ingestion, "iter_chunks", chunks):
+            job = self._wait(self._upload(self.text.encode("utf-8"))["job_id"])
+        self.assertEqual(job["status"], "failed")
+        self.assertGreater(self.collection.count(), 0)
+        self.assertEqual(self._knowledge_version(), version + 1)
+
+    def test_transient_failure_is_retried(self):
+        self.embedding.failures = 1
+        job = self._wait(self._upload(self.text.encode("utf-8"))["job_id"])
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["attempts"], 2)
+        self.assertIsNone(job["error"])
+        self.assertEqual(self.collection.count(), job["chunks"])
+
+    def test_invalid_text_fails_without_retry(self):
+        job = self._wait(self._upload(b"caf\xe9 \xff")["job_id"])
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["attempts"], 1)
+        self.assertIn("utf-8", job["error"])
+
+    def test_interrupted_jobs_are_resumed(self):
+        job_id = str(uuid4())
+        path = os.path.join(ingestion.INGEST_JOB_DIR, job_id)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.text)
+        with Session() as db:
+            db.add(IngestionJob(id=job_id, topic=self.topic, filename="doc.txt", path=path, status="running",
+                                attempts=1, chunks=0, added=0, skipped=0, deleted=0))
+            db.commit()
+
+        self.assertGreaterEqual(ingestion.resume_jobs(), 1)
+        job = self._wait(job_id)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["attempts"], 2)
+
+    def _running_job(self, heartbeat_at: datetime) -> str:
+        job_id = str(uuid4())
+        path = os.path.join(ingestion.INGEST_JOB_DIR, job_id)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.text)
+        with Session() as db:
+            db.add(IngestionJob(id=job_id, topic=self.topic, filename="doc.txt", path=path, status="running",
+                                worker="other-worker", heartbeat_at=heartbeat_at,
+                                attempts=1, chunks=0, added=0, skipped=0, deleted=0))
+            db.commit()
+        return job_id
+
+    def _job(self, job_id: str) -> IngestionJob:
+        with Session() as db:
+            return db.query(IngestionJob).filter_by(id=job_id).first()
+
+    def test_jobs_of_live_workers_are_left_alone(self):
+        live = self._running_job(datetime.utcnow())
+        ingestion.run_job(live)
+        job = self._job(live)
+        self.assertEqual((job.status, job.worker, job.attempts), ("running", "other-worker", 1))
+
+        stale = self._running_job(datetime.utcnow() - timedelta(seconds=ingestion.INGEST_JOB_LEASE + 1))
+        ingestion.run_job(stale)
+        job = self._job(stale)
+        self.assertEqual((job.status, job.worker, job.attempts), ("done", ingestion.WORKER_ID, 2))
+
+    def test_a_job_is_claimed_once(self):
+        job_id = str(uuid4())
+        with Session() as db:
+            db.add(IngestionJob(id=job_id, topic=self.topic, filename="doc.txt", path="unused", status="queued"))
+            db.commit()
+        self.assertEqual(ingestion._claim(job_id), (self.topic, "unused", 0))
+        self.assertIsNone(ingestion._claim(job_id))
+
+    def test_heartbeat_is_refreshed_while_running(self):
+        job_id = self._running_job(datetime(2020, 1, 1))
+        stop = threading.Event()
+        with mock.patch.object(ingestion, "INGEST_JOB_LEASE", 0.03):
+            thread = threading.Thread(target=ingestion._keep_alive, args=(job_id, stop))
+            thread.start()
+            time.sleep(0.1)
+            stop.set()
+            thread.join()
+        self.assertGreater(self._job(job_id).heartbeat_at, datetime.utcnow() - timedelta(seconds=1))
+
+    def test_unknown_job(self):
+        self.assertEqual(client.get("/api/v1/knowledge-vector/jobs/missing").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import random
+import unittest
+import uuid
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from app.core.knowledge import search_knowledge
+from app.core.metadata_cache import KEYWORDS, bump, metadata_cache
+from app.db.database import Session, create_tables
+from app.db.models import Knowledge
+from app.main import app
+from app.utils.aho_corasick import AhoCorasick
+
+client = TestClient(app)
+
+
+def reference_search(patterns, text):
+    """The original scan: first pattern, in priority order, contained in the text."""
+    for pattern, priority in sorted(patterns, key=lambda p: p[1]):
+        if pattern in text:
+            return priority
+    return None
+
+
+class AhoCorasickTests(unittest.TestCase):
+    def test_matches_reference_scan(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            patterns = [
+                ("".join(rng.choices("abc", k=rng.randint(1, 5))), priority)
+                for priority in rng.sample(range(100), rng.randint(1, 15))
+            ]
+            text = "".join(rng.choices("abcd", k=rng.randint(0, 30)))
+            self.assertEqual(AhoCorasick(patterns).search(text), reference_search(patterns, text))
+
+    def test_overlapping_and_suffix_patterns(self):
+        automaton = AhoCorasick([("she", 3), ("he", 2), ("hers", 1), ("his", 4)])
+        self.assertEqual(automaton.search("ushers"), 1)
+        self.assertEqual(automaton.search("ushe"), 2)
+        self.assertEqual(automaton.search("this"), 4)
+        self.assertIsNone(automaton.search("xyz"))
+
+    def test_empty_pattern_matches_everything(self):
+        self.assertEqual(AhoCorasick([("", 5), ("a", 1)]).search(""), 5)
+        self.assertIsNone(AhoCorasick([]).search("anything"))
+
+
+class KeywordKnowledgeTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
+    def setUp(self):
+        self.tag = uuid.uuid4().hex[:8]
+
+    def _create(self, keyword, content):
+        response = client.post("/api/v1/knowledge/", json={"keyword": keyword, "content": content})
+        self.assertEqual(response.status_code, 200)
+        self.addCleanup(client.delete, f"/api/v1/knowledge/{keyword}")
+
+    def test_lowest_id_wins_and_endpoints_keep_matcher_current(self):
+        first, second = f"refund-{self.tag}", f"policy-{self.tag}"
+        self._create(first, "first")
+        self._create(second, "second")
+        message = f"What is the {second.upper()} on {first}?"
+        self.assertEqual(search_knowledge(message), "first")
+
+        client.put(f"/api/v1/knowledge/{first}", json={"content": "first, edited"})
+        self.assertEqual(search_knowledge(message), "first, edited")
+
+        client.delete(f"/api/v1/knowledge/{first}")
+        self.assertEqual(search_knowledge(message), "second")
+        self.assertIsNone(search_knowledge(f"nothing about {self.tag} here"))
+
+    def test_changes_made_by_another_worker_are_picked_up(self):
+        keyword = f"warranty-{self.tag}"
+        self.assertIsNone(search_knowledge(f"Is the {keyword} transferable?"))
+
+        # Another worker writes straight to the database and bumps the shared counter
+        with Session() as db:
+            db.add(Knowledge(keyword=keyword, content="two years"))
+            bump(db, KEYWORDS)
+            db.commit()
+        self.addCleanup(client.delete, f"/api/v1/knowledge/{keyword}")
+
+        with mock.patch.object(metadata_cache, "check_interval", 0):
+            self.assertEqual(search_knowledge(f"Is the {keyword} transferable?"), "two years")
+
+
+if __name__ == "__main__":
+    unittest.main()
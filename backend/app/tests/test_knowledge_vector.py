@@ -0,0 +1,272 @@
+import unittest
+from unittest import mock
+import chromadb
+import numpy as np
+from app.core import knowledge_vector
+from app.core.knowledge_vector import mmr, mmr_batch
+from app.core.metadata_cache import KNOWLEDGE, bump, metadata_cache
+from app.db.database import Session, create_tables
+from app.utils.bm25 import BM25Index, tokenize
+
+
+def reference_mmr(query_embedding, doc_embeddings, lambda_param=0.5, top_n=3):
+    """The original loop-based implementation, kept as the behavioural reference."""
+    selected = []
+    remaining = list(range(len(doc_embeddings)))
+
+    doc_sim = np.dot(doc_embeddings, query_embedding)
+    doc_sim = doc_sim / (np.linalg.norm(doc_embeddings, axis=1) * np.linalg.norm(query_embedding) + 1e-8)
+
+    while len(selected) < top_n and remaining:
+        mmr_score = []
+        for i in remaining:
+            if not selected:
+                diversity_penalty = 0
+            else:
+                diversity_penalty = max([np.dot(doc_embeddings[i], doc_embeddings[j]) /
+                                         (np.linalg.norm(doc_embeddings[i]) * np.linalg.norm(doc_embeddings[j]) + 1e-8)
+                                         for j in selected])
+            mmr_score.append(lambda_param * doc_sim[i] - (1 - lambda_param) * diversity_penalty)
+
+        next_idx = remaining[np.argmax(mmr_score)]
+        selected.append(next_idx)
+        remaining.remove(next_idx)
+
+    return selected
+
+
+class MMRTests(unittest.TestCase):
+    def test_matches_reference_implementation(self):
+        rng = np.random.default_rng(0)
+        for trial in range(200):
+            k = int(rng.integers(1, 40))
+            dim = int(rng.integers(2, 64))
+            docs = rng.normal(size=(k, dim))
+            if trial % 5 == 0 and k > 2:
+                docs[1] = docs[0]  # exact duplicates exercise tie-breaking
+            query = rng.normal(size=dim)
+            lambda_param = float(rng.choice([0.0, 0.3, 0.5, 0.7, 1.0]))
+            top_n = int(rng.integers(1, 8))
+
+            self.assertEqual(
+                mmr(query, docs, lambda_param, top_n),
+                reference_mmr(query, docs, lambda_param, top_n),
+            )
+
+    def test_batch_matches_single_queries(self):
+        rng = np.random.default_rng(1)
+        docs = rng.normal(size=(50, 16))
+        queries = rng.normal(size=(6, 16))
+        self.assertEqual(mmr_batch(queries, docs, 0.5, 5), [mmr(q, docs, 0.5, 5) for q in queries])
+
+    def test_empty_candidates(self):
+        self.assertEqual(mmr([1.0, 0.0], np.empty((0, 2))), [])
+
+    def test_explicit_relevance_replaces_query_similarity(self):
+        docs = np.array([[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]])
+        self.assertEqual(mmr([1.0, 0.0], docs, 1.0, 1), [0])
+        self.assertEqual(mmr([1.0, 0.0], docs, 1.0, 1, relevance=[0.1, 1.0, 0.5]), [1])
+
+
+class BM25Tests(unittest.TestCase):
+    def setUp(self):
+        self.index = BM25Index()
+        self.index.add(
+            ["a", "b", "c"],
+            ["Error ERR-404 means the page was not found.", "Billing happens monthly.", "Reset the page cache."],
+        )
+
+    def test_codes_are_kept_whole_and_split(self):
+        self.assertEqual(tokenize("see ERR-404"), ["see", "err-404", "err", "404"])
+
+    def test_exact_code_ranks_first_with_full_coverage(self):
+        results = self.index.search("err-404")
+        self.assertEqual(results[0][0], "a")
+        self.assertEqual(results[0][2], 1.0)
+        self.assertEqual(len(results), 1)
+
+    def test_remove_and_replace(self):
+        self.index.remove(["a"])
+        self.assertEqual(self.index.search("err-404"), [])
+        self.index.add(["b"], ["now about err-404"])
+        self.assertEqual([doc_id for doc_id, _, _ in self.index.search("err-404")], ["b"])
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.search("billing"), [])
+
+
+class CountingEmbedding:
+    """Deterministic stand-in for the embeddings API that counts its calls."""
+
+    model_name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        vectors = []
+        for text in input:
+            vec = np.zeros(32)
+            for word in text.split():
+                vec[hash(word) % 32] += 1.0
+            vectors.append(vec)
+        return vectors
+
+
+class SearchTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
+    def setUp(self):
+        self.embedding = CountingEmbedding()
+        docs = ["reset your password in settings", "billing happens monthly", "contact support by email"]
+        self.collection = chromadb.EphemeralClient().get_or_create_collection("test-search", embedding_function=None)
+        self.collection.upsert(ids=[str(i) for i in range(len(docs))], documents=docs, embeddings=self.embedding(docs))
+        self.embedding.calls = 0
+        knowledge_vector.embedding_cache.clear()
+
+        patches = [
+            mock.patch.object(knowledge_vector, "collection", self.collection),
+            mock.patch.object(knowledge_vector, "embedding_fn", self.embedding),
+            mock.patch.object(knowledge_vector, "lexical_index", BM25Index()),
+            # The lexical fast path would answer these queries without embedding them
+            mock.patch.object(knowledge_vector, "HYBRID_SEARCH", False),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_query_is_embedded_once(self):
+        results = knowledge_vector.search_knowledge_vector("How do I reset my password?", top_k=3)
+        self.assertEqual(results[0], "reset your password in settings")
+        self.assertEqual(self.embedding.calls, 1)
+
+    def test_repeated_query_hits_cache(self):
+        hits = knowledge_vector.embedding_cache.hits
+        knowledge_vector.search_knowledge_vector("How do I reset my password?", top_k=3)
+        knowledge_vector.search_knowledge_vector("how do I reset my password", top_k=3)
+        self.assertEqual(self.embedding.calls, 1)
+        self.assertEqual(knowledge_vector.embedding_cache.hits, hits + 1)
+
+
+class IngestionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
+    def setUp(self):
+        self.embedding = CountingEmbedding()
+        self.collection = chromadb.EphemeralClient().get_or_create_collection("test-ingest", embedding_function=None)
+        self.addCleanup(chromadb.EphemeralClient().delete_collection, "test-ingest")
+        patches = [
+            mock.patch.object(knowledge_vector, "collection", self.collection),
+            mock.patch.object(knowledge_vector, "embedding_fn", self.embedding),
+            mock.patch.object(knowledge_vector, "INGEST_BATCH_SIZE", 4),
+            mock.patch.object(knowledge_vector, "lexical_index", BM25Index()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.chunks = [f"chunk number {i} about topic" for i in range(10)]
+
+    def test_first_ingest_embeds_in_batches(self):
+        stats = knowledge_vector.add_knowledge_chunks("faq", self.chunks)
+        self.assertEqual(stats, {"added": 10, "skipped": 0, "deleted": 0})
+        self.assertEqual(self.embedding.calls, 3)
+        self.assertEqual(self.collection.count(), 10)
+
+    def test_reingesting_unchanged_document_makes_no_embedding_calls(self):
+        knowledge_vector.add_knowledge_chunks("faq", self.chunks)
+        self.embedding.calls = 0
+        stats = knowledge_vector.add_knowledge_chunks("faq", iter(self.chunks))
+        self.assertEqual(stats, {"added": 0, "skipped": 10, "deleted": 0})
+        self.assertEqual(self.embedding.calls, 0)
+
+    def test_edited_document_embeds_only_changes_and_drops_stale_chunks(self):
+        knowledge_vector.add_knowledge_chunks("faq", self.chunks)
+        knowledge_vector.add_knowledge_chunks("other", ["unrelated chunk"])
+        self.embedding.calls = 0
+
+        edited = self.chunks[:8] + ["a brand new chunk"]
+        stats = knowledge_vector.add_knowledge_chunks("faq", edited)
+        self.assertEqual(stats, {"added": 1, "skipped": 8, "deleted": 2})
+        self.assertEqual(self.embedding.calls, 1)
+        stored = self.collection.get(where={"topic": "faq"})["documents"]
+        self.assertEqual(sorted(stored), sorted(edited))
+        self.assertEqual(self.collection.count(), 10)
+
+    def test_duplicate_chunks_are_stored_once(self):
+        stats = knowledge_vector.add_knowledge_chunks("faq", ["same text"] * 3)
+        self.assertEqual(stats["added"], 1)
+        self.assertEqual(self.collection.count(), 1)
+
+
+class HybridSearchTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
+    def setUp(self):
+        self.embedding = CountingEmbedding()
+        self.collection = chromadb.EphemeralClient().get_or_create_collection("test-hybrid", embedding_function=None)
+        self.addCleanup(chromadb.EphemeralClient().delete_collection, "test-hybrid")
+        knowledge_vector.embedding_cache.clear()
+        patches = [
+            mock.patch.object(knowledge_vector, "collection", self.collection),
+            mock.patch.object(knowledge_vector, "embedding_fn", self.embedding),
+            mock.patch.object(knowledge_vector, "lexical_index", BM25Index()),
+            mock.patch.object(metadata_cache, "check_interval", 0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        knowledge_vector.add_knowledge_chunks("faq", [
+            "Error E-1234 appears when the disk is full.",
+            "Restart the router to fix connection problems.",
+            "Your connection may drop when the router overheats.",
+            "Invoices are emailed monthly.",
+        ])
+        self.embedding.calls = 0
+
+    def test_decisive_lexical_match_skips_embedding(self):
+        results = knowledge_vector.search_knowledge_vector("What does E-1234 mean?")
+        self.assertEqual(results[0], "Error E-1234 appears when the disk is full.")
+        self.assertEqual(self.embedding.calls, 0)
+
+    def test_ambiguous_query_fuses_both_rankings(self):
+        results = knowledge_vector.search_knowledge_vector("router connection")
+        self.assertEqual(self.embedding.calls, 1)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(any("Restart the router" in doc for doc in results))
+
+    def test_index_is_rebuilt_from_the_store(self):
+        knowledge_vector.lexical_index.clear()
+        self.assertEqual(knowledge_vector.build_lexical_index(page_size=3), 4)
+        self.assertEqual(knowledge_vector.lexical_index.search("invoices")[0][2], 1.0)
+
+    def test_changes_made_by_another_worker_are_picked_up(self):
+        # This worker's own ingestion updated the index in place: no rebuild is needed
+        with mock.patch.object(knowledge_vector, "build_lexical_index") as build:
+            knowledge_vector.search_knowledge_vector("What does E-1234 mean?")
+        build.assert_not_called()
+
+        # Another worker stores a chunk and bumps the shared counter
+        document = "Error E-5678 means the fan has failed."
+        self.collection.upsert(ids=["other-worker"], documents=[document], embeddings=self.embedding([document]))
+        with Session() as db:
+            bump(db, KNOWLEDGE)
+            db.commit()
+        self.embedding.calls = 0
+
+        self.assertEqual(knowledge_vector.search_knowledge_vector("What does E-5678 mean?")[0], document)
+        self.assertEqual(self.embedding.calls, 0)  # found by the rebuilt lexical index
+
+    def test_dense_only_when_disabled(self):
+        with mock.patch.object(knowledge_vector, "HYBRID_SEARCH", False):
+            knowledge_vector.search_knowledge_vector("What does E-1234 mean?")
+        self.assertEqual(self.embedding.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import unittest
+from unittest import mock
+from uuid import uuid4
+from openai import AsyncOpenAI
+from app.core import chatbot_engine
+from app.core.memory import ConversationMemory, count_tokens, trim_history
+from app.core.persistence import message_writer
+from app.db.database import Session, create_tables
+from app.db.models import Conversation, Message
+from app.tests import stub_openai
+
+
+class ConversationMemoryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+
+    def _conversation(self, turns: list[tuple[str, str]]) -> str:
+        convo_id = str(uuid4())
+        with Session() as db:
+            db.add(Conversation(id=convo_id))
+            db.add_all([Message(conversation_id=convo_id, role=r, content=c) for r, c in turns])
+            db.commit()
+        return convo_id
+
+    def test_trim_keeps_system_prompt_and_latest_turns(self):
+        messages = [{"role": "system", "content": "Be helpful."}]
+        messages += [{"role": "user", "content": f"question number {i} " * 20} for i in range(50)]
+        budget = count_tokens(messages[:1] + messages[-3:])
+
+        trimmed = trim_history(messages, budget)
+
+        self.assertEqual(trimmed[0], messages[0])
+        self.assertEqual(trimmed[1:], messages[-3:])
+
+    def test_cap_bounds_memory(self):
+        memory = ConversationMemory(maxsize=3, ttl=60)
+        for i in range(10):
+            memory.save(f"convo-{i}", [{"role": "system", "content": "x"}])
+        self.assertEqual(len(memory), 3)
+
+    def test_evicted_conversation_is_rehydrated(self):
+        convo_id = self._conversation([("user", "Hi"), ("assistant", "Hello!")])
+        memory = ConversationMemory(maxsize=1, ttl=60)
+
+        with Session() as db:
+            first = memory.load(db, convo_id, "System")
+            memory.save("other", [{"role": "system", "content": "x"}])  # evicts convo_id
+            again = memory.load(db, convo_id, "System")
+
+        expected = [
+            {"role": "system", "content": "System"},
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Hello!"},
+        ]
+        self.assertEqual(first, expected)
+        self.assertEqual(again, expected)
+
+    def test_record_context_reports_tokens_no_longer_resent(self):
+        memory = ConversationMemory(maxsize=10, ttl=60)
+        self.assertEqual(memory.record_context("convo", 300), 0)
+        self.assertEqual(memory.record_context("convo", 250), 300)
+        self.assertEqual(memory.record_context("convo", 100), 550)
+
+
+class KnowledgeContextTests(unittest.TestCase):
+    """Retrieved knowledge goes with its own turn's request only, against the local OpenAI stub."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+        cls.server = stub_openai.run_stub_server()
+        cls.base_url = cls.server.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__(None, None, None)
+
+    def _turn(self, convo_id: str, question: str, chunks: list[str]) -> str:
+        async def reply():
+            return "".join([token async for token in chatbot_engine.get_streaming_response(convo_id, question)])
+
+        client = AsyncOpenAI(api_key="test", base_url=self.base_url)
+        with mock.patch.object(chatbot_engine, "async_client", client), \
+                mock.patch.object(chatbot_engine, "search_knowledge_vector", return_value=chunks), \
+                mock.patch.object(chatbot_engine.semantic_cache, "enabled", False):
+            return asyncio.run(reply())
+
+    def test_context_is_sent_once_and_never_stored(self):
+        convo_id = str(uuid4())
+        with Session() as db:
+            db.add(Conversation(id=convo_id, version="A"))
+            db.commit()
+        chunk = f"Refunds for order {uuid4()} take five days."
+        sent = len(stub_openai.inputs)
+
+        self._turn(convo_id, "How long do refunds take?", [chunk])
+        self._turn(convo_id, "And exchanges?", [])
+
+        first, second = stub_openai.inputs[sent:]
+        self.assertEqual(first[-1], {"role": "user", "content": "How long do refunds take?"})
+        self.assertEqual(first[-2]["role"], "system")
+        self.assertIn(chunk, first[-2]["content"])
+        self.assertNotIn(chunk, str(second))
+
+        message_writer.flush(timeout=5)
+        with Session() as db:
+            stored = [content for content, in db.query(Message.content).filter_by(conversation_id=convo_id)]
+            remembered = chatbot_engine.conversation_memory.load(db, convo_id, "unused")
+        self.assertEqual(len(stored), 4)
+        self.assertFalse(any(chunk in content for content in stored))
+        self.assertEqual([m["role"] for m in remembered], ["system", "user", "assistant", "user", "assistant"])
+        self.assertNotIn(chunk, str(remembered))
+
+
+if __name__ == "__main__":
+    unittest.main()
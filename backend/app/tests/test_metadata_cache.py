@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.core import chatbot_engine
+from app.core.memory import ConversationMemory
+from app.core.metadata_cache import MetadataCache
+from app.core.persistence import WriteBehindWriter
+from app.db.database import create_tables, make_engine
+from app.db.models import Conversation, PromptConfig
+
+
+class MetadataCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.engine = make_engine(f"sqlite:///{os.path.join(tmpdir.name, 'chatbot.db')}")
+        self.addCleanup(self.engine.dispose)
+        create_tables(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            db.add_all([
+                PromptConfig(version="A", prompt="Prompt A"),
+                PromptConfig(version="B", prompt="Prompt B"),
+                Conversation(id="c1", version="A", file_id="file-1"),
+                Conversation(id="c2"),
+            ])
+            db.commit()
+
+    def _cache(self, check_interval: float = 0) -> MetadataCache:
+        return MetadataCache(check_interval=check_interval, session_factory=self.Session)
+
+    def _count_selects(self) -> list[str]:
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", record)
+        self.addCleanup(event.remove, self.engine, "before_cursor_execute", record)
+        return statements
+
+    def test_warm_chat_turn_makes_no_read_queries(self):
+        writer = WriteBehindWriter(self.Session)
+        self.addCleanup(writer.close)
+        patches = [
+            mock.patch.object(chatbot_engine, "Session", self.Session),
+            mock.patch.object(chatbot_engine, "metadata_cache", self._cache(check_interval=60)),
+            mock.patch.object(chatbot_engine, "message_writer", writer),
+            mock.patch.object(chatbot_engine, "conversation_memory", ConversationMemory()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        version, messages = chatbot_engine._start_turn("c1", "first question")
+        self.assertEqual((version, messages[0]["content"]), ("A", "Prompt A"))
+        writer.flush(timeout=5)
+
+        selects = self._count_selects()
+        version, _ = chatbot_engine._start_turn("c1", "second question")
+        self.assertEqual(chatbot_engine.get_version("c1"), "A")
+        self.assertEqual(version, "A")
+        self.assertEqual(selects, [])
+
+    def test_unassigned_version_is_not_cached(self):
+        cache = self._cache()
+        self.assertIsNone(cache.conversation("c2")["version"])
+        with self.Session() as db:
+            db.get(Conversation, "c2").version = "B"
+            db.commit()
+        self.assertEqual(cache.conversation("c2")["version"], "B")
+        self.assertIsNone(cache.conversation("missing"))
+
+    def test_writes_in_one_worker_invalidate_the_others(self):
+        worker_a, worker_b = self._cache(), self._cache()
+        self.assertEqual(worker_a.prompt("A"), "Prompt A")
+        self.assertEqual(worker_a.conversation("c1")["file_id"], "file-1")
+
+        with self.Session() as db:
+            db.query(PromptConfig).filter_by(version="A").update({"prompt": "New prompt A"})
+            worker_b.prompts_changed(db)
+            db.get(Conversation, "c1").file_id = "file-2"
+            worker_b.conversation_changed(db, "c1")
+            db.commit()
+
+        self.assertEqual(worker_a.prompt("A"), "New prompt A")
+        self.assertEqual(worker_a.conversation("c1")["file_id"], "file-2")
+
+    def test_entries_are_reused_between_checks(self):
+        cache = self._cache(check_interval=60)
+        self.assertEqual(cache.prompt("B"), "Prompt B")
+        cache.conversation("c1")
+        selects = self._count_selects()
+        for _ in range(10):
+            cache.prompt("B")
+            cache.conversation("c1")
+        self.assertEqual(selects, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
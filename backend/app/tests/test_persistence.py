@@ -0,0 +1,134 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.core import persistence
+from app.core.persistence import WriteBehindWriter
+from app.db.database import create_tables, get_db, make_engine
+from app.db.models import Conversation, Message
+from app.main import app
+
+client = TestClient(app)
+
+
+class WriteBehindTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        engine = make_engine(f"sqlite:///{os.path.join(tmpdir.name, 'chatbot.db')}")
+        self.addCleanup(engine.dispose)
+        create_tables(engine)
+        self.Session = sessionmaker(bind=engine)
+        with self.Session() as db:
+            db.add_all([Conversation(id="c1"), Conversation(id="c2", version="B")])
+            db.commit()
+
+    def _writer(self, **kwargs) -> WriteBehindWriter:
+        writer = WriteBehindWriter(self.Session, **kwargs)
+        self.addCleanup(writer.close)
+        return writer
+
+    def _contents(self, convo_id: str) -> list[str]:
+        with self.Session() as db:
+            return [content for (content,) in db.query(Message.content).filter_by(conversation_id=convo_id)
+                    .order_by(Message.timestamp, Message.id)]
+
+    def test_writes_are_grouped_into_transactions(self):
+        writer = self._writer()
+        release = threading.Event()
+        write = writer._write
+        with mock.patch.object(writer, "_write", side_effect=lambda ops: (release.wait(), write(ops))):
+            writer.assign_version("c1", "A")
+            writer.assign_version("c2", "A")  # c2 already has a version, which is kept
+            for i in range(50):
+                writer.add_message("c1", "user" if i % 2 == 0 else "assistant", f"m{i}")
+            release.set()
+            self.assertTrue(writer.flush(timeout=5))
+
+        self.assertEqual(self._contents("c1"), [f"m{i}" for i in range(50)])
+        self.assertEqual(writer.stats["writes"], 52)
+        self.assertLessEqual(writer.stats["batches"], 2)
+        with self.Session() as db:
+            self.assertEqual(db.get(Conversation, "c1").version, "A")
+            self.assertEqual(db.get(Conversation, "c2").version, "B")
+
+    def test_history_endpoint_reads_its_own_writes(self):
+        writer = self._writer()
+        write = writer._write
+
+        def slow_write(ops):
+            time.sleep(0.2)
+            write(ops)
+
+        def override():
+            with self.Session() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override
+        self.addCleanup(app.dependency_overrides.pop, get_db)
+        with mock.patch.object(persistence.message_writer, "wait_for", writer.wait_for), \
+                mock.patch.object(writer, "_write", side_effect=slow_write):
+            writer.add_message("c1", "user", "hello")
+            writer.add_message("c1", "assistant", "hi there")
+            response = client.get("/api/v1/conversations/c1/messages")
+
+        self.assertEqual([m["content"] for m in response.json()], ["hello", "hi there"])
+
+    def test_full_queue_applies_backpressure(self):
+        writer = self._writer(maxsize=2, batch_size=1)
+        release = threading.Event()
+        write = writer._write
+        with mock.patch.object(writer, "_write", side_effect=lambda ops: (release.wait(), write(ops))):
+            for i in range(3):  # one being written, two queued
+                writer.add_message("c1", "user", f"m{i}")
+            blocked = threading.Thread(target=writer.add_message, args=("c1", "user", "m3"))
+            blocked.start()
+            blocked.join(0.2)
+            self.assertTrue(blocked.is_alive())
+
+            release.set()
+            blocked.join(5)
+            self.assertFalse(blocked.is_alive())
+            self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(self._contents("c1"), ["m0", "m1", "m2", "m3"])
+
+    def test_close_commits_queued_writes(self):
+        writer = self._writer()
+        for i in range(20):
+            writer.add_message("c2", "user", f"m{i}")
+        writer.close()
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(len(self._contents("c2")), 20)
+
+    def test_failed_batch_is_retried(self):
+        writer = self._writer()
+        sessions = iter([RuntimeError("database is locked")])
+
+        def flaky_session():
+            error = next(sessions, None)
+            if error:
+                raise error
+            return self.Session()
+
+        with mock.patch.object(writer, "_session", side_effect=flaky_session), \
+                mock.patch.object(persistence.time, "sleep"):
+            writer.add_message("c1", "user", "survives")
+            self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(self._contents("c1"), ["survives"])
+        self.assertEqual(writer.stats["failures"], 1)
+
+    def test_disabled_writes_inline(self):
+        writer = self._writer(enabled=False)
+        writer.add_message("c1", "user", "now")
+        self.assertEqual(self._contents("c1"), ["now"])
+        self.assertEqual(writer.pending(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+
+from app.core import knowledge_vector
+from app.utils import query_normalizer
+from app.utils.query_normalizer import normalize, normalize_batch, tokenize
+
+# Queries as users type them; the regex backend must agree with nltk.word_tokenize on all of them.
+CORPUS = [
+    "How do I reset my password?",
+    "I can't log in!!",
+    "What's the refund policy for order #12345?",
+    "My router (model X-200) won't connect... help",
+    'He said "hello" to me.',
+    "Error E-1234: disk full.",
+    "Price is $3,000.50 today, isn't it?",
+    "Meeting at 10:30, room 4.",
+    "I'm gonna need to cancel, wanna help?",
+    "cannot open file 'config.yaml'",
+    "version 2. then it broke",
+    "plan b. then what",
+    "email me at a.b@example.com",
+    "the dogs' toys are missing",
+    "rock'n'roll never dies",
+    "It costs 5%; really?",
+    "see http://example.com/a?b=1&c=2 for details",
+    "foo--bar -- baz",
+    "What?! No way. Seriously.",
+    "'hello' she said",
+    "John’s book “title” is out",
+    "Why is E-1234 shown. Please fix",
+    "a. b. c.",
+    "3.5 GHz cpu.",
+    "I'd've done it, you'll see",
+    "Is C++ supported? And node.js?",
+    "gimme the logs, lemme check, gotta go",
+    'She asked: "Where is it?" and left.',
+    "Wi-Fi drops every 5 min...",
+    "Tell me about `config` and (optional) settings [v2]",
+]
+
+
+class TokenizeTests(unittest.TestCase):
+    def test_treebank_conventions(self):
+        self.assertEqual(tokenize("can't stop, won't stop"), ["ca", "n't", "stop", ",", "wo", "n't", "stop"])
+        self.assertEqual(tokenize("it's john's"), ["it", "'s", "john", "'s"])
+        self.assertEqual(tokenize("cannot"), ["can", "not"])
+        self.assertEqual(tokenize('say "hi"'), ["say", "``", "hi", "''"])
+        self.assertEqual(tokenize("wait... what"), ["wait", "...", "what"])
+        self.assertEqual(tokenize("costs $3,000 at 10:30"), ["costs", "$", "3,000", "at", "10:30"])
+
+    def test_sentence_final_periods(self):
+        self.assertEqual(tokenize("it broke. then"), ["it", "broke", ".", "then"])
+        self.assertEqual(tokenize("version 2. then"), ["version", "2.", "then"])
+        self.assertEqual(tokenize("ask dr. smith"), ["ask", "dr.", "smith"])
+        self.assertEqual(tokenize("in the u.s."), ["in", "the", "u.s", "."])
+        self.assertEqual(tokenize("see node.js now"), ["see", "node.js", "now"])
+
+
+class NormalizeTests(unittest.TestCase):
+    def test_drops_stop_words_and_punctuation(self):
+        self.assertEqual(normalize("How do I reset my password?"), "reset password")
+        self.assertEqual(normalize("What does error E-404 mean?!"), "error e-404 mean")
+        self.assertEqual(normalize("I can't log in"), "ca n't log")
+
+    def test_batch(self):
+        self.assertEqual(normalize_batch(CORPUS), [normalize(query) for query in CORPUS])
+
+    def test_matches_nltk(self):
+        try:
+            stop_words = knowledge_vector.load_nlp_resources()
+        except Exception as e:
+            self.skipTest(f"NLTK data unavailable: {e}")
+        import nltk
+
+        # Only the abbreviations the installed Punkt model knows keep their period
+        known = {word for word in query_normalizer.ABBREVIATIONS
+                 if nltk.word_tokenize(f"ask {word}. now") == ["ask", f"{word}.", "now"]}
+        with mock.patch.object(query_normalizer, "ABBREVIATIONS", frozenset(known)):
+            for query in CORPUS:
+                with self.subTest(query=query):
+                    self.assertEqual(tokenize(query.lower()), nltk.word_tokenize(query.lower()))
+        self.assertLessEqual(stop_words, query_normalizer.STOP_WORDS)
+
+    def test_backend_selection(self):
+        with mock.patch.object(knowledge_vector, "QUERY_NORMALIZER", "regex"), \
+                mock.patch.object(knowledge_vector, "load_nlp_resources") as load:
+            self.assertEqual(knowledge_vector.normalize_query("Reset my password!"), "reset password")
+            self.assertEqual(knowledge_vector.normalize_queries(["Hi there", "The VPN"]), ["hi", "vpn"])
+        load.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from app.core import chatbot_engine
+from app.core.semantic_cache import SemanticCache
+
+
+class SemanticCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticCache(enabled=True, threshold=0.95, maxsize=3, ttl=60)
+
+    def test_similar_query_hits(self):
+        self.cache.store("A", [1.0, 0.0, 0.0], ["Hello", " there"])
+        self.assertEqual(self.cache.lookup("A", [0.99, 0.05, 0.0]), ["Hello", " there"])
+        self.assertIsNone(self.cache.lookup("A", [0.5, 0.5, 0.0]))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_versions_are_isolated(self):
+        self.cache.store("A", [1.0, 0.0], ["answer A"])
+        self.assertIsNone(self.cache.lookup("B", [1.0, 0.0]))
+
+    def test_size_eviction_drops_least_recently_used(self):
+        for i in range(3):
+            self.cache.store("A", np.eye(4)[i], [f"answer {i}"])
+        self.cache.lookup("A", np.eye(4)[0])  # refresh entry 0
+        self.cache.store("A", np.eye(4)[3], ["answer 3"])
+
+        self.assertEqual(self.cache.lookup("A", np.eye(4)[0]), ["answer 0"])
+        self.assertIsNone(self.cache.lookup("A", np.eye(4)[1]))
+
+    def test_entries_expire(self):
+        cache = SemanticCache(enabled=True, threshold=0.95, maxsize=3, ttl=0.01)
+        cache.store("A", [1.0, 0.0], ["stale"])
+        time.sleep(0.02)
+        self.assertIsNone(cache.lookup("A", [1.0, 0.0]))
+
+    def test_expired_best_match_falls_back_to_a_fresh_one(self):
+        self.cache.store("A", [0.98, 0.2, 0.0], ["fresh"])
+        self.cache.ttl = 0.01
+        self.cache.store("A", [1.0, 0.0, 0.0], ["stale"])  # closer to the query, but expires first
+        time.sleep(0.02)
+
+        self.assertEqual(self.cache.lookup("A", [1.0, 0.0, 0.0]), ["fresh"])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertIsNone(self.cache.lookup("A", [0.0, 1.0, 0.0]))
+        self.assertEqual(self.cache.stats()["size"], 1)  # the expired entry was dropped on the miss
+
+    def test_a_new_generation_retires_every_entry(self):
+        generation = [("prompts 1", "knowledge 1")]
+        cache = SemanticCache(enabled=True, threshold=0.95, maxsize=3, ttl=60, generation=lambda: generation[0])
+        cache.store("A", [1.0, 0.0], ["answer"])
+        self.assertEqual(cache.lookup("A", [1.0, 0.0]), ["answer"])
+
+        generation[0] = ("prompts 1", "knowledge 2")  # e.g. another worker ingested a document
+        self.assertIsNone(cache.lookup("A", [1.0, 0.0]))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_invalidate_and_disabled(self):
+        self.cache.store("A", [1.0, 0.0], ["answer"])
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.lookup("A", [1.0, 0.0]))
+
+        disabled = SemanticCache(enabled=False, threshold=0.95, maxsize=3, ttl=60)
+        disabled.store("A", [1.0, 0.0], ["answer"])
+        self.assertIsNone(disabled.lookup("A", [1.0, 0.0]))
+
+
+class StreamingFallbackTests(unittest.TestCase):
+    def test_embedding_failure_answers_without_the_cache(self):
+        async def fresh_answer(*args):
+            yield "fresh answer"
+
+        async def collect():
+            return [token async for token in chatbot_engine.get_streaming_response("c1", "Hello?")]
+
+        history = [{"role": "system", "content": "You are a helpful assistant."}]
+        with mock.patch.object(chatbot_engine, "_start_turn", return_value=("A", history)), \
+                mock.patch.object(chatbot_engine, "semantic_cache",
+                                  SemanticCache(enabled=True, threshold=0.95, maxsize=3, ttl=60)), \
+                mock.patch.object(chatbot_engine, "embed_query", side_effect=RuntimeError("rate limited")), \
+                mock.patch.object(chatbot_engine, "_knowledge_reply", fresh_answer), \
+                mock.patch.object(chatbot_engine, "_finish_turn", new=mock.AsyncMock()) as finish:
+            self.assertEqual(asyncio.run(collect()), ["fresh answer"])
+        self.assertEqual(finish.await_args.args[2], "fresh answer")
+
+
+if __name__ == "__main__":
+    unittest.main()
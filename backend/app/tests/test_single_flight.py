@@ -0,0 +1,154 @@
+import asyncio
+import unittest
+from unittest import mock
+from uuid import uuid4
+
+from openai import AsyncOpenAI
+
+from app.core import chatbot_engine
+from app.core.persistence import message_writer
+from app.core.single_flight import SingleFlight, question_key
+from app.db.database import Session, create_tables
+from app.db.models import Conversation, Message
+from app.tests import stub_openai
+
+
+async def _reply(convo_id: str, question: str, received: list | None = None) -> str:
+    tokens = received if received is not None else []
+    async for token in chatbot_engine.get_streaming_response(convo_id, question):
+        tokens.append(token)
+    return "".join(tokens)
+
+
+class SingleFlightTests(unittest.TestCase):
+    """Coalescing of identical opening questions against the local OpenAI stub."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+        cls.server = stub_openai.run_stub_server()
+        cls.base_url = cls.server.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__(None, None, None)
+
+    def setUp(self):
+        self.searches = []
+        patches = [
+            mock.patch.dict(stub_openai.settings, first_token_delay=0.05, token_delay=0.01),
+            mock.patch.object(chatbot_engine, "search_knowledge_vector", side_effect=self._search),
+            mock.patch.object(chatbot_engine.semantic_cache, "enabled", False),
+            mock.patch.object(chatbot_engine, "single_flight", SingleFlight(enabled=True)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.reply = "".join(stub_openai.settings["tokens"])
+
+    def _search(self, query: str) -> list[str]:
+        self.searches.append(query)
+        return []
+
+    def _conversations(self, n: int) -> list[str]:
+        convo_ids = [str(uuid4()) for _ in range(n)]
+        with Session() as db:
+            db.add_all([Conversation(id=convo_id, version="A") for convo_id in convo_ids])
+            db.commit()
+        return convo_ids
+
+    def _run(self, scenario):
+        # A fresh client per event loop, as each asyncio.run starts a new loop
+        client = AsyncOpenAI(api_key="test", base_url=self.base_url)
+        with mock.patch.object(chatbot_engine, "async_client", client):
+            return asyncio.run(scenario)
+
+    def _stored_replies(self, convo_ids: list[str]) -> dict:
+        message_writer.flush(timeout=5)
+        with Session() as db:
+            rows = db.query(Message.conversation_id, Message.content) \
+                .filter(Message.conversation_id.in_(convo_ids), Message.role == "assistant")
+            return dict(rows.all())
+
+    def test_identical_questions_share_one_completion(self):
+        convo_ids = self._conversations(20)
+        questions = ["How do I reset my password?", "how do i reset my password", "How do I  reset my PASSWORD?!"]
+        responses = stub_openai.stats["responses"]
+
+        async def burst():
+            return await asyncio.gather(*(
+                _reply(convo_id, questions[i % len(questions)]) for i, convo_id in enumerate(convo_ids)
+            ))
+
+        replies = self._run(burst())
+
+        self.assertEqual(replies, [self.reply] * 20)
+        self.assertEqual(stub_openai.stats["responses"] - responses, 1)
+        self.assertEqual(len(self.searches), 1)
+        self.assertEqual(chatbot_engine.single_flight.stats, {"flights": 1, "joined": 19})
+        self.assertEqual(self._stored_replies(convo_ids), {convo_id: self.reply for convo_id in convo_ids})
+
+    def test_late_joiner_is_sent_the_prefix(self):
+        first, late = self._conversations(2)
+        responses = stub_openai.stats["responses"]
+
+        async def scenario():
+            received = []
+            leader = asyncio.ensure_future(_reply(first, "What are your opening hours?", received))
+            while len(received) < 3:
+                await asyncio.sleep(0.005)
+            return await asyncio.gather(leader, _reply(late, "What are your opening hours?"))
+
+        with mock.patch.dict(stub_openai.settings, token_delay=0.03):
+            replies = self._run(scenario())
+
+        self.assertEqual(replies, [self.reply, self.reply])
+        self.assertEqual(stub_openai.stats["responses"] - responses, 1)
+        self.assertEqual(chatbot_engine.single_flight.stats["joined"], 1)
+        self.assertEqual(self._stored_replies([first, late]), {first: self.reply, late: self.reply})
+
+    def test_different_questions_are_not_shared(self):
+        convo_ids = self._conversations(2)
+        responses = stub_openai.stats["responses"]
+
+        async def scenario():
+            return await asyncio.gather(_reply(convo_ids[0], "How do I reset my password?"),
+                                        _reply(convo_ids[1], "How do I not reset my password?"))
+
+        self._run(scenario())
+        self.assertEqual(stub_openai.stats["responses"] - responses, 2)
+        self.assertNotEqual(question_key("How do I reset it?"), question_key("How do I not reset it?"))
+
+    def test_upstream_stops_when_every_subscriber_leaves(self):
+        flights, produced, closed = SingleFlight(enabled=True), [], []
+
+        async def endless():
+            try:
+                while True:
+                    produced.append(None)
+                    yield "token "
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.append(True)
+
+        async def listen(n: int):
+            stream = flights.stream("key", endless)
+            for _ in range(n):
+                await anext(stream)
+            await stream.aclose()
+
+        async def scenario():
+            stayer = asyncio.ensure_future(listen(10))
+            await listen(2)  # leaving early does not end the flight for the other subscriber
+            self.assertFalse(closed)
+            await stayer
+            await asyncio.sleep(0.05)
+
+        asyncio.run(scenario())
+        self.assertEqual(closed, [True])
+        self.assertLess(len(produced), 15)
+        self.assertEqual(flights.in_flight(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
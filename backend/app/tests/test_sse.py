@@ -0,0 +1,159 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from app.endpoints import chatbot_stream
+from app.main import app
+from app.utils.sse import HEARTBEAT, encode_event, sse_events
+
+
+def _parse(stream: str) -> list[str]:
+    """Decodes an event stream the way EventSource does, returning the data of each event."""
+    events = []
+    for block in stream.split("\n\n")[:-1]:
+        data = [line[6:] for line in block.split("\n") if line.startswith("data: ")]
+        if data:
+            events.append("\n".join(data))
+    return events
+
+
+async def _deltas(tokens, delay: float = 0.0, first_delay: float = 0.0):
+    await asyncio.sleep(first_delay)
+    for token in tokens:
+        yield token
+        await asyncio.sleep(delay)
+
+
+async def _collect(deltas, **kwargs) -> list[str]:
+    return [frame async for frame in sse_events(deltas, **kwargs)]
+
+
+class SSEWriterTests(unittest.TestCase):
+    def test_line_breaks_are_encoded_as_data_lines(self):
+        self.assertEqual(encode_event("a\nb\r\nc\rd"), "data: a\ndata: b\ndata: c\ndata: d\n\n")
+        self.assertEqual(encode_event("x", event="end"), "event: end\ndata: x\n\n")
+
+        tokens = ["Line one", "\n\n", "- item", "\n", " indented", "\n"]
+        frames = asyncio.run(_collect(_deltas(tokens)))
+        self.assertEqual("".join(_parse("".join(frames))), "".join(tokens))
+
+    def test_deltas_are_coalesced_into_bounded_frames(self):
+        tokens = [f"t{i} " for i in range(200)]
+        frames = asyncio.run(_collect(_deltas(tokens, delay=0.001), flush_interval=0.05))
+
+        self.assertEqual(frames[0], encode_event("t0 "))  # the first token is not held back
+        self.assertLess(len(frames), 20)
+        self.assertEqual("".join(_parse("".join(frames))), "".join(tokens))
+
+        frames = asyncio.run(_collect(_deltas(["x" * 100] * 50), flush_interval=10, max_frame_bytes=1000))
+        self.assertTrue(all(len(frame) < 1200 for frame in frames))
+        self.assertEqual(len("".join(_parse("".join(frames)))), 5000)
+
+    def test_heartbeats_are_sent_while_waiting(self):
+        frames = asyncio.run(_collect(_deltas(["late"], first_delay=0.35), heartbeat_interval=0.1))
+        self.assertGreaterEqual(frames.count(HEARTBEAT), 2)
+        self.assertEqual(frames[-1], encode_event("late"))
+
+    def test_disconnect_cancels_the_upstream_generator(self):
+        produced, closed = [], asyncio.Event()
+
+        class Client:
+            disconnected = False
+
+            async def is_disconnected(self):
+                return self.disconnected
+
+        async def endless():
+            try:
+                while True:
+                    produced.append(len(produced))
+                    yield "token "
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+
+        async def scenario():
+            client = Client()
+            consumer = asyncio.ensure_future(_collect(endless(), request=client, disconnect_poll=0.02))
+            await asyncio.sleep(0.1)
+            client.disconnected = True
+            frames = await asyncio.wait_for(consumer, 1)
+            count = len(produced)
+            await asyncio.sleep(0.1)
+            return frames, count
+
+        frames, count = asyncio.run(scenario())
+        self.assertTrue(closed.is_set())
+        self.assertEqual(len(produced), count)  # nothing is generated after the disconnect
+        self.assertLess(count, 30)
+        self.assertTrue(frames)
+
+
+class StreamingEndpointTests(unittest.TestCase):
+    """The chat endpoints stop their engine generator when the client goes away."""
+
+    ENDPOINTS = {
+        "/api/v1/chatbot/stream": "get_streaming_response",
+        "/api/v1/chatbot/web": "get_web_response",
+        "/api/v1/chatbot/file": "get_response_with_file",
+    }
+
+    def _disconnect_midway(self, path: str, spec_version: str) -> tuple[list, list, float]:
+        produced, closed = [], []
+
+        async def endless(convo_id, message):
+            try:
+                while True:
+                    produced.append(time.monotonic())
+                    yield "token "
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.append(time.monotonic())
+
+        async def scenario():
+            streaming, gone = asyncio.Event(), asyncio.Event()
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await gone.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                if message["type"] == "http.response.body" and message.get("body"):
+                    streaming.set()
+
+            scope = {
+                "type": "http", "asgi": {"version": "3.0", "spec_version": spec_version}, "http_version": "1.1",
+                "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+                "query_string": b"convo_id=c1&message=hi", "headers": [(b"host", b"testserver")],
+                "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+            }
+            handler = asyncio.ensure_future(app(scope, receive, send))
+            await asyncio.wait_for(streaming.wait(), 2)
+            gone.set()
+            left_at = time.monotonic()
+            await asyncio.wait_for(handler, 2)
+            return left_at
+
+        with mock.patch.object(chatbot_stream, self.ENDPOINTS[path], endless):
+            left_at = asyncio.run(scenario())
+        return produced, closed, left_at
+
+    def test_client_disconnect_cancels_the_engine(self):
+        # 2.3 is what uvicorn speaks; under 2.4 only the writer's own disconnect polling notices
+        for spec_version in ("2.3", "2.4"):
+            for path in self.ENDPOINTS:
+                with self.subTest(path=path, spec_version=spec_version):
+                    produced, closed, left_at = self._disconnect_midway(path, spec_version)
+                    self.assertEqual(len(closed), 1)
+                    self.assertLess(closed[0] - left_at, 1.5)
+                    self.assertLessEqual(produced[-1], closed[0])  # nothing generated afterwards
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import threading
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from app.core import startup
+from app.main import app
+from app.tests.stub_openai import BACKEND_DIR
+
+client = TestClient(app)
+
+
+class StartupTests(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.dict(startup.readiness)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_import_does_not_load_heavy_dependencies(self):
+        code = "import sys, app.main; print(','.join(m for m in ('chromadb', 'nltk', 'openai') if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_ready_once_warm_up_completes(self):
+        release = threading.Event()
+        steps = [("first", lambda: None), ("slow", release.wait)]
+        with mock.patch.object(startup, "_steps", return_value=steps):
+            thread = startup.start_warm_up()
+            response = client.get("/api/v1/health/ready")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()["status"], "warming_up")
+            release.set()
+            thread.join()
+
+        response = client.get("/api/v1/health/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["steps"]), {"first", "slow"})
+        self.assertEqual(client.get("/api/v1/health/live").json(), {"status": "ok"})
+
+    def test_failed_step_is_reported(self):
+        def broken():
+            raise RuntimeError("vector store unavailable")
+
+        with mock.patch.object(startup, "_steps", return_value=[("vector_store", broken), ("other", lambda: None)]):
+            startup.warm_up()
+
+        response = client.get("/api/v1/health/ready")
+        self.assertEqual(response.status_code, 503)
+        body = response.json()
+        self.assertEqual(body["status"], "failed")
+        self.assertEqual(body["errors"], {"vector_store": "vector store unavailable"})
+        self.assertIn("other", body["steps"])
+
+
+if __name__ == "__main__":
+    unittest.main()
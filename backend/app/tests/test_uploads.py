@@ -0,0 +1,81 @@
+import hashlib
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from app.utils.uploads import iter_text, save_stream
+
+MB = 1024 * 1024
+
+
+class _LazyStream(io.RawIOBase):
+    """A read-only stream of `size` bytes generated on demand, so the test never holds them all."""
+
+    def __init__(self, size: int, pattern: bytes):
+        self.remaining = size
+        self.pattern = pattern
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        n = self.remaining if n is None or n < 0 else min(n, self.remaining)
+        self.remaining -= n
+        repeats, extra = divmod(n, len(self.pattern))
+        return self.pattern * repeats + self.pattern[:extra]
+
+
+def _expected_digest(size: int, pattern: bytes) -> str:
+    digest = hashlib.sha256()
+    source = _LazyStream(size, pattern)
+    while block := source.read(MB):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadStreamingTests(unittest.TestCase):
+    def test_save_stream_memory_is_constant_for_500_mb(self):
+        size = 500 * MB
+        pattern = bytes(range(251))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "upload.bin")
+            tracemalloc.start()
+            try:
+                written, sha256 = save_stream(_LazyStream(size, pattern), path, chunk_size=MB)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            self.assertEqual(written, size)
+            self.assertEqual(os.path.getsize(path), size)
+        self.assertEqual(sha256, _expected_digest(size, pattern))
+        # One read block plus the pattern copies, independent of the file size
+        self.assertLess(peak, 8 * MB)
+
+    def test_iter_text_memory_is_constant(self):
+        size = 100 * MB
+        tracemalloc.start()
+        try:
+            decoded = sum(len(piece) for piece in iter_text(_LazyStream(size, b"abc\n"), chunk_size=MB))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(decoded, size)
+        self.assertLess(peak, 8 * MB)
+
+    def test_iter_text_joins_characters_split_between_reads(self):
+        text = "ação – 日本語 ✓ " * 50
+        pieces = list(iter_text(io.BytesIO(text.encode("utf-8")), chunk_size=7))
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual("".join(pieces), text)
+
+    def test_iter_text_rejects_invalid_utf8(self):
+        with self.assertRaises(UnicodeDecodeError):
+            list(iter_text(io.BytesIO(b"ok \xff\xfe"), chunk_size=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import math
+from collections import deque
+from typing import Iterable
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher (Aho-Corasick automaton).
+
+    The patterns are compiled into a trie with failure links, so one pass over the text finds
+    every pattern occurring in it, in time proportional to the text length whatever the number
+    of patterns. Each pattern has a priority; `search` returns the lowest priority among the
+    patterns found. The empty pattern matches every text.
+
+    Args:
+        patterns (Iterable[tuple[str, int]]): (pattern, priority) pairs.
+    """
+
+    def __init__(self, patterns: Iterable[tuple[str, int]]):
+        goto = [{}]
+        best = [math.inf]  # lowest priority of a pattern ending at the node or its suffixes
+        for pattern, priority in patterns:
+            node = 0
+            for char in pattern:
+                child = goto[node].get(char)
+                if child is None:
+                    child = len(goto)
+                    goto[node][char] = child
+                    goto.append({})
+                    best.append(math.inf)
+                node = child
+            best[node] = min(best[node], priority)
+
+        fail = [0] * len(goto)
+        queue = deque()
+        for child in goto[0].values():
+            best[child] = min(best[child], best[0])
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                best[child] = min(best[child], best[fail[child]])
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+        self._lowest = min(best)
+
+    def search(self, text: str) -> int | None:
+        """
+        Args:
+            text (str): Text to scan.
+
+        Returns:
+            int | None: The lowest priority of the patterns occurring in the text, or None.
+        """
+        goto, fail, best, lowest = self._goto, self._fail, self._best, self._lowest
+        node = 0
+        found = best[0]
+        if found == lowest:
+            return None if found == math.inf else found
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if best[node] < found:
+                found = best[node]
+                if found == lowest:
+                    break
+        return None if found == math.inf else found
+
+    def __len__(self) -> int:
+        return len(self._goto)
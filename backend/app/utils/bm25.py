@@ -0,0 +1,129 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Iterable
+
+# Words, plus codes such as "err-404" or "v2.1.3" kept whole (their parts are indexed too)
+_TOKEN = re.compile(r"[^\W_]+(?:[-_.:/][^\W_]+)*")
+_PART = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase BM25 terms.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list[str]: Terms in order; compound codes yield the whole code followed by its parts.
+    """
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory inverted index scored with Okapi BM25.
+
+    Postings map each term to {document id: term frequency}, so a search only touches the
+    documents containing a query term. Documents can be added and removed one batch at a time;
+    document frequencies and the average length are maintained incrementally.
+
+    Args:
+        k1 (float, optional): Term frequency saturation. Defaults to 1.5.
+        b (float, optional): Length normalization. Defaults to 0.75.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # term -> {doc id: tf}
+        self._terms = {}  # doc id -> Counter of its terms
+        self._lengths = {}  # doc id -> number of terms
+        self._documents = {}  # doc id -> text
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def add(self, ids: Iterable[str], documents: Iterable[str]):
+        """Indexes documents, replacing any already stored under the same IDs."""
+        with self._lock:
+            for doc_id, text in zip(ids, documents):
+                self._remove(doc_id)
+                terms = Counter(tokenize(text))
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[doc_id] = tf
+                self._terms[doc_id] = terms
+                self._documents[doc_id] = text
+                self._lengths[doc_id] = sum(terms.values())
+                self._total_length += self._lengths[doc_id]
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        terms = self._terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        del self._documents[doc_id]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._documents.clear()
+            self._lengths.clear()
+            self._total_length = 0
+
+    def document(self, doc_id: str) -> str | None:
+        return self._documents.get(doc_id)
+
+    def search(self, query: str, top_k: int = 5) -> list[tuple[str, float, float]]:
+        """
+        Ranks the indexed documents against a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): Number of results. Defaults to 5.
+
+        Returns:
+            list[tuple[str, float, float]]: (doc id, BM25 score, share of the distinct query
+                terms the document contains), best first.
+        """
+        query_terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._terms)
+            if not count or not query_terms:
+                return []
+            avg_length = self._total_length / count
+            scores, matched = {}, Counter()
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+                    matched[doc_id] += 1
+
+        ranked = heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(doc_id, score, matched[doc_id] / len(query_terms)) for doc_id, score in ranked]
+
+    def __len__(self) -> int:
+        return len(self._terms)
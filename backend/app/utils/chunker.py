@@ -1,19 +1,156 @@
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Iterable, Iterator
+
 import tiktoken
 
-def chunk_text(text: str, max_tokens: int = 300) -> list[str]:
-    enc = tiktoken.encoding_for_model("gpt-3.5-turbo")
+# Where a chunk may end, best first: paragraph breaks, then sentence ends.
+_SEGMENT_END = re.compile(r"\n\s*\n\s*|(?<=[.!?])\s+")
+_WORD = re.compile(r"\S+\s*|\s+")
+
+
+@lru_cache(maxsize=None)
+def _encoding():
+    return tiktoken.encoding_for_model("gpt-3.5-turbo")
+
+
+class TextChunker:
+    """
+    Incremental token-aware chunker.
+
+    Text is cut into sentences/paragraphs, each encoded exactly once, and those segments are
+    packed greedily into chunks of at most `max_tokens`. A segment that is too long on its own
+    is split between words, and a single oversized word on token boundaries. Consecutive chunks
+    share up to `overlap` tokens of whole segments.
+
+    Feed text with `feed` as it arrives and call `close` at the end; both return the chunks
+    completed so far, so memory stays bounded by one chunk plus one partial segment.
+
+    Args:
+        max_tokens (int, optional): Maximum tokens per chunk. Defaults to 300.
+        overlap (int, optional): Tokens repeated at the start of the next chunk. Defaults to 0.
+    """
+
+    def __init__(self, max_tokens: int = 300, overlap: int = 0):
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be between 0 and max_tokens - 1")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self._enc = _encoding()
+        self._pending = ""  # trailing text that may still grow into a longer segment
+        self._units = deque()  # (text, tokens) making up the current chunk
+        self._tokens = 0
+        self._fresh = False  # the current chunk has content beyond the overlap carry
+        # Text without any sentence end is forced out at a word break past this size
+        self._max_pending = max_tokens * 32
+
+    def feed(self, text: str) -> list[str]:
+        """
+        Adds text to the document.
+
+        Args:
+            text (str): The next piece of the document.
+
+        Returns:
+            list[str]: Chunks completed by this piece.
+        """
+        pending = self._pending + text
+        chunks = []
+        start = 0
+        for match in _SEGMENT_END.finditer(pending):
+            if match.end() == len(pending):
+                break  # the separator may continue in the next piece
+            self._add_segment(pending[start:match.end()], chunks)
+            start = match.end()
+        pending = pending[start:]
+
+        if len(pending) > self._max_pending:
+            cut = pending.rfind(" ", 0, len(pending) - 1) + 1 or len(pending)
+            self._add_segment(pending[:cut], chunks)
+            pending = pending[cut:]
+
+        self._pending = pending
+        return chunks
+
+    def close(self) -> list[str]:
+        """
+        Flushes the remaining text.
+
+        Returns:
+            list[str]: The final chunks.
+        """
+        chunks = []
+        if self._pending:
+            self._add_segment(self._pending, chunks)
+            self._pending = ""
+        if self._fresh:
+            chunks.append(self._emit())
+        self._units.clear()
+        self._tokens = 0
+        self._fresh = False
+        return chunks
+
+    def _add_segment(self, segment: str, chunks: list[str]):
+        tokens = self._enc.encode_ordinary(segment)
+        if len(tokens) <= self.max_tokens:
+            self._add_unit(segment, len(tokens), chunks)
+            return
+
+        words = _WORD.findall(segment)
+        for word, word_tokens in zip(words, self._enc.encode_ordinary_batch(words)):
+            if len(word_tokens) <= self.max_tokens:
+                self._add_unit(word, len(word_tokens), chunks)
+                continue
+            for i in range(0, len(word_tokens), self.max_tokens):
+                piece = word_tokens[i:i + self.max_tokens]
+                self._add_unit(self._enc.decode(piece), len(piece), chunks)
+
+    def _add_unit(self, text: str, tokens: int, chunks: list[str]):
+        if self._tokens + tokens > self.max_tokens:
+            if self._fresh:
+                chunks.append(self._emit())
+                self._fresh = False
+            # Keep at most `overlap` tokens, and only as much as still leaves room for this unit
+            while self._units and (self._tokens > self.overlap or self._tokens + tokens > self.max_tokens):
+                self._tokens -= self._units.popleft()[1]
+
+        self._units.append((text, tokens))
+        self._tokens += tokens
+        self._fresh = True
+
+    def _emit(self) -> str:
+        return "".join(text for text, _ in self._units).strip()
+
+
+def iter_chunks(pieces: Iterable[str], max_tokens: int = 300, overlap: int = 0) -> Iterator[str]:
+    """
+    Chunks a document that arrives in pieces (e.g. decoded blocks of an upload).
+
+    Args:
+        pieces (Iterable[str]): Consecutive pieces of the document.
+        max_tokens (int, optional): Maximum tokens per chunk. Defaults to 300.
+        overlap (int, optional): Tokens repeated at the start of the next chunk. Defaults to 0.
+
+    Yields:
+        str: Chunks in document order.
+    """
+    chunker = TextChunker(max_tokens, overlap)
+    for piece in pieces:
+        yield from chunker.feed(piece)
+    yield from chunker.close()
 
-    words = text.split()
-    chunks = []
-    current = []
 
-    for word in words:
-        current.append(word)
-        if len(enc.encode(" ".join(current))) > max_tokens:
-            chunks.append(" ".join(current))
-            current = []
+def chunk_text(text: str, max_tokens: int = 300, overlap: int = 0) -> list[str]:
+    """
+    Splits text into chunks of at most `max_tokens`, preferring paragraph and sentence breaks.
 
-    if current:
-        chunks.append(" ".join(current))
+    Args:
+        text (str): The document.
+        max_tokens (int, optional): Maximum tokens per chunk. Defaults to 300.
+        overlap (int, optional): Tokens repeated at the start of the next chunk. Defaults to 0.
 
-    return chunks
+    Returns:
+        list[str]: The chunks in document order.
+    """
+    return list(iter_chunks([text], max_tokens, overlap))
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from itertools import chain
+from typing import Iterable, Iterator, Sequence
+
+# Encoded output is sent in blocks of about this many bytes
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_lines(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """
+    Formats rows as CSV, one line at a time.
+
+    Args:
+        header (Sequence[str]): Column names, written first.
+        rows (Iterable[Sequence]): The rows; datetimes are written in ISO format.
+
+    Yields:
+        str: The CSV line of the header and of each row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chain([header], rows):
+        writer.writerow([_plain(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def ndjson_lines(records: Iterable[dict]) -> Iterator[str]:
+    """
+    Formats records as newline-delimited JSON.
+
+    Args:
+        records (Iterable[dict]): The records; datetimes are written in ISO format.
+
+    Yields:
+        str: One JSON document per record, each ending with a newline.
+    """
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, default=_plain) + "\n"
+
+
+def encode(lines: Iterable[str], compress: bool = False, block_size: int = EXPORT_BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Encodes text lines as UTF-8, optionally gzipped, grouped into blocks.
+
+    The first line is sent on its own so clients see the response start at once.
+
+    Args:
+        lines (Iterable[str]): The text to send.
+        compress (bool, optional): Whether to gzip the output. Defaults to False.
+        block_size (int, optional): Approximate bytes per yielded block. Defaults to EXPORT_BLOCK_SIZE.
+
+    Yields:
+        bytes: Consecutive parts of the (compressed) output.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31: gzip container
+    pending, size, first = [], 0, True
+    for line in lines:
+        data = line.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        if first or size >= block_size:
+            block = b"".join(pending)
+            if compressor:
+                block = compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH if first else zlib.Z_NO_FLUSH)
+            if block:
+                yield block
+            pending, size, first = [], 0, False
+    block = b"".join(pending)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
@@ -0,0 +1,271 @@
+import re
+import string
+from typing import Iterable, Iterator
+
+# NLTK's English stop word list (older data ships the first 179 entries; newer data adds the
+# contractions at the end, which never survive tokenization as single tokens anyway).
+STOP_WORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself
+yourselves he him his himself she she's her hers herself it it's its itself they them their
+theirs themselves what which who whom this that that'll these those am is are was were be been
+being have has had having do does did doing a an the and but if or because as until while of
+at by for with about against between into through during before after above below to from up
+down in out on off over under again further then once here there when where why how all any
+both each few more most other some such no nor not only own same so than too very s t can will
+just don don't should should've now d ll m o re ve y ain aren aren't couldn couldn't didn
+didn't doesn doesn't hadn hadn't hasn hasn't haven haven't isn isn't ma mightn mightn't mustn
+mustn't needn needn't shan shan't shouldn shouldn't wasn wasn't weren weren't won won't wouldn
+wouldn't
+he'd he'll he's i'd i'll i'm i've it'd it'll she'd she'll they'd they'll they're they've we'd
+we'll we're we've
+""".split())
+
+PUNCTUATION = frozenset(string.punctuation)
+_DROPPED = STOP_WORDS | PUNCTUATION
+
+# Common entries of the English Punkt model's abbreviation list: a period after them does not
+# end a sentence, so it stays attached to the word.
+ABBREVIATIONS = frozenset("""
+mr mrs ms dr prof jr sr st vs etc inc co corp ltd e.g i.e a.m p.m u.s u.k
+""".split())
+
+_SPLIT = "?!;@#$%&*\\[\\](){}<>«»“”‘’„‒-―"
+_WORD = rf"(?:[^\s{_SPLIT}`\",:.'-]|[,:](?=\d)|\.(?!\.)|-(?!-)|'(?!'))"
+_TOKEN = re.compile(
+    r"(?P<punct>\.{2,}|--|``|`|[" + _SPLIT + r"]|[,:](?![,:\d]))"
+    r"|(?P<quote>\"|'')"
+    r"|(?P<pair>[,:][,:]" + _WORD + r"*)"
+    r"|(?P<word>" + _WORD + r"+)"
+)
+_PLAIN_TOKEN = re.compile(r"\.{2,}|--|``|`|[" + _SPLIT + r"]|[,:](?!\d)|" + _WORD + "+")
+_SLOW_PATH = re.compile(r"[,:][,:]|cannot|gimme|gonna|gotta|lemme|wanna")
+
+# Where Punkt looks for a sentence end: ".", "?" or "!" followed by other punctuation or by
+# whitespace and another token.
+_BOUNDARY = re.compile(r"""[.?!](?=[)";}\]*:@'({\[!?]|\s+\S)""")
+_NON_WORD = set(")\";}]*:@'({[!?")
+_MULTI_CHAR = re.compile(r"\.\.+|--+")
+_WORD_START_STRIP = "(\"`{[:;&#*@)}]-,"
+_LAST_WHITESPACE = re.compile(r"\s\S*\Z")
+_NEXT_TOKEN = re.compile(r"\s*(\S)")
+_INITIAL = re.compile(r"[^\W\d]")
+_NUMBER = re.compile(r"-?[.,]?\d[\d,.-]*")
+# Closing quotes/brackets at the start of a sentence are moved back to the previous one
+_REALIGNED = re.compile(r"""["')\]}]+?(?:\s+|(?=--)|$)""")
+_CLOSERS = re.compile(r"""[\])}>"'»”’ ]*""")
+_FINAL_PERIOD = re.compile(r"""\.[\])}>"'»”’ ]*\s*$""")
+# Characters the Treebank rules pad with spaces before an apostrophe after a word is looked at
+_PADDED = set("«“‘„`,:;@#$%&?!‒–—―")
+
+_OPEN_QUOTE = re.compile(r"(?<!\w)'(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)")
+_CLITIC = re.compile(r"(.*[^' ])('s|'m|'d|')$")
+_CLITIC_2 = re.compile(r"(.*[^' ])('ll|'re|'ve|n't)$")
+_CONTRACTION_HINT = re.compile(r"cannot|d'ye|gimme|gonna|gotta|lemme|more'n|wanna")
+_CONTRACTIONS = [
+    re.compile(pattern) for pattern in (
+        r"\b(can)(not)\b", r"\b(d)('ye)\b", r"\b(gim)(me)\b", r"\b(gon)(na)\b",
+        r"\b(got)(ta)\b", r"\b(lem)(me)\b", r"\b(more)('n)\b", r"\b(wan)(na)(?=\s|$)",
+    )
+]
+
+
+def _ends_sentence(text: str, period: int) -> bool:
+    # Mirrors Punkt's decision for "<word>." from the tokens before and after the period.
+    if text[period - 1:period] == ".":
+        return False
+    start = period
+    while start and not text[start - 1].isspace() and text[start - 1] not in _NON_WORD:
+        start -= 1
+    if start and text[start - 1] in "'!?":
+        start -= 1
+    word = _MULTI_CHAR.split(text[start:period])[-1].lstrip(_WORD_START_STRIP)
+    if not word:
+        return True
+    if word.endswith("."):
+        return False
+    if word in ABBREVIATIONS or word.rsplit("-", 1)[-1] in ABBREVIATIONS:
+        return False
+    if _INITIAL.fullmatch(word) or _NUMBER.fullmatch(word):
+        # An initial or number followed by a lowercase word or punctuation continues the sentence
+        char = text[period + 1]
+        if not char.isspace():
+            return char not in ";:!?"
+        following = _NEXT_TOKEN.match(text, period + 1)
+        char = following.group(1)
+        after = text[following.end():following.end() + 1]
+        if char in ";:," or char.islower():
+            return False
+        if char in ".?!" and (not after or after.isspace() or after in _NON_WORD):
+            return False
+    return True
+
+
+def _boundaries(text: str) -> Iterator[int]:
+    # Punkt drops a candidate when the next one falls in the same word
+    pending = None
+    word_start = word_end = 0
+    for match in _BOUNDARY.finditer(text):
+        space = _LAST_WHITESPACE.search(text, word_end, match.start())
+        start = space.start() + 1 if space and space.start() > word_end else word_start
+        if pending is not None and word_end <= start:
+            yield pending
+        pending = match.start()
+        word_start, word_end = start, pending
+    if pending is not None:
+        yield pending
+
+
+def _closes_sentence(text: str, start: int, end: int) -> bool:
+    # Whether only closing quotes/brackets follow a period up to the end of its sentence
+    tail = text[start:end]
+    return bool(_CLOSERS.fullmatch(tail)) and ' "' not in tail and " ''" not in tail
+
+
+def _sentence_marks(text: str) -> tuple[set[int], set[int]]:
+    # Returns the positions of the periods ending a sentence and of the sentence starts
+    periods, starts = set(), {0}
+    for position in _boundaries(text):
+        if text[position] == "." and not _ends_sentence(text, position):
+            continue
+        start = _NEXT_TOKEN.match(text, position + 1).start(1)
+        end = position + 1
+        realigned = _REALIGNED.match(text, start)
+        if realigned:
+            end = start + len(realigned.group().rstrip())
+            start = realigned.end()
+        starts.add(start)
+        if text[position] == "." and _closes_sentence(text, position + 1, end):
+            periods.add(position)
+    final = _FINAL_PERIOD.search(text)
+    if final and text[final.start() - 1:final.start()] not in ("", "."):
+        if _closes_sentence(text, final.start() + 1, len(text.rstrip())):
+            periods.add(final.start())
+    return periods, starts
+
+
+def _split_word(word: str, padded: bool) -> list[str]:
+    parts = _OPEN_QUOTE.sub("' ", word).split() if "'" in word else [word]
+    tokens = []
+    for index, part in enumerate(parts):
+        tail = []
+        if "'" in part:
+            if part[-1] == "'" and part[-2:-1] not in ("", "'") and (padded or index < len(parts) - 1):
+                # A spaced-out trailing quote leaves room for one more clitic split
+                part = part[:-1]
+                tail.append("'")
+            match = _CLITIC.match(part)
+            if match:
+                part, clitic = match.groups()
+                tail.insert(0, clitic)
+        if "'" in part or "n't" in part:
+            match = _CLITIC_2.match(part)
+            if match:
+                part, clitic = match.groups()
+                tail.insert(0, clitic)
+        if _CONTRACTION_HINT.search(part):
+            for regex in _CONTRACTIONS:
+                part = regex.sub(r" \1 \2 ", part)
+            tokens.extend(part.split())
+        else:
+            tokens.append(part)
+        tokens.extend(tail)
+    return tokens
+
+
+def _append_word(tokens: list[str], text: str, start: int, end: int, periods: set[int]):
+    cuts = [position for position in periods if start <= position < end] if periods else None
+    if cuts:
+        for position in sorted(cuts):
+            if position > start:
+                _append_word(tokens, text, start, position, ())
+            tokens.append(".")
+            start = position + 1
+        if start < end:
+            _append_word(tokens, text, start, end, ())
+        return
+    word = text[start:end]
+    if "'" in word or "n't" in word or _CONTRACTION_HINT.search(word):
+        char = text[end:end + 1]
+        padded = char == " " or char in _PADDED or text.startswith("..", end) or end in periods
+        tokens.extend(_split_word(word, padded))
+    else:
+        tokens.append(word)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into the same tokens as `nltk.word_tokenize` (Punkt sentences + Treebank rules).
+
+    Sentence-final periods are found with a simplified Punkt decision (abbreviations, initials
+    and numbers followed by a lowercase word do not end a sentence); everything else is one pass
+    of a precompiled regex plus the Treebank clitic and contraction splits.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list[str]: The tokens, in order.
+    """
+    if "." in text or '"' in text:
+        periods, starts = _sentence_marks(text)
+    else:
+        periods, starts = set(), {0}
+    if "'" not in text and '"' not in text and not _SLOW_PATH.search(text):
+        # No quotes, clitics or contractions: split the periods off and scan once
+        if periods:
+            pieces, last = [], 0
+            for position in sorted(periods):
+                pieces.append(text[last:position])
+                last = position + 1
+            pieces.append(text[last:])
+            text = " . ".join(pieces)
+        return _PLAIN_TOKEN.findall(text)
+
+    tokens = []
+    spaced = -1  # end of a sentence-initial quote, which gets spaced out like a backtick
+    for match in _TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind == "word":
+            _append_word(tokens, text, match.start(), match.end(), periods)
+        elif kind == "quote":
+            start = match.start()
+            after_opener = start == spaced or (start > 0 and text[start - 1] in " ([{<«“‘„`")
+            if match.group() == '"':
+                if start in starts:
+                    spaced = match.end()
+                tokens.append("``" if start in starts or after_opener else "''")
+            else:
+                tokens.append("``" if after_opener and start not in starts else "''")
+        elif kind == "pair":
+            # A comma or colon swallows the next character, so a second one stays with the word
+            tokens.append(match.group()[0])
+            _append_word(tokens, text, match.start() + 1, match.end(), periods)
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def normalize(query: str) -> str:
+    """
+    Lowercases a query and removes stop words and punctuation.
+
+    Args:
+        query (str): The input query string.
+
+    Returns:
+        str: The remaining tokens joined by spaces.
+    """
+    return " ".join(token for token in tokenize(query.lower()) if token not in _DROPPED)
+
+
+def normalize_batch(queries: Iterable[str]) -> list[str]:
+    """
+    Normalizes several queries.
+
+    Args:
+        queries (Iterable[str]): The input query strings.
+
+    Returns:
+        list[str]: The normalized queries, in order.
+    """
+    return [normalize(query) for query in queries]
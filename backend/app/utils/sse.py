@@ -0,0 +1,151 @@
+import asyncio
+import os
+import re
+import time
+from typing import AsyncIterable, AsyncIterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+# Deltas arriving within this many seconds of the first one in a frame are sent together
+SSE_FLUSH_INTERVAL = float(os.getenv("SSE_FLUSH_INTERVAL", "0.05"))
+# A frame is sent as soon as its text reaches this many bytes
+SSE_MAX_FRAME_BYTES = int(os.getenv("SSE_MAX_FRAME_BYTES", "4096"))
+# Seconds without output after which a comment line keeps proxies from closing the stream
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+# Seconds between client-disconnect checks while waiting for the model
+SSE_DISCONNECT_POLL = float(os.getenv("SSE_DISCONNECT_POLL", "0.5"))
+
+HEARTBEAT = ": ping\n\n"
+
+_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+_END = object()
+
+
+def encode_event(data: str, event: str | None = None) -> str:
+    """
+    Encodes text as one Server-Sent Event.
+
+    Every line of the text gets its own `data:` field, so line breaks inside a delta survive:
+    the client joins the fields back together with newlines.
+
+    Args:
+        data (str): The event's text.
+        event (str | None, optional): The event type. Defaults to None ("message").
+
+    Returns:
+        str: The event, ending with the blank line that terminates it.
+    """
+    fields = f"event: {event}\n" if event else ""
+    return fields + "".join(f"data: {line}\n" for line in _LINE_BREAK.split(data)) + "\n"
+
+
+async def _next(iterator: AsyncIterator[str]):
+    try:
+        return await anext(iterator)
+    except StopAsyncIteration:
+        return _END
+
+
+async def sse_events(deltas: AsyncIterable[str], request: Request | None = None,
+                     flush_interval: float = SSE_FLUSH_INTERVAL, max_frame_bytes: int = SSE_MAX_FRAME_BYTES,
+                     heartbeat_interval: float = SSE_HEARTBEAT_INTERVAL,
+                     disconnect_poll: float = SSE_DISCONNECT_POLL) -> AsyncIterator[str]:
+    """
+    Frames a stream of text deltas as Server-Sent Events.
+
+    The first delta is sent at once; later ones are coalesced into one event until
+    `flush_interval` has passed or `max_frame_bytes` are buffered, so a reply is sent as a few
+    dozen writes rather than one per token. A heartbeat comment is sent after
+    `heartbeat_interval` seconds of silence. When the client goes away the upstream generator
+    is cancelled and closed, which closes the model's stream, instead of being run to the end.
+
+    Args:
+        deltas (AsyncIterable[str]): The text to send, e.g. a chatbot engine generator.
+        request (Request | None, optional): The request being answered, polled for disconnects.
+            Defaults to None (never checked).
+        flush_interval (float, optional): Seconds a frame may wait for more deltas.
+            Defaults to SSE_FLUSH_INTERVAL.
+        max_frame_bytes (int, optional): Bytes of text that end a frame early.
+            Defaults to SSE_MAX_FRAME_BYTES.
+        heartbeat_interval (float, optional): Seconds of silence before a heartbeat.
+            Defaults to SSE_HEARTBEAT_INTERVAL.
+        disconnect_poll (float, optional): Seconds between disconnect checks.
+            Defaults to SSE_DISCONNECT_POLL.
+
+    Yields:
+        str: Encoded events and heartbeats.
+    """
+    iterator = aiter(deltas)
+    pending = None
+    buffer, size = [], 0
+    flush_at = None  # deadline of the buffered frame
+    sent_at = checked_at = time.monotonic()
+    first = True
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(_next(iterator))
+
+            now = time.monotonic()
+            deadlines = [sent_at + heartbeat_interval]
+            if flush_at is not None:
+                deadlines.append(flush_at)
+            if request is not None:
+                deadlines.append(checked_at + disconnect_poll)
+            await asyncio.wait({pending}, timeout=max(0.0, min(deadlines) - now))
+
+            if request is not None and time.monotonic() - checked_at >= disconnect_poll:
+                if await request.is_disconnected():
+                    return
+                checked_at = time.monotonic()
+
+            delta = None
+            if pending.done():
+                delta, pending = pending.result(), None
+                if delta is _END:
+                    break
+                if delta:
+                    buffer.append(delta)
+                    size += len(delta.encode())
+                    if flush_at is None:
+                        flush_at = time.monotonic() + flush_interval
+
+            now = time.monotonic()
+            if buffer and (first or size >= max_frame_bytes or now >= flush_at):
+                yield encode_event("".join(buffer))
+                buffer, size, flush_at, sent_at, first = [], 0, None, now, False
+            elif delta is None and now - sent_at >= heartbeat_interval:
+                yield HEARTBEAT
+                sent_at = now
+
+        if buffer:
+            yield encode_event("".join(buffer))
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, Exception):
+                pass
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+
+def sse_response(deltas: AsyncIterable[str], request: Request | None = None) -> StreamingResponse:
+    """
+    Returns a streaming response that sends text deltas as coalesced Server-Sent Events.
+
+    Args:
+        deltas (AsyncIterable[str]): The text to send.
+        request (Request | None, optional): The request being answered, watched for disconnects.
+
+    Returns:
+        StreamingResponse: The `text/event-stream` response.
+    """
+    return StreamingResponse(
+        sse_events(deltas, request),
+        media_type="text/event-stream",
+        # Keep proxies such as nginx from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
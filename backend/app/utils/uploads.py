@@ -0,0 +1,56 @@
+import codecs
+import hashlib
+import os
+from typing import BinaryIO, Iterator
+
+# Bytes read from an upload at a time; memory use per upload stays around this size.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+def save_stream(source: BinaryIO, path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> tuple[int, str]:
+    """
+    Copies a binary stream to a file block by block while hashing it.
+
+    Blocking; call it from a worker thread (e.g. `run_in_threadpool`) in request handlers.
+
+    Args:
+        source (BinaryIO): The stream to copy, e.g. `UploadFile.file`.
+        path (str): Destination file path.
+        chunk_size (int, optional): Bytes per read. Defaults to UPLOAD_CHUNK_SIZE.
+
+    Returns:
+        tuple[int, str]: The number of bytes written and their SHA-256 hex digest.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as out:
+        while block := source.read(chunk_size):
+            digest.update(block)
+            out.write(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+def iter_text(source: BinaryIO, encoding: str = "utf-8", chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Decodes a binary stream incrementally.
+
+    Multi-byte characters split between two reads are decoded once complete.
+
+    Args:
+        source (BinaryIO): The stream to decode, e.g. `UploadFile.file`.
+        encoding (str, optional): Text encoding. Defaults to "utf-8".
+        chunk_size (int, optional): Bytes per read. Defaults to UPLOAD_CHUNK_SIZE.
+
+    Yields:
+        str: Consecutive pieces of the text.
+
+    Raises:
+        UnicodeDecodeError: If the stream is not valid in the encoding.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while block := source.read(chunk_size):
+        if text := decoder.decode(block):
+            yield text
+    if text := decoder.decode(b"", final=True):
+        yield text
@@ -0,0 +1,58 @@
+"""
+Chunking throughput on large documents: the original per-word re-encoding chunker vs
+the single-pass one. Near-linear scaling shows up as a flat MB/s column.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunker
+"""
+import random
+import time
+
+from app.utils.chunker import chunk_text, _encoding
+
+WORDS = ("the service account password reset billing invoice error code timeout "
+         "configure upload knowledge vector assistant conversation feedback").split()
+
+
+def _document(size: int) -> str:
+    rng = random.Random(0)
+    parts, total = [], 0
+    while total < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+        if rng.random() < 0.15:
+            sentence += "\n\n"
+        parts.append(sentence)
+        total += len(sentence) + 1
+    return " ".join(parts)[:size]
+
+
+def original_chunk_text(text: str, max_tokens: int = 300) -> list[str]:
+    enc = _encoding()
+    words = text.split()
+    chunks = []
+    current = []
+    for word in words:
+        current.append(word)
+        if len(enc.encode(" ".join(current))) > max_tokens:
+            chunks.append(" ".join(current))
+            current = []
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def main():
+    _encoding()  # load the BPE ranks outside the timings
+    print(f"{'size':>6} {'impl':>9} {'chunks':>7} {'seconds':>8} {'MB/s':>7}")
+    for mb in (0.1, 1, 10):
+        text = _document(int(mb * 1024 * 1024))
+        impls = [("single", chunk_text)] + ([("original", original_chunk_text)] if mb <= 1 else [])
+        for name, fn in impls:
+            start = time.perf_counter()
+            chunks = fn(text)
+            elapsed = time.perf_counter() - start
+            print(f"{mb:>4}MB {name:>9} {len(chunks):>7} {elapsed:>8.2f} {mb / elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
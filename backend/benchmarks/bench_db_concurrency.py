@@ -0,0 +1,48 @@
+"""
+Throughput of the database-backed endpoints under concurrent load.
+
+Each worker thread creates a conversation, reads its history and submits feedback for it,
+all through per-request sessions. Throughput should rise with the number of workers
+instead of failing or serializing on a shared session.
+
+Usage (from backend/):
+    python -m benchmarks.bench_db_concurrency [requests]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app.db.database import create_tables
+from app.main import app
+
+client = TestClient(app)
+
+
+def _session_round_trip(i: int):
+    convo_id = client.post("/api/v1/conversations").json()["id"]
+    client.get(f"/api/v1/conversations/{convo_id}/messages")
+    client.post("/api/v1/feedback", json={
+        "conversation_id": convo_id,
+        "version": "A",
+        "message": f"Reply {i}",
+        "user_message": f"Question {i}",
+        "rating": 1,
+    })
+    client.get("/api/v1/config-db/")
+
+
+def main(total: int):
+    create_tables()
+    print(f"{'workers':>8} {'requests/s':>11}")
+    for workers in (1, 2, 4, 8, 16):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_session_round_trip, range(total)))
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8} {total * 4 / elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
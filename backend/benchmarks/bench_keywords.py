@@ -0,0 +1,82 @@
+"""
+Keyword knowledge lookup: the original table scan vs the Aho-Corasick matcher.
+
+"scan" is the original `search_knowledge`: read every Knowledge row, then test each keyword
+with a lowercased substring check. "matcher" is `KeywordMatcher` after its first (compiling)
+call. Both run against the same seeded temporary SQLite database.
+
+Usage (from backend/):
+    python -m benchmarks.bench_keywords [keywords ...]
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core import knowledge
+from app.db.database import create_tables, make_engine
+from app.db.models import Knowledge
+
+MESSAGES = 200
+
+
+def scan_search(Session, user_msg: str) -> str | None:
+    with Session() as db:
+        entries = db.query(Knowledge).all()
+    for entry in entries:
+        if entry.keyword.lower() in user_msg.lower():
+            return entry.content
+    return None
+
+
+def _per_call_ms(fn, messages) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return (time.perf_counter() - start) / len(messages) * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000, 50000]
+    rng = random.Random(0)
+    print(f"{'keywords':>9} {'scan (ms)':>10} {'matcher (ms)':>13} {'compile (ms)':>13} {'speedup':>8}")
+    for size in sizes:
+        keywords = {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 14))) for _ in range(size)}
+        keywords = sorted(keywords)
+        messages = [
+            " ".join(rng.choices(["please", "help", "with", "my", "account", "order", "refund"], k=12))
+            + (f" about {rng.choice(keywords).upper()}" if i % 2 else "")
+            for i in range(MESSAGES)
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            create_tables(engine)
+            with engine.begin() as conn:
+                conn.execute(Knowledge.__table__.insert(), [
+                    {"keyword": keyword, "content": f"content for {keyword}"} for keyword in keywords
+                ])
+            Session = sessionmaker(bind=engine)
+
+            matcher = knowledge.KeywordMatcher()
+            with mock.patch.object(knowledge, "Session", Session):
+                start = time.perf_counter()
+                matcher.match("warm up")
+                compile_ms = (time.perf_counter() - start) * 1000
+                for message in messages:
+                    assert matcher.match(message) == scan_search(Session, message)
+
+                scan_ms = _per_call_ms(lambda m: scan_search(Session, m), messages[:20])
+                matcher_ms = _per_call_ms(matcher.match, messages)
+            engine.dispose()
+
+        print(f"{size:>9} {scan_ms:>10.3f} {matcher_ms:>13.4f} {compile_ms:>13.1f} {scan_ms / matcher_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
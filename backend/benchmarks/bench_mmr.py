@@ -0,0 +1,36 @@
+"""
+Microbenchmark of MMR selection: the original loop implementation vs the vectorized one.
+
+Usage (from backend/):
+    python -m benchmarks.bench_mmr
+"""
+import timeit
+
+import numpy as np
+
+from app.core.knowledge_vector import mmr, mmr_batch
+from app.tests.test_knowledge_vector import reference_mmr
+
+DIM = 1536  # text-embedding-3-small
+
+
+def _best_ms(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'pool':>6} {'top_n':>6} {'loop (ms)':>10} {'numpy (ms)':>11} {'speedup':>8} {'batch x8 (ms/q)':>16}")
+    for pool in (5, 20, 50, 100, 250, 500, 1000):
+        docs = rng.normal(size=(pool, DIM))
+        queries = rng.normal(size=(8, DIM))
+        for top_n in (3, 10):
+            number = 3 if pool >= 250 else 20
+            loop_ms = _best_ms(lambda: reference_mmr(queries[0], docs, 0.5, top_n), number)
+            fast_ms = _best_ms(lambda: mmr(queries[0], docs, 0.5, top_n), number)
+            batch_ms = _best_ms(lambda: mmr_batch(queries, docs, 0.5, top_n), number) / len(queries)
+            print(f"{pool:>6} {top_n:>6} {loop_ms:>10.3f} {fast_ms:>11.3f} {loop_ms / fast_ms:>7.1f}x {batch_ms:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
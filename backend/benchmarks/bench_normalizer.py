@@ -0,0 +1,63 @@
+"""
+Query normalization: nltk.word_tokenize vs the precompiled regex backend.
+
+Times `normalize_query` with each backend over plain questions and over queries full of
+contractions, quotes and codes, and counts queries where the two backends disagree. The NLTK
+backend needs its data (downloaded into NLTK_DATA_DIR on first use).
+
+Usage (from backend/):
+    python -m benchmarks.bench_normalizer [queries]
+"""
+import random
+import sys
+import time
+from unittest import mock
+
+from app.core import knowledge_vector
+
+PLAIN = [
+    "How do I reset my password?",
+    "What is the refund policy for orders over $50?",
+    "My router keeps dropping the connection every 10 minutes.",
+    "Where can I download the invoice for order 12345",
+    "Error E-404 when opening the dashboard, what does it mean?",
+]
+WORDS = [
+    "How", "do", "I", "reset", "my", "password", "can't", "won't", "it's", "I'm", "you'll", "order",
+    "#1234", "E-404", "error", "(beta)", '"quoted"', "'single'", "refund?", "today!", "3.5", "v2.",
+    "10:30", "1,000", "$20", "50%", "user@example.com", "https://x.io/a?b=1", "gonna", "cannot",
+    "...", "--", "e-mail", "Thanks.", "Hi,", "5.", "C++", "node.js", "users'", "John's", "Wi-Fi",
+]
+
+
+def _per_query_us(queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        knowledge_vector.normalize_query(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(0)
+    workloads = {
+        "plain": [rng.choice(PLAIN) for _ in range(count)],
+        "mixed": [" ".join(rng.choices(WORDS, k=rng.randint(2, 14))) for _ in range(count)],
+    }
+    knowledge_vector.load_nlp_resources()
+
+    print(f"{'queries':>8} {'nltk (us)':>10} {'regex (us)':>11} {'speedup':>8} {'differ':>7}")
+    for label, queries in workloads.items():
+        results, timings = {}, {}
+        for backend in ("nltk", "regex"):
+            with mock.patch.object(knowledge_vector, "QUERY_NORMALIZER", backend):
+                knowledge_vector.normalize_query(queries[0])  # load data / compile patterns
+                timings[backend] = _per_query_us(queries)
+                results[backend] = knowledge_vector.normalize_queries(queries)
+        differ = sum(a != b for a, b in zip(results["nltk"], results["regex"]))
+        print(f"{label:>8} {timings['nltk']:>10.1f} {timings['regex']:>11.1f} "
+              f"{timings['nltk'] / timings['regex']:>7.1f}x {differ:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Retrieval benchmark: dense-only vs hybrid (BM25 + vector) search.
+
+Runs fully offline with the local hashing embeddings; each embedding call sleeps for
+EMBED_LATENCY seconds to stand in for the API round-trip. Half of the queries ask about an
+exact error code, half are paraphrased questions. Reports p50/p95 latency, embedding calls and
+recall@3 (the chunk the query was written for is among the returned chunks).
+
+Usage (from backend/):
+    python -m benchmarks.bench_retrieval
+"""
+import random
+import statistics
+import time
+from unittest import mock
+
+import chromadb
+
+from app.core import knowledge_vector
+from app.core.embeddings import HashingEmbeddings
+from app.db.database import create_tables
+from app.utils.bm25 import BM25Index
+
+CHUNKS = 5000
+QUERIES = 200
+EMBED_LATENCY = 0.05
+
+SUBJECTS = ["router", "printer", "invoice", "password", "backup", "laptop", "VPN", "mailbox", "license", "server"]
+PROBLEMS = ["fails to start", "is very slow", "shows a warning", "cannot connect", "loses data", "needs an update"]
+FIXES = ["restart it", "clear the cache", "contact support", "reinstall the driver", "check the cables"]
+
+
+class SlowEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        time.sleep(EMBED_LATENCY)
+        return super().__call__(input)
+
+
+def _corpus(rng):
+    chunks = []
+    for i in range(CHUNKS):
+        subject, problem, fix = rng.choice(SUBJECTS), rng.choice(PROBLEMS), rng.choice(FIXES)
+        chunks.append(f"Error E-{1000 + i}: the {subject} {problem}. To solve it, {fix}.")
+    return chunks
+
+
+def _run(label, queries, provider):
+    knowledge_vector.embedding_cache.clear()
+    provider.calls = 0
+    latencies, found = [], 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        results = knowledge_vector.search_knowledge_vector(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += expected in results
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:>10} {statistics.median(latencies):>9.2f} {p95:>9.2f} {provider.calls:>7} "
+          f"{found / len(queries):>9.2%}")
+
+
+def main():
+    create_tables()  # ingestion bumps the shared knowledge counter
+    rng = random.Random(0)
+    chunks = _corpus(rng)
+    provider = SlowEmbeddings()
+    collection = chromadb.EphemeralClient().get_or_create_collection("bench-retrieval", embedding_function=None)
+
+    with mock.patch.object(knowledge_vector, "collection", collection), \
+            mock.patch.object(knowledge_vector, "embedding_fn", HashingEmbeddings()), \
+            mock.patch.object(knowledge_vector, "lexical_index", BM25Index()):
+        knowledge_vector.add_knowledge_chunks("bench", chunks)
+
+        queries = []
+        for i in rng.sample(range(CHUNKS), QUERIES):
+            chunk = chunks[i]
+            if len(queries) % 2:
+                queries.append((f"What does error E-{1000 + i} mean?", chunk))
+            else:
+                subject_and_problem = chunk.split(": the ")[1].split(".")[0]
+                queries.append((f"Help, my {subject_and_problem}", chunk))
+
+        print(f"{CHUNKS} chunks, {QUERIES} queries, {EMBED_LATENCY * 1000:.0f} ms per embedding call")
+        print(f"{'mode':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'embeds':>7} {'recall@3':>9}")
+        with mock.patch.object(knowledge_vector, "embedding_fn", provider):
+            with mock.patch.object(knowledge_vector, "HYBRID_SEARCH", False):
+                _run("dense", queries, provider)
+            _run("hybrid", queries, provider)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of single-flight coalescing of identical opening questions.
+
+Sends bursts of N new conversations asking the same question at the same time through
+`get_streaming_response`, against the local OpenAI stub (app/tests/stub_openai.py), with
+coalescing off and on. Reports upstream completions and retrievals per burst, time to first
+token and total time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_single_flight [N ...]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from uuid import uuid4
+
+from app.tests.stub_openai import run_stub_server
+
+QUESTION = "How do I reset my password?"
+
+
+async def _one_stream(engine, convo_id: str) -> float:
+    start = time.perf_counter()
+    first = None
+    async for _ in engine.get_streaming_response(convo_id, QUESTION):
+        if first is None:
+            first = time.perf_counter() - start
+    return first
+
+
+async def _burst(engine, n: int) -> tuple[list[float], float]:
+    from app.db.database import Session
+    from app.db.models import Conversation
+
+    convo_ids = [str(uuid4()) for _ in range(n)]
+    with Session() as db:
+        db.add_all([Conversation(id=c, version="A") for c in convo_ids])
+        db.commit()
+    start = time.perf_counter()
+    ttfts = await asyncio.gather(*(_one_stream(engine, c) for c in convo_ids))
+    return ttfts, time.perf_counter() - start
+
+
+async def _run(engine, levels: list[int], searches: list, completions: list):
+    await _burst(engine, 1)  # warm up the client's connection pool and lazy imports
+    print(f"{'burst':>6} {'coalesce':>9} {'upstream':>9} {'searches':>9} {'ttft p50 (ms)':>14} {'wall (s)':>9}")
+    for n in levels:
+        for enabled in (False, True):
+            engine.single_flight.enabled = enabled
+            completed, searched = len(completions), len(searches)
+            ttfts, wall = await _burst(engine, n)
+            print(f"{n:>6} {'on' if enabled else 'off':>9} {len(completions) - completed:>9} "
+                  f"{len(searches) - searched:>9} {statistics.median(ttfts) * 1000:>14.1f} {wall:>9.2f}")
+
+
+def main(levels: list[int]):
+    with run_stub_server(separate_process=True) as base_url:
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+        from app.core import chatbot_engine as engine
+        from app.db.database import create_tables
+
+        # Count retrievals without running them; they have their own benchmarks.
+        searches = []
+        engine.search_knowledge_vector = lambda query: searches.append(query) or []
+        engine.semantic_cache.enabled = False
+        completions, stream_completion = [], engine._stream_completion
+        engine._stream_completion = lambda *args, **kwargs: completions.append(1) or stream_completion(*args, **kwargs)
+        create_tables()
+        asyncio.run(_run(engine, levels, searches, completions))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10, 100, 300])
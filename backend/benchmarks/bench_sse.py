@@ -0,0 +1,69 @@
+"""
+Benchmark of the SSE framing of chat replies.
+
+Streams a synthetic reply of short deltas (about the size of model tokens) at several
+inter-token delays and compares one `data:` event per delta with the coalesced writer in
+app/utils/sse.py: events (one write each) and bytes per response, and time to first byte.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sse [TOKENS]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from app.utils.sse import SSE_FLUSH_INTERVAL, sse_events
+
+
+def _reply(n: int) -> list[str]:
+    rng = random.Random(0)
+    words = ["the", "password", "reset", "link", "account", "settings", "email", "you", "can", "a"]
+    tokens = []
+    for i in range(n):
+        token = rng.choice(words)
+        tokens.append(token if i == 0 else " " + token)
+        if rng.random() < 0.05:
+            tokens.append(".\n\n" if rng.random() < 0.5 else "\n")
+    return tokens
+
+
+async def _deltas(tokens: list[str], delay: float):
+    for token in tokens:
+        yield token
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def _per_delta(tokens: list[str], delay: float):
+    # The previous framing: one event per delta, line breaks sent as they were
+    async for token in _deltas(tokens, delay):
+        yield f"data: {token}\n\n"
+
+
+async def _measure(frames) -> tuple[int, int, float, float]:
+    start = time.perf_counter()
+    count = size = 0
+    first = None
+    async for frame in frames:
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+        size += len(frame.encode())
+    return count, size, first * 1000, time.perf_counter() - start
+
+
+def main(n: int):
+    tokens = _reply(n)
+    print(f"{len(tokens)} deltas, {len(''.join(tokens).encode())} bytes of text, "
+          f"flush interval {SSE_FLUSH_INTERVAL * 1000:.0f} ms")
+    print(f"{'delay (ms)':>10} {'framing':>10} {'events':>7} {'bytes':>7} {'ttfb (ms)':>10} {'wall (s)':>9}")
+    for delay in (0, 0.005, 0.02):
+        for name, frames in (("per-delta", _per_delta(tokens, delay)),
+                             ("coalesced", sse_events(_deltas(tokens, delay)))):
+            count, size, ttfb, wall = asyncio.run(_measure(frames))
+            print(f"{delay * 1000:>10.0f} {name:>10} {count:>7} {size:>7} {ttfb:>10.2f} {wall:>9.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
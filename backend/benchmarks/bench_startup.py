@@ -0,0 +1,74 @@
+"""
+Worker startup time: `import app.main` cold and warm, and time until the readiness probe passes.
+
+"cold" runs with an empty bytecode cache (a fresh PYTHONPYCACHEPREFIX), like a new container;
+"warm" reuses the cache. "ready" starts the app (lifespan included) and polls
+/api/v1/health/ready until the background warm-up has finished.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT = """
+import time
+start = time.perf_counter()
+import app.main
+print(time.perf_counter() - start)
+"""
+
+READY = """
+import json, time
+start = time.perf_counter()
+import app.main
+from fastapi.testclient import TestClient
+imported = time.perf_counter() - start
+with TestClient(app.main.app) as client:
+    while True:
+        body = client.get("/api/v1/health/ready").json()
+        if body["status"] != "warming_up":
+            break
+        time.sleep(0.01)
+print(json.dumps({"import": imported, "ready": time.perf_counter() - start, **body}))
+"""
+
+
+def _run(code: str, env: dict | None = None) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env={**os.environ, **(env or {})},
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    cold = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache:
+            cold.append(float(_run(IMPORT, {"PYTHONPYCACHEPREFIX": cache})))
+    _run(IMPORT)  # populate the bytecode cache
+    warm = [float(_run(IMPORT)) for _ in range(runs)]
+
+    print(f"import app.main  cold: {statistics.median(cold) * 1000:7.0f} ms   "
+          f"warm: {statistics.median(warm) * 1000:7.0f} ms   (median of {runs})")
+
+    result = json.loads(_run(READY))
+    print(f"time to readiness: {result['ready'] * 1000:7.0f} ms (import {result['import'] * 1000:.0f} ms), "
+          f"status {result['status']}")
+    for step, seconds in result["steps"].items():
+        error = result["errors"].get(step)
+        print(f"  {step:<20} {seconds * 1000:7.0f} ms" + (f"  error: {error}" if error else ""))
+
+
+if __name__ == "__main__":
+    main()
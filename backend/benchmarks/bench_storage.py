@@ -0,0 +1,86 @@
+"""
+Chat-turn write path and history read path, before and after the storage tuning.
+
+"before" is a plain SQLite engine with default journaling and no hot-path indexes;
+"after" is `make_engine` (WAL + pragmas + pool) with the indexes from the models.
+Both databases are seeded with the same conversations first.
+
+Usage (from backend/):
+    python -m benchmarks.bench_storage [conversations] [messages_per_conversation]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, create_tables, make_engine
+from app.db.models import Conversation, Message
+
+
+def _seed(engine, conversations: int, per_conversation: int):
+    with engine.begin() as conn:
+        conn.execute(Conversation.__table__.insert(), [
+            {"id": f"c{i}", "version": "A", "started_at": datetime.utcnow()} for i in range(conversations)
+        ])
+        rows = [
+            {"conversation_id": f"c{i}", "role": "user" if j % 2 == 0 else "assistant",
+             "content": f"message {j} " * 20, "timestamp": datetime.utcnow()}
+            for j in range(per_conversation) for i in range(conversations)
+        ]
+        conn.execute(Message.__table__.insert(), rows)
+
+
+def _chat_turns(Session, conversations: int, turns: int) -> float:
+    start = time.perf_counter()
+    for _ in range(turns):
+        convo_id = f"c{random.randrange(conversations)}"
+        with Session() as db:
+            db.add(Message(conversation_id=convo_id, role="user", content="How do I reset my password?"))
+            db.commit()
+            db.add(Message(conversation_id=convo_id, role="assistant", content="Go to settings. " * 20))
+            db.commit()
+    return (time.perf_counter() - start) / turns * 1000
+
+
+def _history_reads(Session, conversations: int, reads: int) -> float:
+    start = time.perf_counter()
+    for _ in range(reads):
+        convo_id = f"c{random.randrange(conversations)}"
+        with Session() as db:
+            db.query(Message.role, Message.content).filter(
+                Message.conversation_id == convo_id
+            ).order_by(Message.timestamp).all()
+    return (time.perf_counter() - start) / reads * 1000
+
+
+def main(conversations: int, per_conversation: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        before = create_engine(f"sqlite:///{os.path.join(tmp, 'before.db')}")
+        Base.metadata.create_all(before)
+        with before.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+        after = make_engine(f"sqlite:///{os.path.join(tmp, 'after.db')}")
+        create_tables(after)
+
+        print(f"seeding {conversations} conversations x {per_conversation} messages")
+        print(f"{'engine':>8} {'chat turn (ms)':>15} {'history read (ms)':>18}")
+        for name, engine in (("before", before), ("after", after)):
+            _seed(engine, conversations, per_conversation)
+            Session = sessionmaker(bind=engine)
+            write_ms = _chat_turns(Session, conversations, 500)
+            read_ms = _history_reads(Session, conversations, 500)
+            print(f"{name:>8} {write_ms:>15.3f} {read_ms:>18.3f}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [2000, 50][len(args):]))
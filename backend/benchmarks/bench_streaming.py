@@ -0,0 +1,73 @@
+"""
+Concurrency benchmark for the chat streaming path.
+
+Runs N parallel `get_streaming_response` generators against the local OpenAI stub
+(app/tests/stub_openai.py) and reports time-to-first-token (TTFT) and total time.
+With a non-blocking client TTFT stays close to the stub's first-token delay as N grows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_streaming [N ...]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from uuid import uuid4
+
+from app.tests.stub_openai import run_stub_server, settings
+
+
+async def _one_stream(engine, convo_id: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    async for _ in engine.get_streaming_response(convo_id, "How do I reset my password?"):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def _run(engine, levels: list[int]):
+    from app.db.database import Session
+    from app.db.models import Conversation
+
+    # Warm up the client's connection pool and lazy imports outside the measurements.
+    warmup_id = str(uuid4())
+    with Session() as db:
+        db.add(Conversation(id=warmup_id))
+        db.commit()
+    await _one_stream(engine, warmup_id)
+
+    print(f"stub first-token delay: {settings['first_token_delay'] * 1000:.0f} ms")
+    print(f"{'streams':>8} {'ttft p50 (ms)':>14} {'ttft p95 (ms)':>14} {'wall (s)':>9}")
+    for n in levels:
+        with Session() as db:
+            convo_ids = [str(uuid4()) for _ in range(n)]
+            db.add_all([Conversation(id=c) for c in convo_ids])
+            db.commit()
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(_one_stream(engine, c) for c in convo_ids))
+        wall = time.perf_counter() - start
+
+        ttfts = sorted(r[0] * 1000 for r in results)
+        p95 = ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))]
+        print(f"{n:>8} {statistics.median(ttfts):>14.1f} {p95:>14.1f} {wall:>9.2f}")
+
+
+def main(levels: list[int]):
+    with run_stub_server(separate_process=True) as base_url:
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+        from app.core import chatbot_engine as engine
+        from app.db.database import create_tables
+
+        # Retrieval has its own benchmarks; keep this one about the upstream stream.
+        engine.search_knowledge_vector = lambda query: []
+        create_tables()
+        asyncio.run(_run(engine, levels))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1, 10, 50, 100])
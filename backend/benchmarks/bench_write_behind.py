@@ -0,0 +1,56 @@
+"""
+Chat-turn persistence: inline commits vs the write-behind queue.
+
+Each simulated turn writes a user and an assistant message, from several threads at once.
+"request path" is the time a turn spends on its writes before it could stream; "throughput"
+counts turns per second until every write is committed (the queue is flushed).
+
+Usage (from backend/):
+    python -m benchmarks.bench_write_behind [turns]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.persistence import WriteBehindWriter
+from app.db.database import create_tables, make_engine
+from app.db.models import Conversation
+
+
+def _turn(writer: WriteBehindWriter, convo_id: str) -> float:
+    start = time.perf_counter()
+    writer.add_message(convo_id, "user", "How do I reset my password?")
+    writer.add_message(convo_id, "assistant", "Go to settings. " * 20)
+    return time.perf_counter() - start
+
+
+def main(turns: int):
+    print(f"{'mode':>13} {'threads':>8} {'request path p50 (ms)':>22} {'turns/s':>9}")
+    for threads in (1, 8, 32):
+        for mode, enabled in (("inline", False), ("write-behind", True)):
+            with tempfile.TemporaryDirectory() as tmp:
+                engine = make_engine(f"sqlite:///{os.path.join(tmp, 'chatbot.db')}")
+                create_tables(engine)
+                Session = sessionmaker(bind=engine)
+                with Session() as db:
+                    db.add_all([Conversation(id=f"c{i}", version="A") for i in range(100)])
+                    db.commit()
+                writer = WriteBehindWriter(Session, enabled=enabled)
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    latencies = list(pool.map(lambda i: _turn(writer, f"c{i % 100}"), range(turns)))
+                writer.flush()
+                elapsed = time.perf_counter() - start
+                writer.close()
+                engine.dispose()
+            print(f"{mode:>13} {threads:>8} {statistics.median(latencies) * 1000:>22.3f} {turns / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
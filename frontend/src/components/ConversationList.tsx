@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
+import { listConversations } from './api.ts';
 
 type Props = {
     onSelectConversation: (id: string) => void;
@@ -12,11 +13,17 @@ type Conversation = {
 
 export default function Sidebar({ onSelectConversation, selectedId }: Props) {
     const [conversations, setConversations] = useState<Conversation[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
 
-    const fetchConversations = async () => {
+    const loadMore = async () => {
+        if (!nextCursor) return;
         try {
-            const res = await axios.get('http://localhost:8000/api/v1/conversations');
-            setConversations(res.data);
+            const page = await listConversations(nextCursor);
+            setConversations((shown) => [
+                ...shown,
+                ...page.conversations.filter((c) => !shown.some((s) => s.id === c.id)),
+            ]);
+            setNextCursor(page.nextCursor);
         } catch (err) {
             console.error('Failed to fetch conversations', err);
         }
@@ -36,32 +43,25 @@ export default function Sidebar({ onSelectConversation, selectedId }: Props) {
     };
 
     useEffect(() => {
-        const fetchConversations = async () => {
+        // Only the first page is (re)fetched; older pages are loaded on demand
+        const fetchConversations = async (initial: boolean) => {
             try {
-                const res = await axios.get('http://localhost:8000/api/v1/conversations/');
-                const allConversations = res.data;
-
-                // For each conversation, fetch its messages and only keep those that have messages
-                const filtered: Conversation[] = [];
-
-                for (const convo of allConversations) {
-                    const messagesRes = await axios.get(`http://localhost:8000/api/v1/conversations/${convo.id}/messages`);
-                    if (messagesRes.data && messagesRes.data.length > 0) {
-                        filtered.push(convo);
-                    }
-                }
-
-                setConversations(filtered);
+                const page = await listConversations();
+                setConversations((shown) => [
+                    ...page.conversations,
+                    ...shown.filter((s) => !page.conversations.some((c) => c.id === s.id)),
+                ]);
+                if (initial) setNextCursor(page.nextCursor);
             } catch (err) {
                 console.error('Failed to fetch conversations', err);
             }
         };
 
         // Initial fetch
-        fetchConversations();
+        fetchConversations(true);
 
         // Event listener for refresh signal
-        const handler = () => fetchConversations();
+        const handler = () => fetchConversations(false);
         window.addEventListener("conversationUpdated", handler);
 
         return () => {
@@ -111,6 +111,21 @@ export default function Sidebar({ onSelectConversation, selectedId }: Props) {
                     </li>
                 ))}
             </ul>
+            {nextCursor && (
+                <button
+                    onClick={loadMore}
+                    style={{
+                        width: '100%',
+                        background: 'none',
+                        border: 'none',
+                        color: '#007bff',
+                        padding: '6px',
+                        cursor: 'pointer',
+                    }}
+                >
+                    Load more
+                </button>
+            )}
         </div>
     );
 }
@@ -9,9 +9,17 @@ export const createConversation = async (): Promise<string> => {
     return res.data.id;
 };
 
-export const listConversations = async () => {
-    const res = await api.get('/conversations');
-    return res.data;
+export type ConversationPage = {
+    conversations: { id: string }[];
+    nextCursor: string | null;
+};
+
+// One page of conversations, newest first; pass nextCursor back to get the following page
+export const listConversations = async (cursor?: string | null, limit = 50): Promise<ConversationPage> => {
+    const res = await api.get('/conversations', {
+        params: { limit, has_messages: true, ...(cursor ? { cursor } : {}) },
+    });
+    return { conversations: res.data, nextCursor: res.headers['x-next-cursor'] ?? null };
 };
 
 export const getConversationMessages = async (conversationId: string) => {